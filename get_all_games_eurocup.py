@@ -19,6 +19,10 @@ from collections import Counter
 import warnings
 import os
 import pickle
+import sys
+# src modules: the score histogram, simulation cache and cached simulation runner
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'src'))
+from score_distribution import score_histogram
 warnings.filterwarnings('ignore')
 pd.set_option('display.max_columns', None)
 
@@ -2081,13 +2085,16 @@ def analyze_results(results, simmedpossessions, team_a_name, team_b_name):
     return results_df
 
 
-def simulate_matchup(home_team,away_team,HFA, number_of_simulations, possessionAdjust, teamsDF1):
+def simulate_matchup(home_team,away_team,HFA, number_of_simulations, possessionAdjust, teamsDF1, home_court_diffs=None):
+    if home_court_diffs is None:
+        home_court_diffs = [homeODiff, homeDDiff, awayODiff, awayDDiff]
+    home_o_diff, home_d_diff, away_o_diff, away_d_diff = home_court_diffs
     team1O, team2O = calculate_transition_matrix_offense(teamsDF1, home_team,away_team, calcs=25000)
     team1D, team2D, simmedpossessions = calculate_transition_matrix_defense(teamsDF1, home_team,away_team, calcs=25000)
     team1 = team1O + team2D
     team2 = team2O + team1D
-    team1 = team1 * (1 + (HFA * (homeODiff + awayDDiff)))
-    team2 = team2 * (1 + (HFA * (awayODiff + homeDDiff)))
+    team1 = team1 * (1 + (HFA * (home_o_diff + away_d_diff)))
+    team2 = team2 * (1 + (HFA * (away_o_diff + home_d_diff)))
     row_sums = team1.sum(axis=1)
     row_sums2 = team2.sum(axis=1)
     HomeTeamMatrix = team1.div(row_sums, axis=0).fillna(0)
@@ -2096,7 +2103,8 @@ def simulate_matchup(home_team,away_team,HFA, number_of_simulations, possessionA
     results, simmedpossessionsA = run_multiple_games(HomeTeamMatrix, AwayTeamMatrix, number_of_simulations, simmedpossessions + possessionAdjust)
     box_score = analyze_results(results,simmedpossessionsA, home_team, away_team)
 
-    return box_score.round(3)
+    # same sparse (home points, away points) histogram as the src engines, see src/score_distribution.py
+    return box_score.round(3), score_histogram([game[0]['Points'] for game in results], [game[1]['Points'] for game in results])
 
 
 # In[18]:
@@ -2207,7 +2215,8 @@ teamsDF.head()
 
 
 def run_full_simuluation (home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust,
-                         teamsDF, homeusage_for, awayusage_for, homeusage_against, awayusage_against):
+                         teamsDF, homeusage_for, awayusage_for, homeusage_against, awayusage_against, seed=None,
+                         home_court_diffs=None):
 
     '''
     Returns simulated team level stats and player level box score.
@@ -2219,12 +2228,18 @@ def run_full_simuluation (home_team, away_team, HFA, players_to_update, number_o
         number_of_simulations (int): Number of simulations (default 15000)
         HFA (float): Home court advantage (default 0.8)
         possession_adjust (float): Possession adjustment (e.g., to slow the game down by 1 possession, -1.)
+        seed (int): Random seed, the matrices and every simulated game draw from numpy's global random state (default None)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff (default the ones calculated above)
     '''
     
+    if seed is not None:
+        np.random.seed(seed)
+
     teamsDF1 = update_or_remove_player_data(players_to_update, teamsDF)
     teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
     
-    SimmedGameStats = simulate_matchup(home_team, away_team, HFA, number_of_simulations, possession_adjust, teamsDF1)
+    SimmedGameStats, ScoreHistogram = simulate_matchup(home_team, away_team, HFA, number_of_simulations, possession_adjust, teamsDF1,
+                                                       home_court_diffs)
 
     playerstats1A = pd.concat([homeusage_for,awayusage_for])
     playerstats13 = (playerstats1A.sort_values(['PlayerID', 'Season', 'Gamecode', 'Possession'], 
@@ -2359,7 +2374,7 @@ def run_full_simuluation (home_team, away_team, HFA, players_to_update, number_o
     SimmedBoxScoreHome = SimmedBoxScore[SimmedBoxScore['Team'] == home_team].sort_values('PTS', ascending=False)
     SimmedBoxScoreAway = SimmedBoxScore[SimmedBoxScore['Team'] == away_team].sort_values('PTS', ascending=False)
     
-    return SimmedGameStats, SimmedBoxScore, SimmedBoxScoreHome, SimmedBoxScoreAway
+    return SimmedGameStats, SimmedBoxScore, SimmedBoxScoreHome, SimmedBoxScoreAway, ScoreHistogram
 
 
 # In[ ]:
@@ -2518,6 +2533,15 @@ playoff_round_mapping = {
 # Process each playoff game round
 all_simulations = []
 
+# Simulation cache: rerunning a round where ratings, rosters, HFA and simulation count are unchanged reads the
+# results back from data/simulation_cache instead of simulating every game again
+from simulation_cache import SimulationCache
+from run_simulation import run_cached_simulation
+
+SIMULATION_SEED = 2024
+simulation_cache = SimulationCache(os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'simulation_cache'))
+
+
 for round_number in [23]:  # Rounds 21 (Game 1) and 22 (Game 2)
     print(f"\n--- Processing Round {round_number}: {playoff_round_mapping[round_number]} ---\n")
     
@@ -2539,7 +2563,8 @@ for round_number in [23]:  # Rounds 21 (Game 1) and 22 (Game 2)
         home_team_hfa = .8 if game['Home_Code'] != 'HTA' else .2
         pace_game_2 = -7 if game['Home_Code'] != 'PAM' else 0
         try:
-            SimmedTeamStats, SimmedBoxScore, SimmedBoxScoreTeam1, SimmedBoxScoreTeam2 = run_full_simuluation(
+            SimmedTeamStats, SimmedBoxScore, SimmedBoxScoreTeam1, SimmedBoxScoreTeam2, ScoreHistogram = run_cached_simulation(
+                simulation_cache,
                 home_team=game['Home_Code'],
                 away_team=game['Away_Code'], 
                 HFA=home_team_hfa, 
@@ -2551,6 +2576,9 @@ for round_number in [23]:  # Rounds 21 (Game 1) and 22 (Game 2)
                 awayusage_for=awayusage_for,
                 homeusage_against=homeusage_against,
                 awayusage_against=awayusage_against,
+                seed=SIMULATION_SEED,
+                home_court_diffs=[homeODiff, homeDDiff, awayODiff, awayDDiff],
+                simulate=run_full_simuluation,
             )
             
             # Add print statement to show home and away teams after simulation
@@ -2567,6 +2595,7 @@ for round_number in [23]:  # Rounds 21 (Game 1) and 22 (Game 2)
                 'Arena': game['Arena'],
                 'Round': game['Round'],
                 'SimmedTeamStats': SimmedTeamStats,
+                'ScoreHistogram': ScoreHistogram,
                 'SimmedBoxScore': SimmedBoxScore,
                 'SimmedBoxScoreTeam1': SimmedBoxScoreTeam1,
                 'SimmedBoxScoreTeam2': SimmedBoxScoreTeam2
@@ -2578,6 +2607,8 @@ for round_number in [23]:  # Rounds 21 (Game 1) and 22 (Game 2)
         except Exception as e:
             print(f"Error simulating {game['Matchup']}: {e}")
 
+print(simulation_cache.report().round(3).to_string(index=False))
+
 # Convert the list of simulation results to a DataFrame
 if all_simulations:
     simulation_results_df = pd.DataFrame(all_simulations)
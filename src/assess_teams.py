@@ -3,6 +3,9 @@
 
 # In[ ]:
 
+import numpy as np
+import pandas as pd
+
 
 # Determine who will be playing upcoming game for each team
 def assess_teams(OffensePlayerDataNEW1,elo_combined_df):
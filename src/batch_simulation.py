@@ -0,0 +1,231 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from simulation_accumulator import SimulationAccumulator
+from quasi_random import possession_uniforms, check_sampler
+from compact_results import (STAT_LABELS, POINTS_COLUMN, COUNT_DTYPE, FRACTIONAL_COUNT_DTYPE, TOTAL_DTYPE, CompactGameResults,
+                             weighted_counts, calculate_team_metrics_batch)
+from compiled_matrix import (STATES, STATE_INDEX, STATE_CODE_DTYPE, TERMINAL_STATES, TERMINAL_MASK, TERMINAL_POINTS,
+                             matrix_to_array, compile_matrix)
+
+
+# Vectorized versions of the simulation functions. Every possession of every simulated game is
+# advanced together on uint8 state codes instead of walking one possession at a time, and games are
+# kept as integer counts (see compact_results) until their metrics are needed.
+
+REGULATION_SECONDS = 2400
+OVERTIME_SECONDS = 300
+
+# stop playing overtimes after this many, in case neither team can score
+MAX_OVERTIMES = 10
+
+
+# simulate many possessions at once, returning state counts and points for each possession group.
+# uniforms (num_possessions x max_steps) fixes the draw used at every step of every possession, so two
+# matrices run on the same uniforms stay paired possession by possession. With fewer columns than max_steps
+# only the first steps are fixed and later steps draw from rng.
+def simulate_possessions_batch(transition_matrix, group_index, num_groups, rng, max_steps=25, uniforms=None):
+    # compiled once (see compiled_matrix) and shared by every possession of the batch
+    compiled = compile_matrix(transition_matrix)
+    num_possessions = len(group_index)
+
+    counts = np.zeros(num_groups * len(STATES), dtype=np.int64)
+    state = np.zeros(num_possessions, dtype=STATE_CODE_DTYPE)
+    ft_one_made = np.zeros(num_possessions, dtype=bool)
+
+    # every possession starts in 'Initial Possession', which the reference Counter also tallies
+    counts += np.bincount(group_index * len(STATES), minlength=num_groups * len(STATES))
+
+    active = np.arange(num_possessions)
+    for step in range(max_steps):
+        if len(active) == 0:
+            break
+        draws = rng.random(len(active)) if uniforms is None or step >= uniforms.shape[1] else uniforms[active, step]
+        next_state = compiled.draw(state[active], draws)
+        state[active] = next_state
+
+        counts += np.bincount(group_index[active] * len(STATES) + next_state, minlength=num_groups * len(STATES))
+        ft_one_made[active] |= next_state == STATE_INDEX['FT Make 1']
+
+        active = active[~TERMINAL_MASK[next_state]]
+
+    possession_points = TERMINAL_POINTS[state] * TERMINAL_MASK[state] + ft_one_made
+    points = np.bincount(group_index, weights=possession_points, minlength=num_groups)
+
+    return counts.reshape(num_groups, len(STATES)).astype(TOTAL_DTYPE), points.astype(TOTAL_DTYPE)
+
+
+# simulate num_games games for one team, returning per game counts (columns of STAT_LABELS) of the whole possessions
+# and of the fractional possession, which is only played by games with a fraction of a possession left over.
+# simmedpossessions is one number for every game or an array with each game's own possession count,
+# the ragged counts are flattened into one possession array so there is no loop over games.
+# uniforms (num_games x possession slots x max_steps) optionally fixes the draws, the fractional possession uses slot int(possessions).
+def simulate_team_games_compact(transition_matrix, num_games, simmedpossessions, rng, max_steps=25, uniforms=None):
+    possessions = np.broadcast_to(np.asarray(simmedpossessions, dtype=float), (num_games,))
+    full_possessions = possessions.astype(np.int64)
+    fractional_possession = possessions - full_possessions
+
+    counts = np.zeros((num_games, len(STAT_LABELS)), dtype=COUNT_DTYPE)
+    fractional_counts = np.zeros((num_games, len(STAT_LABELS)), dtype=FRACTIONAL_COUNT_DTYPE)
+
+    game_index = np.repeat(np.arange(num_games), full_possessions)
+    full_uniforms = None
+    if uniforms is not None:
+        played = np.arange(uniforms.shape[1])[None, :] < full_possessions[:, None]
+        full_uniforms = uniforms[:, :, :max_steps][played]
+    counts[:, :POINTS_COLUMN], counts[:, POINTS_COLUMN] = simulate_possessions_batch(transition_matrix, game_index, num_games, rng,
+                                                                                     max_steps, full_uniforms)
+
+    fractional_games = np.flatnonzero(fractional_possession > 0)
+    if len(fractional_games) > 0:
+        fractional_uniforms = None if uniforms is None else uniforms[fractional_games, full_possessions[fractional_games], :max_steps]
+        fractional_state_counts, fractional_points = simulate_possessions_batch(transition_matrix, np.arange(len(fractional_games)),
+                                                                                len(fractional_games), rng, max_steps, fractional_uniforms)
+        fractional_counts[fractional_games, :POINTS_COLUMN] = fractional_state_counts
+        fractional_counts[fractional_games, POINTS_COLUMN] = fractional_points
+
+    return counts, fractional_counts
+
+
+# simulate num_games games for one team, returning per game state counts and points as floats,
+# the fractional possession weighted by the fraction left over (see simulate_team_games_compact)
+def simulate_team_games_batch(transition_matrix, num_games, simmedpossessions, rng, max_steps=25, uniforms=None):
+    counts = weighted_counts(*simulate_team_games_compact(transition_matrix, num_games, simmedpossessions, rng, max_steps, uniforms),
+                             simmedpossessions)
+    return counts[:, :POINTS_COLUMN], counts[:, POINTS_COLUMN]
+
+
+# possessions per team for each simulated game, drawn from a normal pace distribution around simmedpossessions
+def draw_game_possessions(simmedpossessions, num_games, pace_dispersion, rng):
+    return np.maximum(rng.normal(simmedpossessions, pace_dispersion, num_games), 1)
+
+
+# possessions per team in a 5 minute overtime, the same pace as regulation
+def overtime_possessions(simmedpossessions):
+    return simmedpossessions * OVERTIME_SECONDS / REGULATION_SECONDS
+
+
+# play overtime periods for the tied games only. team_points (2 x games, regulation points of team a and team b)
+# is updated in place. returns the number of overtimes each game needed, the games that needed any, their
+# possessions per overtime and both teams' whole and fractional possession counts over all their overtimes.
+def simulate_overtimes_batch(team_a_matrix, team_b_matrix, team_points, simmedpossessions, rng, max_steps=25):
+    num_games = team_points.shape[1]
+    overtimes = np.zeros(num_games, dtype=np.int64)
+    tied = np.flatnonzero(team_points[0] == team_points[1])
+    possessions = np.broadcast_to(overtime_possessions(np.asarray(simmedpossessions, dtype=float)), (num_games,))
+    counts = np.zeros((2, num_games, len(STAT_LABELS)), dtype=COUNT_DTYPE)
+    fractional_counts = np.zeros((2, num_games, len(STAT_LABELS)), dtype=COUNT_DTYPE)
+
+    for _ in range(MAX_OVERTIMES):
+        if len(tied) == 0:
+            break
+        for team, transition_matrix in enumerate((team_a_matrix, team_b_matrix)):
+            overtime_counts, overtime_fractional_counts = simulate_team_games_compact(transition_matrix, len(tied), possessions[tied],
+                                                                                      rng, max_steps)
+            counts[team, tied] += overtime_counts
+            fractional_counts[team, tied] += overtime_fractional_counts
+            team_points[team, tied] += weighted_counts(overtime_counts, overtime_fractional_counts, possessions[tied])[:, POINTS_COLUMN]
+        overtimes[tied] += 1
+        tied = tied[team_points[0, tied] == team_points[1, tied]]
+
+    overtime_index = np.flatnonzero(overtimes)
+    return (overtimes, overtime_index, possessions[overtime_index], counts[:, overtime_index],
+            fractional_counts[:, overtime_index])
+
+
+# simulate games as compact integer counts, the same draws as run_multiple_games_batch (see its parameters)
+def simulate_games_compact(team_a_matrix, team_b_matrix, num_games, simmedpossessions, rng=None, max_steps=25, uniforms=None,
+                           overtime=False, pace_dispersion=None, sampler='random'):
+    check_sampler(sampler)
+    rng = np.random.default_rng() if rng is None else rng
+    team_a_matrix = compile_matrix(team_a_matrix)
+    team_b_matrix = compile_matrix(team_b_matrix)
+
+    game_possessions = simmedpossessions
+    if pace_dispersion:
+        game_possessions = draw_game_possessions(simmedpossessions, num_games, pace_dispersion, rng)
+
+    if uniforms is None and sampler != 'random':
+        # one slot per whole possession plus the fractional possession
+        slots = int(np.max(game_possessions)) + 1
+        uniforms = (possession_uniforms(num_games, slots, rng, sampler), possession_uniforms(num_games, slots, rng, sampler))
+
+    team_a_uniforms, team_b_uniforms = (None, None) if uniforms is None else uniforms
+    team_a_counts, team_a_fractional = simulate_team_games_compact(team_a_matrix, num_games, game_possessions, rng, max_steps,
+                                                                   team_a_uniforms)
+    team_b_counts, team_b_fractional = simulate_team_games_compact(team_b_matrix, num_games, game_possessions, rng, max_steps,
+                                                                   team_b_uniforms)
+    counts = np.stack([team_a_counts, team_b_counts])
+    fractional_counts = np.stack([team_a_fractional, team_b_fractional])
+
+    overtime_results = ()
+    if overtime:
+        team_points = np.vstack([weighted_counts(counts[team], fractional_counts[team], game_possessions)[:, POINTS_COLUMN]
+                                 for team in range(2)])
+        overtime_results = simulate_overtimes_batch(team_a_matrix, team_b_matrix, team_points, game_possessions, rng, max_steps)
+
+    return CompactGameResults(counts, fractional_counts, game_possessions, *overtime_results)
+
+
+# simulate multiple games with every possession advanced together
+def run_multiple_games_batch(team_a_matrix, team_b_matrix, num_games, simmedpossessions, rng=None, max_steps=25, uniforms=None,
+                             overtime=False, pace_dispersion=None, sampler='random'):
+
+    '''
+    Batched replacement for run_multiple_games.
+
+    Returns a pair of metric dictionaries (team a, team b) where each value is an array with one
+    entry per simulated game, along with simmedpossessions.
+
+    Parameters:
+        team_a_matrix (DataFrame, array or CompiledMatrix): Home team transition matrix (e.g., HomeTeamMatrix)
+        team_b_matrix (DataFrame, array or CompiledMatrix): Away team transition matrix (e.g., AwayTeamMatrix)
+        num_games (int): Number of games to simulate
+        simmedpossessions (float): Possessions per team per game
+        rng (Generator): numpy random generator (default np.random.default_rng())
+        uniforms (tuple): Optional pre-drawn uniforms for team a and team b, each num_games x possession slots x max_steps
+        overtime (bool): Play overtimes until tied games are decided, adding an 'Overtimes' entry per game (default False).
+                         Overtime possessions always draw from rng, not from uniforms
+        pace_dispersion (float): Standard deviation of each game's possessions around simmedpossessions, both teams
+                                 get the same count (default None, every game plays simmedpossessions)
+        sampler (str): 'random' (pseudo random draws), 'stratified' (Latin hypercube) or 'sobol' (scrambled Sobol, needs
+                       scipy) for the first draws of every possession, see quasi_random (default 'random')
+    '''
+
+    results = simulate_games_compact(team_a_matrix, team_b_matrix, num_games, simmedpossessions, rng, max_steps, uniforms,
+                                     overtime=overtime, pace_dispersion=pace_dispersion, sampler=sampler)
+
+    return results.metrics(), simmedpossessions
+
+
+# simulate games in chunks, adding each chunk to an accumulator so memory does not grow with num_games.
+# every chunk is its own stratified or Sobol sample, Sobol chunks are a power of two games.
+def run_multiple_games_batch_streaming(team_a_matrix, team_b_matrix, num_games, simmedpossessions, rng=None,
+                                       accumulator=None, chunk_size=5000, max_steps=25, overtime=False, pace_dispersion=None,
+                                       sampler='random'):
+    rng = np.random.default_rng() if rng is None else rng
+    if sampler == 'sobol':
+        chunk_size = 1 << int(np.log2(chunk_size))
+    accumulator = SimulationAccumulator() if accumulator is None else accumulator
+    team_a_matrix = compile_matrix(team_a_matrix)
+    team_b_matrix = compile_matrix(team_b_matrix)
+
+    for chunk_start in range(0, num_games, chunk_size):
+        chunk_games = min(chunk_size, num_games - chunk_start)
+        accumulator.add_batch(simulate_games_compact(team_a_matrix, team_b_matrix, chunk_games, simmedpossessions, rng, max_steps,
+                                                     overtime=overtime, pace_dispersion=pace_dispersion, sampler=sampler))
+
+    return accumulator, simmedpossessions
+
+
+# same output as analyze_results, for results produced by run_multiple_games_batch
+def analyze_batch_results(results, simmedpossessions, team_a_name, team_b_name):
+    accumulator = SimulationAccumulator().add_batch(results)
+
+    results_df = accumulator.results_df(simmedpossessions, team_a_name, team_b_name)
+
+    return results_df
@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import os
+import time
+import tracemalloc
+import numpy as np
+import pandas as pd
+from transition_matrices import league_average_transition_matrix, transition_probability_matrix
+from parallel_simulation import run_multiple_games_parallel
+from batch_simulation import run_multiple_games_batch, run_multiple_games_batch_streaming, simulate_games_compact
+from quasi_random import qmc
+from compact_results import CompactGameResults
+from compiled_matrix import compile_matrix
+from simulation_functions import simulate_game_metrics
+from clock_simulation import UNIT_DURATION_TABLE, matchup_duration_tables, run_multiple_games_clock_streaming
+
+
+# Benchmarks for the simulation engines, run against league average transition matrices so they
+# do not need any collected data.
+
+# time one call and return (seconds, result)
+def _timed(function, *args, **kwargs):
+    start = time.perf_counter()
+    result = function(*args, **kwargs)
+    return time.perf_counter() - start, result
+
+
+# speedup of run_multiple_games_parallel against the number of worker processes
+def benchmark_parallel_speedup(team_a_matrix=None, team_b_matrix=None, simmedpossessions=72.4, num_games=40000,
+                               worker_counts=None, seed=2024):
+    team_a_matrix = league_average_transition_matrix() if team_a_matrix is None else team_a_matrix
+    team_b_matrix = league_average_transition_matrix() if team_b_matrix is None else team_b_matrix
+
+    if worker_counts is None:
+        cpu_count = os.cpu_count() or 1
+        worker_counts = [workers for workers in [1, 2, 4, 8, 16, 32] if workers <= cpu_count]
+
+    rows = []
+    for workers in worker_counts:
+        seconds, (results, _) = _timed(run_multiple_games_parallel, team_a_matrix, team_b_matrix, num_games,
+                                       simmedpossessions, workers, seed=seed)
+
+        # rerun with the same seed and worker count to confirm the merged results are identical
+        repeat, _ = run_multiple_games_parallel(team_a_matrix, team_b_matrix, num_games, simmedpossessions, workers, seed=seed)
+        identical = all(np.array_equal(results[team][key], repeat[team][key]) for team in (0, 1) for key in results[team])
+
+        rows.append({'Workers': workers, 'Simulations': num_games, 'Seconds': seconds,
+                     'Games Per Second': num_games / seconds, 'Reproducible': identical})
+
+    benchmark = pd.DataFrame(rows)
+    benchmark['Speedup'] = benchmark['Seconds'].iloc[0] / benchmark['Seconds']
+
+    return benchmark
+
+
+# games per second of the clock aware engine against the possession count batch engine
+def benchmark_clock_throughput(team_a_matrix=None, team_b_matrix=None, simmedpossessions=72.4, num_games=40000, seed=2024):
+    team_a_matrix = league_average_transition_matrix() if team_a_matrix is None else team_a_matrix
+    team_b_matrix = league_average_transition_matrix() if team_b_matrix is None else team_b_matrix
+    duration_tables = matchup_duration_tables(UNIT_DURATION_TABLE, UNIT_DURATION_TABLE, simmedpossessions)
+
+    batch_seconds, _ = _timed(run_multiple_games_batch_streaming, team_a_matrix, team_b_matrix, num_games, simmedpossessions,
+                              rng=np.random.default_rng(seed))
+    clock_seconds, (_, possessions, _) = _timed(run_multiple_games_clock_streaming, team_a_matrix, team_b_matrix, num_games,
+                                                duration_tables, rng=np.random.default_rng(seed))
+
+    benchmark = pd.DataFrame([{'Engine': 'batch', 'Simulations': num_games, 'Seconds': batch_seconds, 'Possessions': simmedpossessions},
+                              {'Engine': 'clock', 'Simulations': num_games, 'Seconds': clock_seconds, 'Possessions': possessions}])
+    benchmark['Games Per Second'] = num_games / benchmark['Seconds']
+    benchmark['Relative Time'] = benchmark['Seconds'] / batch_seconds
+
+    return benchmark
+
+
+# memory of num_games simulated games kept as CompactGameResults, as float metric arrays and as the reference
+# engine's list of metric dictionaries (measured on reference_games games and scaled up)
+def benchmark_result_memory(team_a_matrix=None, team_b_matrix=None, simmedpossessions=72.4, num_games=1000000, chunk_size=50000,
+                            reference_games=5000, seed=2024):
+    team_a_matrix = compile_matrix(league_average_transition_matrix() if team_a_matrix is None else team_a_matrix)
+    team_b_matrix = compile_matrix(league_average_transition_matrix() if team_b_matrix is None else team_b_matrix)
+    rng = np.random.default_rng(seed)
+
+    compact = CompactGameResults.concatenate(
+        simulate_games_compact(team_a_matrix, team_b_matrix, min(chunk_size, num_games - chunk_start), simmedpossessions, rng,
+                               overtime=True)
+        for chunk_start in range(0, num_games, chunk_size))
+    metric_bytes = sum(values.nbytes for metrics in compact.metrics() for values in metrics.values())
+
+    np.random.seed(seed)
+    tracemalloc.start()
+    reference = [simulate_game_metrics(team_a_matrix, team_b_matrix, simmedpossessions, overtime=True) for _ in range(reference_games)]
+    reference_bytes = tracemalloc.get_traced_memory()[0] * num_games / len(reference)
+    tracemalloc.stop()
+
+    benchmark = pd.DataFrame([{'Representation': 'compact counts', 'Megabytes': compact.nbytes / 1e6},
+                              {'Representation': 'metric arrays', 'Megabytes': metric_bytes / 1e6},
+                              {'Representation': 'reference dictionaries', 'Megabytes': reference_bytes / 1e6}])
+    benchmark['Simulations'] = num_games
+    benchmark['Bytes Per Game'] = benchmark['Megabytes'] * 1e6 / num_games
+    benchmark['Relative Size'] = benchmark['Megabytes'] / benchmark['Megabytes'].iloc[0]
+
+    return benchmark
+
+
+# league average matrix with the shooting percentages moved by shooting_edge, e.g. 0.03 makes 2pt and 3pt shots 3 points likelier
+def _shooting_matrix(shooting_edge):
+    return transition_probability_matrix(turnover_prob=0.12, ft_attempt_prob=0.09, two_point_attempt_prob=0.41,
+                                         three_point_attempt_prob=0.28, three_made_prob=0.37 + shooting_edge,
+                                         two_made_prob=0.55 + shooting_edge, ft_made_prob=0.78, ft_oreb_prob=0.175,
+                                         two_pt_oreb_prob=0.327, three_pt_oreb_prob=0.300)
+
+
+# variance of the win percentage and supremacy of num_games simulations over replications, for every sampler and
+# matchup, and how many random sampler simulations each sampler's num_games are worth
+def benchmark_sampler_variance(matchups=None, simmedpossessions=72.4, num_games=1024, replications=200, samplers=None, seed=2024):
+    if matchups is None:
+        matchups = {'even': (0.0, 0.0), 'favourite': (0.03, 0.0), 'heavy favourite': (0.06, -0.03)}
+    if samplers is None:
+        # scipy is optional, without it there is no sobol sampler to compare
+        samplers = ['random', 'stratified'] + ([] if qmc is None else ['sobol'])
+
+    rows = []
+    for matchup, (team_a_edge, team_b_edge) in matchups.items():
+        team_a_matrix = compile_matrix(_shooting_matrix(team_a_edge))
+        team_b_matrix = compile_matrix(_shooting_matrix(team_b_edge))
+        for sampler in samplers:
+            rng = np.random.default_rng(seed)
+            win_pcts, supremacies = [], []
+            for _ in range(replications):
+                (team_a_metrics, team_b_metrics), _ = run_multiple_games_batch(team_a_matrix, team_b_matrix, num_games,
+                                                                               simmedpossessions, rng, sampler=sampler)
+                margin = team_a_metrics['Points'] - team_b_metrics['Points']
+                decided = margin[margin != 0]
+                win_pcts.append(np.mean(decided > 0))
+                supremacies.append(np.mean(decided))
+
+            rows.append({'Matchup': matchup, 'Sampler': sampler, 'Simulations': num_games,
+                         'Win Percentage': np.mean(win_pcts), 'Win Percentage Variance': np.var(win_pcts, ddof=1),
+                         'Supremacy': np.mean(supremacies), 'Supremacy Variance': np.var(supremacies, ddof=1)})
+
+    benchmark = pd.DataFrame(rows)
+    random_rows = benchmark[benchmark['Sampler'] == 'random'].set_index('Matchup')
+    for metric in ('Win Percentage', 'Supremacy'):
+        random_variance = benchmark['Matchup'].map(random_rows[f'{metric} Variance'])
+        benchmark[f'{metric} Variance Reduction'] = random_variance / benchmark[f'{metric} Variance']
+    # random sampler simulations needed for the same win percentage variance
+    benchmark['Equivalent Simulations'] = benchmark['Simulations'] * benchmark['Win Percentage Variance Reduction']
+
+    return benchmark
+
+
+if __name__ == '__main__':
+    print(benchmark_parallel_speedup().round(3).to_string(index=False))
+    print(benchmark_clock_throughput().round(3).to_string(index=False))
+    print(benchmark_result_memory().round(3).to_string(index=False))
+    print(benchmark_sampler_variance().round(5).to_string(index=False))
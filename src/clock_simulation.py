@@ -0,0 +1,219 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from batch_simulation import simulate_possessions_batch, calculate_team_metrics_batch, MAX_OVERTIMES
+from simulation_accumulator import SimulationAccumulator
+from compiled_matrix import STATES, compile_matrix
+from transition_matrices import calculate_scaled_pace
+
+
+# Clock aware version of the batch engine. Instead of playing a fixed number of possessions, the two
+# teams alternate possessions whose lengths are drawn from each team's possession duration distribution,
+# and every period ends once 600 seconds have run. The possession that starts before the buzzer is played
+# out. Each team's durations are kept as a small table of quantiles of its observed possession lengths
+# (the Duration of individual_player_breakdown), so a draw is one random byte and a table lookup.
+
+PERIOD_SECONDS = 600
+REGULATION_PERIODS = 4
+OVERTIME_SECONDS = 300
+
+# quantiles kept per duration table, one uint8 draw picks a quantile
+DURATION_QUANTILES = 256
+
+# fewest observed possessions a team needs for its own duration table
+MIN_OBSERVED_POSSESSIONS = 200
+
+# gamma shape of the duration table of a team without enough observed possessions, a coefficient of variation of 0.5
+DURATION_SHAPE = 4
+
+
+# quantiles of a gamma distribution with mean 1, fixed seed so every table is the same
+def unit_duration_table(shape=DURATION_SHAPE, size=DURATION_QUANTILES):
+    sample = np.random.default_rng(0).gamma(shape, 1 / shape, 200000)
+    table = np.quantile(sample, (np.arange(size) + 0.5) / size)
+    return (table / table.mean()).astype(np.float32)
+
+
+UNIT_DURATION_TABLE = unit_duration_table()
+
+
+# duration table from observed possession lengths (e.g., the Duration column of individual_player_breakdown)
+def observed_duration_table(durations, size=DURATION_QUANTILES):
+    durations = np.asarray(durations, dtype=float)
+    durations = durations[durations > 0]
+    return np.quantile(durations, (np.arange(size) + 0.5) / size).astype(np.float32)
+
+
+# Team and Duration of every possession in individual_player_breakdown's OffensePlayerDataNEW1, which has one
+# row per player on court, so each possession is kept once (season keeps only that season)
+def possession_durations(OffensePlayerDataNEW1, season=None):
+    possessions = OffensePlayerDataNEW1.drop_duplicates(subset=['Season', 'Gamecode', 'Team', 'Possession'])
+    if season is not None:
+        possessions = possessions[possessions['Season'] == season]
+    return possessions[['Team', 'Duration']].reset_index(drop=True)
+
+
+# duration table for every team from its observed possession lengths (see possession_durations). A team with
+# fewer than MIN_OBSERVED_POSSESSIONS gets the gamma table, scaled to the seconds per possession of its pace
+def team_duration_tables(teamsDF1, teams=None, durations=None):
+    teams = teamsDF1['Team'].unique() if teams is None else teams
+    tables = {}
+    for team in teams:
+        observed = np.zeros(0) if durations is None else durations.loc[durations['Team'] == team, 'Duration'].to_numpy(dtype=float)
+        if (observed > 0).sum() >= MIN_OBSERVED_POSSESSIONS:
+            tables[team] = observed_duration_table(observed)
+        else:
+            team_df = teamsDF1[teamsDF1['Team'] == team]
+            team_pace = calculate_scaled_pace(team_df['pace_O'].mean(), team_df['pace_D'].mean())
+            tables[team] = UNIT_DURATION_TABLE * np.float32(PERIOD_SECONDS * REGULATION_PERIODS / (2 * team_pace))
+    return tables
+
+
+# rescale both teams' tables so a game averages simmedpossessions per team. A possession that starts
+# before the buzzer is always finished, which adds about (1 + cv^2) / 2 possessions per period.
+def matchup_duration_tables(team_a_table, team_b_table, simmedpossessions):
+    team_a_table = np.asarray(team_a_table, dtype=np.float32)
+    team_b_table = np.asarray(team_b_table, dtype=np.float32)
+    mean_seconds = (team_a_table.mean() + team_b_table.mean()) / 2
+    cv2 = (np.concatenate([team_a_table, team_b_table]).var()) / mean_seconds ** 2
+
+    possessions_per_period = 2 * simmedpossessions / REGULATION_PERIODS - (1 + cv2) / 2
+    target_seconds = PERIOD_SECONDS / max(possessions_per_period, 1)
+    scale = np.float32(target_seconds / mean_seconds)
+
+    return np.stack([team_a_table * scale, team_b_table * scale])
+
+
+# which team has each possession slot and whether it starts before the period ends, shape (games, slots).
+# start_team is 0 when team a has the first possession of the period.
+def simulate_period_clock(duration_tables, start_team, period_seconds, rng):
+    num_games = len(start_team)
+    slots = int(period_seconds / duration_tables.mean() * 1.5) + 8
+
+    while True:
+        slot_team = (start_team[:, None] + np.arange(slots)[None, :]) % 2
+        draws = rng.integers(0, duration_tables.shape[1], (num_games, slots), dtype=np.uint8)
+        durations = duration_tables[slot_team, draws]
+        finished = np.cumsum(durations, axis=1)
+        if num_games == 0 or finished[:, -1].min() >= period_seconds:
+            break
+        slots *= 2
+
+    played = (finished - durations) < period_seconds
+    return slot_team, played
+
+
+# play one period for every game, returning each team's (counts, points, possessions) per game
+def simulate_period_batch(team_matrices, duration_tables, start_team, period_seconds, rng, max_steps=25):
+    num_games = len(start_team)
+    slot_team, played = simulate_period_clock(duration_tables, start_team, period_seconds, rng)
+
+    period = []
+    for team, transition_matrix in enumerate(team_matrices):
+        possessions = (played & (slot_team == team)).sum(axis=1)
+        game_index = np.repeat(np.arange(num_games), possessions)
+        counts, points = simulate_possessions_batch(transition_matrix, game_index, num_games, rng, max_steps)
+        period.append((counts.astype(float), points, possessions))
+    return period
+
+
+def run_multiple_games_clock(team_a_matrix, team_b_matrix, num_games, duration_tables, rng=None, max_steps=25, overtime=False):
+
+    '''
+    Clock aware replacement for run_multiple_games_batch.
+
+    Returns a pair of metric dictionaries (team a, team b) where each value is an array with one
+    entry per simulated game, the points of every period, shape (games, 5, 2) with overtimes in
+    the last period column, and each team's possessions played, shape (2, games).
+
+    Parameters:
+        team_a_matrix (DataFrame, array or CompiledMatrix): Home team transition matrix (e.g., HomeTeamMatrix)
+        team_b_matrix (DataFrame, array or CompiledMatrix): Away team transition matrix (e.g., AwayTeamMatrix)
+        num_games (int): Number of games to simulate
+        duration_tables (array): Team a and team b possession duration tables (e.g., from matchup_duration_tables)
+        rng (Generator): numpy random generator (default np.random.default_rng())
+        overtime (bool): Play 5 minute overtimes until tied games are decided, adding an 'Overtimes' entry per game (default False)
+    '''
+
+    rng = np.random.default_rng() if rng is None else rng
+    team_matrices = (compile_matrix(team_a_matrix), compile_matrix(team_b_matrix))
+    duration_tables = np.asarray(duration_tables, dtype=np.float32)
+
+    counts = np.zeros((2, num_games, len(STATES)))
+    possessions = np.zeros((2, num_games))
+    period_points = np.zeros((num_games, REGULATION_PERIODS + 1, 2))
+
+    # jump ball, then the possession arrow alternates the first possession of each period
+    jump_ball = rng.integers(0, 2, num_games)
+    for period in range(REGULATION_PERIODS):
+        results = simulate_period_batch(team_matrices, duration_tables, (jump_ball + period) % 2, PERIOD_SECONDS, rng, max_steps)
+        for team, (team_counts, team_points, team_possessions) in enumerate(results):
+            counts[team] += team_counts
+            possessions[team] += team_possessions
+            period_points[:, period, team] = team_points
+
+    overtimes = np.zeros(num_games, dtype=np.int64)
+    if overtime:
+        tied = np.flatnonzero(period_points[:, :, 0].sum(axis=1) == period_points[:, :, 1].sum(axis=1))
+        for _ in range(MAX_OVERTIMES):
+            if len(tied) == 0:
+                break
+            start_team = (jump_ball[tied] + REGULATION_PERIODS + overtimes[tied]) % 2
+            results = simulate_period_batch(team_matrices, duration_tables, start_team, OVERTIME_SECONDS, rng, max_steps)
+            for team, (team_counts, team_points, team_possessions) in enumerate(results):
+                counts[team, tied] += team_counts
+                possessions[team, tied] += team_possessions
+                period_points[tied, REGULATION_PERIODS, team] += team_points
+            overtimes[tied] += 1
+            tied = tied[period_points[tied, :, 0].sum(axis=1) == period_points[tied, :, 1].sum(axis=1)]
+
+    team_a_metrics = calculate_team_metrics_batch(counts[0], period_points[:, :, 0].sum(axis=1))
+    team_b_metrics = calculate_team_metrics_batch(counts[1], period_points[:, :, 1].sum(axis=1))
+
+    # Assign each team's DREB metric to the opposing team's metrics
+    team_a_metrics['DREB'] = team_b_metrics['Opp DREB']
+    team_b_metrics['DREB'] = team_a_metrics['Opp DREB']
+
+    if overtime:
+        team_a_metrics['Overtimes'] = overtimes
+        team_b_metrics['Overtimes'] = overtimes
+
+    return (team_a_metrics, team_b_metrics), period_points, possessions
+
+
+# average points per period over the decided games, one row per quarter plus overtime
+def period_lines_df(period_totals, num_games, team_a_name, team_b_name):
+    averages = period_totals / num_games if num_games > 0 else period_totals * np.nan
+    period_lines = pd.DataFrame({'Period': [f"Q{period + 1}" for period in range(REGULATION_PERIODS)] + ['OT'],
+                                 team_a_name: averages[:, 0],
+                                 team_b_name: averages[:, 1]})
+    period_lines['Supremacy'] = period_lines[team_a_name] - period_lines[team_b_name]
+    period_lines['Total'] = period_lines[team_a_name] + period_lines[team_b_name]
+    return period_lines
+
+
+# simulate clock aware games in chunks, adding each chunk to an accumulator and summing the period lines.
+# returns the accumulator, the average possessions per team and the period point totals of the decided games.
+def run_multiple_games_clock_streaming(team_a_matrix, team_b_matrix, num_games, duration_tables, rng=None, accumulator=None,
+                                       chunk_size=5000, max_steps=25, overtime=False):
+    rng = np.random.default_rng() if rng is None else rng
+    accumulator = SimulationAccumulator() if accumulator is None else accumulator
+    team_a_matrix = compile_matrix(team_a_matrix)
+    team_b_matrix = compile_matrix(team_b_matrix)
+    period_totals = np.zeros((REGULATION_PERIODS + 1, 2))
+    possessions_played = 0
+
+    for chunk_start in range(0, num_games, chunk_size):
+        chunk_games = min(chunk_size, num_games - chunk_start)
+        results, period_points, possessions = run_multiple_games_clock(team_a_matrix, team_b_matrix, chunk_games, duration_tables, rng,
+                                                                       max_steps, overtime=overtime)
+        accumulator.add_batch(results)
+        decided = results[0]['Points'] != results[1]['Points']
+        period_totals += period_points[decided].sum(axis=0)
+        possessions_played += possessions.mean(axis=0).sum()
+
+    return accumulator, possessions_played / max(num_games, 1), period_totals
@@ -0,0 +1,198 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+from collections import Counter
+import numpy as np
+from compiled_matrix import STATES, STATE_INDEX
+
+
+# Compact per game results. A simulated game is kept as fixed width integer counts of every state
+# (uint8 state codes while simulating, int16 counts per game afterwards) instead of Counters of labels or
+# float metric dictionaries, and turned into team metrics only when they are needed. STAT_LABELS is the one
+# mapping from count columns back to the labels calculate_team_metrics reads.
+
+# count columns of a game: every state of STATES (column = state code), then points
+STAT_LABELS = STATES + ['Points']
+POINTS_COLUMN = len(STATES)
+
+# whole possession counts per game, and the counts of the single fractional possession
+COUNT_DTYPE = np.int16
+FRACTIONAL_COUNT_DTYPE = np.uint8
+
+# totals over groups of possessions that are not single games
+TOTAL_DTYPE = np.int32
+
+# points of a possession from the states it went through, same rules as calculate_possession_stats
+# ('FT Make 1' counts once however many times it appears)
+POSSESSION_POINTS = [3 if s == '3pt Make' else 2 if s == '2pt Make' else 1 if s in ('FT Make 1', 'FT Make 2') else 0
+                     for s in STATES]
+
+
+def possession_points(codes):
+    return sum(POSSESSION_POINTS[code] for code in set(codes))
+
+
+# count row of a list of state codes and the points they scored
+def count_row(codes, points):
+    row = np.bincount(np.asarray(codes, dtype=np.intp), minlength=len(STAT_LABELS))
+    row[POINTS_COLUMN] = points
+    return row
+
+
+# Counter of labels from a count row, in the format calculate_team_metrics reads
+def stats_counter(row):
+    return Counter({STAT_LABELS[column]: row[column] for column in np.flatnonzero(row)})
+
+
+# look up a column of state counts, with unknown labels counting as zero like a Counter
+def _state_count(counts, state):
+    if state in STATE_INDEX:
+        return counts[:, STATE_INDEX[state]]
+    return np.zeros(len(counts))
+
+
+def _safe_ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+# team metrics for every simulated game, same keys and formulas as calculate_team_metrics
+def calculate_team_metrics_batch(counts, points):
+    metrics = {}
+    metrics['3pt Attempts'] = _state_count(counts, '3pt Attempt')
+    metrics['3pt Makes'] = _state_count(counts, '3pt Make')
+    metrics['2pt Attempts'] = _state_count(counts, '2pt Attempt')
+    metrics['2pt Makes'] = _state_count(counts, '2pt Make')
+    metrics['FT Attempts'] = _state_count(counts, 'FT Attempt 1') + _state_count(counts, 'FT Attempt 2')
+    metrics['FT Makes'] = _state_count(counts, 'FT Make 1') + _state_count(counts, 'FT Make 2')
+    metrics['OREB'] = _state_count(counts, '2pt Oreb') + _state_count(counts, '3pt Oreb') + _state_count(counts, 'FT Oreb')
+    metrics['Non-OREB'] = _state_count(counts, '2pt NonOreb') + _state_count(counts, '3pt NonOreb') + _state_count(counts, 'FT NonOreb')
+    metrics['Points'] = points
+    metrics['Turnovers'] = _state_count(counts, 'Turnover')
+    metrics['Misses'] = _state_count(counts, '2pt Miss') + _state_count(counts, '3pt Miss') + _state_count(counts, 'FT Attempt 2 Miss')
+    metrics['Opp DREB'] = metrics['Misses'] - metrics['OREB']
+
+    metrics['3pt%'] = _safe_ratio(metrics['3pt Makes'], metrics['3pt Attempts'])
+    metrics['2pt%'] = _safe_ratio(metrics['2pt Makes'], metrics['2pt Attempts'])
+    metrics['FT%'] = _safe_ratio(metrics['FT Makes'], metrics['FT Attempts'])
+    metrics['FTA%'] = _safe_ratio(metrics['FT Attempts'], metrics['2pt Attempts'] + metrics['3pt Attempts'])
+    metrics['OR%'] = _safe_ratio(metrics['OREB'], metrics['OREB'] + metrics['Opp DREB'])
+
+    return metrics
+
+
+def _fraction(possessions):
+    return possessions - possessions.astype(np.int64)
+
+
+# float counts of games from their whole possession counts and fractional possession counts,
+# the fractional possession weighted by what is left of possessions after the whole ones
+def weighted_counts(counts, fractional_counts, possessions):
+    fraction = _fraction(np.broadcast_to(np.asarray(possessions, dtype=float), (len(counts),)))
+    weighted = counts.astype(float)
+    fractional_games = np.flatnonzero(fraction > 0)
+    weighted[fractional_games] += fractional_counts[fractional_games] * fraction[fractional_games, None]
+    return weighted
+
+
+class CompactGameResults:
+
+    '''
+    Simulated games of one matchup as integer state counts, about 140 bytes per game.
+
+    Each team's game is int(possessions) whole possessions, counted in counts, plus one possession weighted
+    by the fraction left over, counted in fractional_counts. Overtime counts are kept only for the games
+    that went to overtime. metrics() rebuilds the same metric dictionaries as run_multiple_games_batch.
+
+    Parameters:
+        counts (array): Whole possession counts, shape (2, games, len(STAT_LABELS)) (team a, team b)
+        fractional_counts (array): Counts of the fractional possession, same shape
+        possessions (float or array): Possessions per team, one number or one per game
+        overtimes (array): Overtimes played per game, None when simulated without overtime (default None)
+        overtime_index (array): Games that went to overtime (default None)
+        overtime_possessions (array): Possessions per team in each overtime of those games
+        overtime_counts (array): Whole possession counts of all their overtimes, shape (2, overtime games, len(STAT_LABELS))
+        overtime_fractional_counts (array): Fractional possession counts of all their overtimes, same shape
+    '''
+
+    def __init__(self, counts, fractional_counts, possessions, overtimes=None, overtime_index=None, overtime_possessions=None,
+                 overtime_counts=None, overtime_fractional_counts=None):
+        self.counts = np.asarray(counts, dtype=COUNT_DTYPE)
+        self.fractional_counts = np.asarray(fractional_counts, dtype=FRACTIONAL_COUNT_DTYPE)
+        self.possessions = possessions if np.ndim(possessions) == 0 else np.asarray(possessions, dtype=float)
+        self.overtimes = None if overtimes is None else np.asarray(overtimes, dtype=np.uint8)
+
+        num_overtime_games = 0 if overtime_index is None else len(overtime_index)
+        empty = np.zeros((2, num_overtime_games, len(STAT_LABELS)))
+        self.overtime_index = np.zeros(0, dtype=np.int64) if overtime_index is None else np.asarray(overtime_index, dtype=np.int64)
+        self.overtime_possessions = np.zeros(0) if overtime_possessions is None else np.asarray(overtime_possessions, dtype=float)
+        self.overtime_counts = np.asarray(empty if overtime_counts is None else overtime_counts, dtype=COUNT_DTYPE)
+        self.overtime_fractional_counts = np.asarray(empty if overtime_fractional_counts is None else overtime_fractional_counts,
+                                                     dtype=COUNT_DTYPE)
+
+    def __len__(self):
+        return self.counts.shape[1]
+
+    @property
+    def nbytes(self):
+        arrays = [self.counts, self.fractional_counts, self.overtime_index, self.overtime_possessions, self.overtime_counts,
+                  self.overtime_fractional_counts, np.asarray(self.possessions)] + ([] if self.overtimes is None else [self.overtimes])
+        return sum(array.nbytes for array in arrays)
+
+    def game_possessions(self):
+        return np.broadcast_to(np.asarray(self.possessions, dtype=float), (len(self),))
+
+    # counts and points of every game of one team (0 = team a, 1 = team b) as floats, fractional possessions weighted
+    def team_counts(self, team):
+        counts = weighted_counts(self.counts[team], self.fractional_counts[team], self.possessions)
+        if len(self.overtime_index) > 0:
+            counts[self.overtime_index] += weighted_counts(self.overtime_counts[team], self.overtime_fractional_counts[team],
+                                                           self.overtime_possessions)
+
+        return counts[:, :POINTS_COLUMN], counts[:, POINTS_COLUMN]
+
+    # pair of metric dictionaries (team a, team b), each value an array with one entry per game
+    def metrics(self):
+        team_a_metrics = calculate_team_metrics_batch(*self.team_counts(0))
+        team_b_metrics = calculate_team_metrics_batch(*self.team_counts(1))
+
+        # Assign each team's DREB metric to the opposing team's metrics
+        team_a_metrics['DREB'] = team_b_metrics['Opp DREB']
+        team_b_metrics['DREB'] = team_a_metrics['Opp DREB']
+
+        if self.overtimes is not None:
+            overtimes = self.overtimes.astype(np.int64)
+            team_a_metrics['Overtimes'] = overtimes
+            team_b_metrics['Overtimes'] = overtimes
+
+        return team_a_metrics, team_b_metrics
+
+    # the games where mask is True (boolean array with one entry per game)
+    def select(self, mask):
+        mask = np.asarray(mask, dtype=bool)
+        keep = mask[self.overtime_index]
+        new_index = np.cumsum(mask) - 1
+        return CompactGameResults(self.counts[:, mask], self.fractional_counts[:, mask],
+                                  self.possessions if np.ndim(self.possessions) == 0 else self.possessions[mask],
+                                  None if self.overtimes is None else self.overtimes[mask],
+                                  new_index[self.overtime_index[keep]], self.overtime_possessions[keep],
+                                  self.overtime_counts[:, keep], self.overtime_fractional_counts[:, keep])
+
+    # join results in order, e.g. the chunks of several workers
+    @classmethod
+    def concatenate(cls, results):
+        results = list(results)
+        offsets = np.cumsum([0] + [len(result) for result in results])
+        possessions = results[0].possessions
+        if not all(np.ndim(result.possessions) == 0 and result.possessions == possessions for result in results):
+            possessions = np.concatenate([result.game_possessions() for result in results])
+
+        return cls(np.concatenate([result.counts for result in results], axis=1),
+                   np.concatenate([result.fractional_counts for result in results], axis=1),
+                   possessions,
+                   None if results[0].overtimes is None else np.concatenate([result.overtimes for result in results]),
+                   np.concatenate([result.overtime_index + offset for result, offset in zip(results, offsets)]),
+                   np.concatenate([result.overtime_possessions for result in results]),
+                   np.concatenate([result.overtime_counts for result in results], axis=1),
+                   np.concatenate([result.overtime_fractional_counts for result in results], axis=1))
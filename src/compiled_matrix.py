@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+
+
+# Transition matrices compiled once per matchup for fast sampling. States become integer codes and each
+# row gets a Walker alias table, so drawing the next state is O(1) from a single uniform number
+# instead of a pandas row lookup plus np.random.choice re-validating the probabilities.
+
+STATES = [
+    'Initial Possession', '3pt Attempt', '3pt Make', '3pt Miss',
+    '2pt Attempt', '2pt Make', '2pt Miss',
+    'Trip to FT Line', 'FT Attempt 1', 'FT Attempt 2',
+    'FT Make 1', 'FT Miss 1', 'FT Make 2', 'FT Miss 2',
+    'Turnover', '2pt Oreb', '3pt Oreb', 'FT Oreb',
+    '2pt NonOreb', '3pt NonOreb', 'FT NonOreb', 'End Possession']
+
+STATE_INDEX = {state: code for code, state in enumerate(STATES)}
+
+# every state code fits in one byte
+STATE_CODE_DTYPE = np.uint8
+
+TERMINAL_STATES = ['3pt Make', '2pt Make', 'FT Make 2', 'Turnover',
+                   '2pt NonOreb', '3pt NonOreb', 'FT NonOreb']
+
+TERMINAL_MASK = np.isin(STATES, TERMINAL_STATES)
+
+# bit i is set when state code i ends a possession
+TERMINAL_BITS = sum(1 << STATE_INDEX[state] for state in TERMINAL_STATES)
+
+# points credited when a possession ends in each state (same rules as calculate_possession_stats,
+# where 'FT Make 1' is added separately if it appears anywhere in the possession)
+TERMINAL_POINTS = np.array([3 if s == '3pt Make' else 2 if s == '2pt Make' else 1 if s == 'FT Make 2' else 0
+                            for s in STATES], dtype=np.int8)
+
+
+# convert a transition matrix DataFrame to a numpy array ordered by STATES
+def matrix_to_array(transition_matrix):
+    if isinstance(transition_matrix, CompiledMatrix):
+        return transition_matrix.probabilities
+    if isinstance(transition_matrix, pd.DataFrame):
+        transition_matrix = transition_matrix.reindex(index=STATES, columns=STATES).fillna(0).to_numpy(dtype=float)
+    return np.asarray(transition_matrix, dtype=float)
+
+
+# normalize each row of a transition matrix so rows with any counts sum to 1
+def normalize_rows(transition_array):
+    row_sums = transition_array.sum(axis=1, keepdims=True)
+    return np.divide(transition_array, row_sums, out=np.zeros_like(transition_array), where=row_sums > 0)
+
+
+# Walker alias table for every row (Vose's method). Column k is kept with probability alias_prob[row, k],
+# otherwise the draw moves to alias[row, k]. Rows with no probability point back at their own state.
+def build_alias_tables(probabilities):
+    num_rows, num_columns = probabilities.shape
+    alias_prob = np.ones((num_rows, num_columns))
+    alias = np.tile(np.arange(num_columns), (num_rows, 1))
+
+    for row in range(num_rows):
+        if probabilities[row].sum() <= 0:
+            alias_prob[row] = 0
+            alias[row] = row
+            continue
+
+        scaled = probabilities[row] * num_columns
+        small = [column for column in range(num_columns) if scaled[column] < 1]
+        large = [column for column in range(num_columns) if scaled[column] >= 1]
+
+        while small and large:
+            less, more = small.pop(), large.pop()
+            alias_prob[row, less] = scaled[less]
+            alias[row, less] = more
+            scaled[more] = scaled[more] + scaled[less] - 1
+            (small if scaled[more] < 1 else large).append(more)
+
+        # anything left over is 1 up to rounding error
+        for column in small + large:
+            alias_prob[row, column] = 1
+
+    return alias_prob, alias
+
+
+class CompiledMatrix:
+
+    '''
+    Transition matrix compiled for sampling, built once per matchup from HomeTeamMatrix / AwayTeamMatrix.
+
+    draw() moves an array of integer states forward with one uniform each (used by the batch engine),
+    and simulate_possession_codes() plays one possession as integer state codes, drawing from blocks of
+    uniforms pre-generated from numpy's global random state. simulate_possession() returns the same
+    possession as state labels like the reference simulate_possession.
+
+    Parameters:
+        transition_matrix (DataFrame or array): Team transition matrix (counts or probabilities)
+        block_size (int): Number of uniforms generated at a time for simulate_possession (default 8192)
+    '''
+
+    def __init__(self, transition_matrix, block_size=8192):
+        self.states = STATES
+        self.codes = np.arange(len(STATES))
+        self.probabilities = normalize_rows(matrix_to_array(transition_matrix))
+        self.alias_prob, self.alias = build_alias_tables(self.probabilities)
+        self.terminal_mask = TERMINAL_MASK
+        self.terminal_bits = TERMINAL_BITS
+        self.block_size = block_size
+
+        # python lists for the one possession at a time path, where numpy indexing costs more than it saves
+        self._alias_prob_rows = self.alias_prob.tolist()
+        self._alias_rows = self.alias.tolist()
+        self._block = []
+        self._position = 0
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        state['_block'] = []
+        state['_position'] = 0
+        return state
+
+    # next state for each current state, from uniforms in [0, 1)
+    def draw(self, current_states, uniforms):
+        num_columns = len(self.states)
+        scaled = uniforms * num_columns
+        column = np.minimum(scaled.astype(np.intp), num_columns - 1)
+        keep = (scaled - column) < self.alias_prob[current_states, column]
+        return np.where(keep, column, self.alias[current_states, column])
+
+    def _next_uniform(self):
+        if self._position >= len(self._block):
+            self._block = np.random.random(self.block_size).tolist()
+            self._position = 0
+        uniform = self._block[self._position]
+        self._position += 1
+        return uniform
+
+    # uniforms drawn from numpy's global random state but not used yet, saved with that state to resume a run exactly
+    def get_block_state(self):
+        return self._block[self._position:]
+
+    def set_block_state(self, block):
+        self._block = list(block)
+        self._position = 0
+
+    # one possession, returned as state codes
+    def simulate_possession_codes(self, initial_state='Initial Possession', max_steps=25):
+        num_columns = len(self.states)
+        state = STATE_INDEX[initial_state]
+        possession_steps = [state]
+
+        for _ in range(max_steps):
+            scaled = self._next_uniform() * num_columns
+            column = min(int(scaled), num_columns - 1)
+            if scaled - column >= self._alias_prob_rows[state][column]:
+                column = self._alias_rows[state][column]
+            state = column
+            possession_steps.append(state)
+
+            if (self.terminal_bits >> state) & 1:
+                break
+
+        return possession_steps
+
+    # one possession, returned as state labels like simulate_possession
+    def simulate_possession(self, initial_state='Initial Possession', max_steps=25):
+        return [self.states[code] for code in self.simulate_possession_codes(initial_state, max_steps)]
+
+
+# compile a transition matrix unless it already is one
+def compile_matrix(transition_matrix):
+    if isinstance(transition_matrix, CompiledMatrix):
+        return transition_matrix
+    return CompiledMatrix(transition_matrix)
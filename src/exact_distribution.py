@@ -0,0 +1,324 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from compiled_matrix import STATES, STATE_INDEX, TERMINAL_MASK, TERMINAL_POINTS, matrix_to_array, normalize_rows
+from batch_simulation import calculate_team_metrics_batch, overtime_possessions
+from score_distribution import score_histogram_from_distributions
+
+
+# Exact solution of the possession Markov chain. The transition matrix is an absorbing chain
+# (possessions always end in one of the terminal states), so every quantity the simulator
+# estimates can be calculated directly instead of sampled.
+
+TRANSIENT_CODES = np.flatnonzero(~TERMINAL_MASK)
+TERMINAL_CODES = np.flatnonzero(TERMINAL_MASK)
+OREB_CODES = [STATE_INDEX['2pt Oreb'], STATE_INDEX['3pt Oreb'], STATE_INDEX['FT Oreb']]
+
+# highest scoring possession: a made first free throw followed by an offensive rebound and a made 3
+MAX_POSSESSION_POINTS = int(TERMINAL_POINTS.max()) + 1
+
+
+# Per possession outcome distribution of one team's transition matrix
+def possession_outcome_distribution(transition_matrix, loop_tolerance=1e-12, max_loops=50):
+
+    '''
+    Returns a dictionary with the exact per possession outcome distribution.
+
+        'points': probability of scoring 0-4 points, using the same scoring rule as
+                  calculate_possession_stats (a made first free throw counts once per possession)
+        'expected_counts': expected number of visits to each state in STATES (per possession)
+        'oreb_loops': probability of 0, 1, 2, ... offensive rebounds in a possession
+
+    Parameters:
+        transition_matrix (DataFrame or array): Team transition matrix (e.g., HomeTeamMatrix)
+        loop_tolerance (float): Stop counting offensive rebound loops once the remaining probability is below this
+        max_loops (int): Maximum number of offensive rebound loops to track
+    '''
+
+    P = normalize_rows(matrix_to_array(transition_matrix))
+    num_transient = len(TRANSIENT_CODES)
+    start = np.zeros(num_transient)
+    start[np.searchsorted(TRANSIENT_CODES, STATE_INDEX['Initial Possession'])] = 1
+
+    Q = P[np.ix_(TRANSIENT_CODES, TRANSIENT_CODES)]
+    R = P[np.ix_(TRANSIENT_CODES, TERMINAL_CODES)]
+
+    # expected visits to each transient state, and probability of ending in each terminal state
+    visits = np.linalg.solve((np.eye(num_transient) - Q).T, start)
+    expected_counts = np.zeros(len(STATES))
+    expected_counts[TRANSIENT_CODES] = visits
+    expected_counts[TERMINAL_CODES] = visits @ R
+
+    # the scoring rule depends on whether 'FT Make 1' was visited, so track that as a second copy of the chain
+    ft_one = np.searchsorted(TRANSIENT_CODES, STATE_INDEX['FT Make 1'])
+    into_ft_one = np.zeros((num_transient, num_transient))
+    into_ft_one[:, ft_one] = Q[:, ft_one]
+    Q_flagged = np.block([[Q - into_ft_one, into_ft_one],
+                          [np.zeros_like(Q), Q]])
+    start_flagged = np.concatenate([start, np.zeros(num_transient)])
+    flagged_visits = np.linalg.solve((np.eye(2 * num_transient) - Q_flagged).T, start_flagged)
+
+    points = np.zeros(MAX_POSSESSION_POINTS + 1)
+    for flag in (0, 1):
+        absorbed = flagged_visits[flag * num_transient:(flag + 1) * num_transient] @ R
+        np.add.at(points, TERMINAL_POINTS[TERMINAL_CODES] + flag, absorbed)
+
+    # offensive rebound loops: absorb without another rebound, or pass through a rebound state
+    oreb = np.isin(TRANSIENT_CODES, OREB_CODES)
+    Q_no_loop = Q * ~oreb[None, :]
+    Q_loop = Q * oreb[None, :]
+    no_loop_solve = np.linalg.inv(np.eye(num_transient) - Q_no_loop)
+    oreb_loops = []
+    remaining = start
+    for _ in range(max_loops + 1):
+        reached = remaining @ no_loop_solve
+        oreb_loops.append((reached @ R).sum())
+        remaining = reached @ Q_loop
+        if remaining.sum() < loop_tolerance:
+            break
+
+    return {'points': points / points.sum(),
+            'expected_counts': expected_counts,
+            'oreb_loops': np.array(oreb_loops)}
+
+
+# Per possession points distribution of many transition matrices at once, the 'points' of
+# possession_outcome_distribution for a stack of normalized probability arrays (shape matrices x states x states)
+def possession_points_batch(probabilities):
+    probabilities = np.asarray(probabilities, dtype=float)
+    num_matrices = len(probabilities)
+    num_transient = len(TRANSIENT_CODES)
+    Q = probabilities[:, TRANSIENT_CODES][:, :, TRANSIENT_CODES]
+    R = probabilities[:, TRANSIENT_CODES][:, :, TERMINAL_CODES]
+
+    # the same flagged copy of the chain for 'FT Make 1', solved for every matrix together
+    ft_one = np.searchsorted(TRANSIENT_CODES, STATE_INDEX['FT Make 1'])
+    into_ft_one = np.zeros_like(Q)
+    into_ft_one[:, :, ft_one] = Q[:, :, ft_one]
+    Q_flagged = np.zeros((num_matrices, 2 * num_transient, 2 * num_transient))
+    Q_flagged[:, :num_transient, :num_transient] = Q - into_ft_one
+    Q_flagged[:, :num_transient, num_transient:] = into_ft_one
+    Q_flagged[:, num_transient:, num_transient:] = Q
+
+    start_flagged = np.zeros((num_matrices, 2 * num_transient, 1))
+    start_flagged[:, np.searchsorted(TRANSIENT_CODES, STATE_INDEX['Initial Possession'])] = 1
+    system = np.eye(2 * num_transient) - Q_flagged
+    flagged_visits = np.linalg.solve(system.transpose(0, 2, 1), start_flagged)[:, :, 0]
+
+    points = np.zeros((num_matrices, MAX_POSSESSION_POINTS + 1))
+    for flag in (0, 1):
+        absorbed = np.einsum('mt,mtk->mk', flagged_visits[:, flag * num_transient:(flag + 1) * num_transient], R)
+        for column, code in enumerate(TERMINAL_CODES):
+            points[:, TERMINAL_POINTS[code] + flag] += absorbed[:, column]
+
+    return points / points.sum(axis=1, keepdims=True)
+
+
+# Distribution of a team's game points from its per possession points distribution.
+# Matches simulate_game: int(simmedpossessions) full possessions plus one possession weighted by the fraction left over.
+def game_points_distribution(points_distribution, simmedpossessions, tolerance=1e-15):
+    full_possessions = int(simmedpossessions)
+    fractional_possession = simmedpossessions - full_possessions
+
+    game_points = np.array([1.0])
+    for _ in range(full_possessions):
+        game_points = np.convolve(game_points, points_distribution)
+
+    values = np.arange(len(game_points), dtype=float)
+    probs = game_points
+
+    if fractional_possession > 0:
+        values = (values[:, None] + fractional_possession * np.arange(len(points_distribution))[None, :]).ravel()
+        probs = (game_points[:, None] * points_distribution[None, :]).ravel()
+
+    keep = probs > tolerance
+    return values[keep], probs[keep] / probs[keep].sum()
+
+
+# win probability, supremacy and total from two independent team points distributions.
+# tied games are left out, the same way analyze_results drops them.
+def matchup_outcome_probabilities(team_a_distribution, team_b_distribution, tie_tolerance=1e-9):
+    team_a_values, team_a_probs = team_a_distribution
+    team_b_values, team_b_probs = team_b_distribution
+
+    joint = team_a_probs[:, None] * team_b_probs[None, :]
+    margin = team_a_values[:, None] - team_b_values[None, :]
+    decided = np.abs(margin) > tie_tolerance
+
+    decided_prob = joint[decided].sum()
+    if decided_prob == 0:
+        return {'Win Percentage': (0, 0), 'Tie Percentage': 1, 'Supremacy': None, 'Total': None, 'Points': (None, None)}
+
+    team_a_wins = joint[margin > tie_tolerance].sum() / decided_prob
+    team_a_points = (joint * team_a_values[:, None])[decided].sum() / decided_prob
+    team_b_points = (joint * team_b_values[None, :])[decided].sum() / decided_prob
+
+    return {'Win Percentage': (team_a_wins, 1 - team_a_wins),
+            'Tie Percentage': 1 - decided_prob,
+            'Supremacy': team_a_points - team_b_points,
+            'Total': team_a_points + team_b_points,
+            'Points': (team_a_points, team_b_points)}
+
+
+# same as matchup_outcome_probabilities, with tied games played on through repeated overtimes.
+# the expected number of overtimes is tie / (1 - overtime tie), and by Wald's identity each one adds
+# an unconditional overtime's worth of expected points and possessions.
+def overtime_outcome_probabilities(team_a_points, team_b_points, simmedpossessions):
+    team_a_game = game_points_distribution(team_a_points, simmedpossessions)
+    team_b_game = game_points_distribution(team_b_points, simmedpossessions)
+    regulation = matchup_outcome_probabilities(team_a_game, team_b_game)
+
+    overtime = overtime_possessions(simmedpossessions)
+    team_a_overtime = game_points_distribution(team_a_points, overtime)
+    team_b_overtime = game_points_distribution(team_b_points, overtime)
+    overtime_outcome = matchup_outcome_probabilities(team_a_overtime, team_b_overtime)
+
+    if regulation['Supremacy'] is None or overtime_outcome['Supremacy'] is None:
+        return regulation
+
+    tie = regulation['Tie Percentage']
+    overtimes = tie / (1 - overtime_outcome['Tie Percentage'])
+    team_a_wins = (1 - tie) * regulation['Win Percentage'][0] + tie * overtime_outcome['Win Percentage'][0]
+    points = [(values * probs).sum() + overtimes * (overtime_values * overtime_probs).sum()
+              for (values, probs), (overtime_values, overtime_probs) in [(team_a_game, team_a_overtime), (team_b_game, team_b_overtime)]]
+
+    return {'Win Percentage': (team_a_wins, 1 - team_a_wins),
+            'Tie Percentage': 0,
+            'Overtime Percentage': tie,
+            'Overtimes': overtimes,
+            'Possessions Played': simmedpossessions + overtimes * overtime,
+            'Supremacy': points[0] - points[1],
+            'Total': points[0] + points[1],
+            'Points': tuple(points)}
+
+
+# possession counts and weights approximating a normal pace distribution, one count per whole possession
+# either side of simmedpossessions (the fractional part stays that of simmedpossessions)
+def pace_mixture(simmedpossessions, pace_dispersion=None, width=4):
+    if not pace_dispersion:
+        return np.array([simmedpossessions]), np.array([1.0])
+
+    offsets = np.arange(-np.ceil(width * pace_dispersion), np.ceil(width * pace_dispersion) + 1)
+    weights = np.exp(-0.5 * (offsets / pace_dispersion) ** 2)
+    possessions = simmedpossessions + offsets
+    keep = possessions >= 1
+    return possessions[keep], weights[keep] / weights[keep].sum()
+
+
+# outcome probabilities averaged over the pace mixture, both teams play the same number of possessions in a game
+def pace_outcome_probabilities(team_a_points, team_b_points, simmedpossessions, pace_dispersion=None, overtime=False):
+    possessions, weights = pace_mixture(simmedpossessions, pace_dispersion)
+
+    outcomes = []
+    for game_possessions in possessions:
+        if overtime:
+            outcomes.append(overtime_outcome_probabilities(team_a_points, team_b_points, game_possessions))
+        else:
+            outcomes.append(matchup_outcome_probabilities(game_points_distribution(team_a_points, game_possessions),
+                                                          game_points_distribution(team_b_points, game_possessions)))
+    if len(outcomes) == 1:
+        return outcomes[0]
+
+    # win percentage and points are averages over decided games, so each count is weighted by its decided share
+    decided = np.array([weight * (1 - outcome['Tie Percentage']) if outcome['Supremacy'] is not None else 0
+                        for weight, outcome in zip(weights, outcomes)])
+    if decided.sum() == 0:
+        return outcomes[0]
+    decided_outcomes = [(share, outcome) for share, outcome in zip(decided / decided.sum(), outcomes) if share > 0]
+
+    team_a_wins = sum(share * outcome['Win Percentage'][0] for share, outcome in decided_outcomes)
+    points = tuple(sum(share * outcome['Points'][team] for share, outcome in decided_outcomes) for team in (0, 1))
+
+    mixed = {'Win Percentage': (team_a_wins, 1 - team_a_wins),
+             'Tie Percentage': 1 - decided.sum(),
+             'Supremacy': points[0] - points[1],
+             'Total': points[0] + points[1],
+             'Points': points,
+             'Possessions Played': sum(weight * outcome.get('Possessions Played', game_possessions)
+                                       for weight, outcome, game_possessions in zip(weights, outcomes, possessions))}
+    if overtime:
+        mixed['Overtime Percentage'] = sum(weight * outcome.get('Overtime Percentage', 0) for weight, outcome in zip(weights, outcomes))
+
+    return mixed
+
+
+# exact version of run_multiple_games + analyze_results, no simulations needed
+def exact_matchup_results(team_a_matrix, team_b_matrix, simmedpossessions, team_a_name, team_b_name, overtime=False,
+                          pace_dispersion=None):
+
+    '''
+    Returns the same results_df as analyze_results, calculated exactly from the transition matrices.
+
+    Win Percentage, Supremacy, Total and Points exclude tied games like analyze_results. The other
+    averages are expected counts per game, and the percentage metrics are ratios of those expected counts.
+
+    Parameters:
+        team_a_matrix (DataFrame or array): Home team transition matrix (e.g., HomeTeamMatrix)
+        team_b_matrix (DataFrame or array): Away team transition matrix (e.g., AwayTeamMatrix)
+        simmedpossessions (float): Possessions per team per game
+        team_a_name (str): Team code for team a
+        team_b_name (str): Team code for team b
+        overtime (bool): Resolve ties with overtime instead of leaving them out (default False)
+        pace_dispersion (float): Standard deviation of each game's possessions (default None, fixed possessions)
+    '''
+
+    team_a_outcomes = possession_outcome_distribution(team_a_matrix)
+    team_b_outcomes = possession_outcome_distribution(team_b_matrix)
+
+    outcome = pace_outcome_probabilities(team_a_outcomes['points'], team_b_outcomes['points'], simmedpossessions,
+                                         pace_dispersion=pace_dispersion, overtime=overtime)
+
+    metrics_data = []
+
+    if outcome['Supremacy'] is None:
+        metrics_data.append({"Metric": "Average", team_a_name: None, team_b_name: None})
+        metrics_data.append({"Metric": "Win Percentage", team_a_name: 0, team_b_name: 0})
+        metrics_data.append({"Metric": "Tie Percentage", team_a_name: 1, team_b_name: None})
+        metrics_data.append({"Metric": "Supremacy", team_a_name: None, team_b_name: None})
+        metrics_data.append({"Metric": "Total", team_a_name: None, team_b_name: None})
+        return pd.DataFrame(metrics_data)
+
+    possessions_played = outcome.get('Possessions Played', simmedpossessions)
+    team_a_metrics = calculate_team_metrics_batch(team_a_outcomes['expected_counts'][None, :] * possessions_played,
+                                                  np.array([outcome['Points'][0]]))
+    team_b_metrics = calculate_team_metrics_batch(team_b_outcomes['expected_counts'][None, :] * possessions_played,
+                                                  np.array([outcome['Points'][1]]))
+    team_a_metrics['DREB'] = team_b_metrics['Opp DREB']
+    team_b_metrics['DREB'] = team_a_metrics['Opp DREB']
+
+    for key in team_a_metrics:
+        metrics_data.append({"Metric": key, team_a_name: team_a_metrics[key][0], team_b_name: team_b_metrics[key][0]})
+
+    metrics_data.append({"Metric": "Win Percentage", team_a_name: outcome['Win Percentage'][0], team_b_name: outcome['Win Percentage'][1]})
+    metrics_data.append({"Metric": "Supremacy", team_a_name: outcome['Supremacy'], team_b_name: -outcome['Supremacy']})
+    metrics_data.append({"Metric": "Total", team_a_name: outcome['Total'], team_b_name: outcome['Total']})
+    metrics_data.append({"Metric": "Possessions", team_a_name: simmedpossessions, team_b_name: simmedpossessions})
+    if 'Overtime Percentage' in outcome:
+        metrics_data.append({"Metric": "Overtime Percentage", team_a_name: outcome['Overtime Percentage'], team_b_name: outcome['Overtime Percentage']})
+
+    results_df = pd.DataFrame(metrics_data)
+
+    return results_df
+
+
+# exact joint histogram of final scores, in the same format as SimulationAccumulator.score_histogram
+def exact_score_histogram(team_a_matrix, team_b_matrix, simmedpossessions, pace_dispersion=None):
+    team_a_points = possession_outcome_distribution(team_a_matrix)['points']
+    team_b_points = possession_outcome_distribution(team_b_matrix)['points']
+    possessions, weights = pace_mixture(simmedpossessions, pace_dispersion)
+
+    histograms = []
+    for game_possessions, weight in zip(possessions, weights):
+        histogram = score_histogram_from_distributions(game_points_distribution(team_a_points, game_possessions),
+                                                       game_points_distribution(team_b_points, game_possessions))
+        histogram['Probability'] *= weight
+        histograms.append(histogram)
+
+    if len(histograms) == 1:
+        return histograms[0]
+    return pd.concat(histograms).groupby(['Home Points', 'Away Points'], as_index=False).agg(
+        Games=('Games', 'first'), Probability=('Probability', 'sum'))
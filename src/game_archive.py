@@ -0,0 +1,196 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import os
+import numpy as np
+from compact_results import CompactGameResults
+from simulation_accumulator import SimulationAccumulator, OVERTIME_KEY
+
+
+# Archive of every simulated game of a matchup. Each game is one record of a structured NumPy array saved
+# as a .npy file, so a later question (a team total, a score bucket, a prop) is answered by memory mapping
+# the file and reading it a chunk at a time instead of simulating the matchup again. Tied games are kept
+# too, queries drop them the same way analyze_results does unless asked not to.
+
+# metrics stored per team, the ones every other metric of calculate_team_metrics_batch is derived from
+ARCHIVE_METRICS = ['3pt Attempts', '3pt Makes', '2pt Attempts', '2pt Makes', 'FT Attempts', 'FT Makes', 'OREB',
+                   'Non-OREB', 'Points', 'Turnovers', 'Misses']
+
+TEAMS = ('Home', 'Away')
+
+# float32 keeps the fractional possession weighting at about 100 bytes per game
+TEAM_DTYPE = np.dtype([(metric, np.float32) for metric in ARCHIVE_METRICS])
+GAME_DTYPE = np.dtype([('Home', TEAM_DTYPE), ('Away', TEAM_DTYPE), ('Possessions', np.float32), ('Overtimes', np.uint8)])
+
+DEFAULT_CHUNK_SIZE = 100000
+
+
+# structured records of a batch of games from their pair of metric dictionaries and possessions
+def archive_records(team_a_metrics, team_b_metrics, possessions):
+    records = np.zeros(len(team_a_metrics['Points']), dtype=GAME_DTYPE)
+    for team, metrics in zip(TEAMS, (team_a_metrics, team_b_metrics)):
+        for metric in ARCHIVE_METRICS:
+            records[team][metric] = metrics[metric]
+    records['Possessions'] = possessions
+    if OVERTIME_KEY in team_a_metrics:
+        records['Overtimes'] = team_a_metrics[OVERTIME_KEY]
+    return records
+
+
+def _ratio(numerator, denominator):
+    return np.divide(numerator, denominator, out=np.zeros(len(numerator)), where=denominator > 0)
+
+
+# metric dictionary of one team's records, same keys and formulas as calculate_team_metrics_batch
+def _team_metrics(team_records):
+    metrics = {metric: team_records[metric].astype(float) for metric in ARCHIVE_METRICS}
+    metrics['Opp DREB'] = metrics['Misses'] - metrics['OREB']
+    metrics['3pt%'] = _ratio(metrics['3pt Makes'], metrics['3pt Attempts'])
+    metrics['2pt%'] = _ratio(metrics['2pt Makes'], metrics['2pt Attempts'])
+    metrics['FT%'] = _ratio(metrics['FT Makes'], metrics['FT Attempts'])
+    metrics['FTA%'] = _ratio(metrics['FT Attempts'], metrics['2pt Attempts'] + metrics['3pt Attempts'])
+    metrics['OR%'] = _ratio(metrics['OREB'], metrics['OREB'] + metrics['Opp DREB'])
+    return metrics
+
+
+# pair of metric dictionaries of a chunk of records, in the format produced by run_multiple_games_batch
+def game_metrics(records, overtime=False):
+    team_a_metrics = _team_metrics(records['Home'])
+    team_b_metrics = _team_metrics(records['Away'])
+    team_a_metrics['DREB'] = team_b_metrics['Opp DREB']
+    team_b_metrics['DREB'] = team_a_metrics['Opp DREB']
+    if overtime:
+        team_a_metrics[OVERTIME_KEY] = records['Overtimes'].astype(np.int64)
+        team_b_metrics[OVERTIME_KEY] = team_a_metrics[OVERTIME_KEY]
+    return team_a_metrics, team_b_metrics
+
+
+class GameArchiveWriter:
+
+    '''
+    Writes simulated games to a .npy archive as they are produced, so memory does not grow with the
+    number of games. Records are appended to a temporary file and moved into place by close().
+
+    Pass it as the archive of a SimulationAccumulator, or call add_batch directly. Games added as
+    CompactGameResults (batch engine) keep their own possessions, games added as metric dictionaries get
+    simmedpossessions.
+
+    Parameters:
+        path (str): Archive file (e.g., 'data/archive/MAD_BAR.npy'), its directory is created if missing
+        simmedpossessions (float): Possessions per team, for games added as metric dictionaries
+    '''
+
+    def __init__(self, path, simmedpossessions=None):
+        self.path = path
+        self.simmedpossessions = simmedpossessions
+        self.games = 0
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.temporary_path = f"{path}.{os.getpid()}.records"
+        self.file = open(self.temporary_path, 'wb')
+
+    # add games as CompactGameResults or a pair of metric dictionaries (metrics, when given, are the
+    # already calculated metrics of CompactGameResults)
+    def add_batch(self, results, metrics=None):
+        if isinstance(results, CompactGameResults):
+            possessions = results.game_possessions()
+            metrics = results.metrics() if metrics is None else metrics
+        else:
+            possessions, metrics = self.simmedpossessions, results
+        records = archive_records(*metrics, possessions)
+        self.file.write(records.tobytes())
+        self.games += len(records)
+        return self
+
+    # write the .npy header and copy the records behind it a chunk at a time
+    def close(self, chunk_size=DEFAULT_CHUNK_SIZE):
+        if self.file.closed:
+            return self.path
+        self.file.close()
+        archive_path = f"{self.path}.{os.getpid()}.tmp"
+        archive = np.lib.format.open_memmap(archive_path, mode='w+', dtype=GAME_DTYPE, shape=(self.games,))
+        if self.games > 0:
+            records = np.memmap(self.temporary_path, dtype=GAME_DTYPE, mode='r', shape=(self.games,))
+            for start in range(0, self.games, chunk_size):
+                archive[start:start + chunk_size] = records[start:start + chunk_size]
+            del records
+        archive.flush()
+        del archive
+        os.replace(archive_path, self.path)
+        os.remove(self.temporary_path)
+        return self.path
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class GameArchive:
+
+    '''
+    Read only, memory mapped view of an archive written by GameArchiveWriter.
+
+    Every query reads the records chunk_size games at a time, so the archive never has to fit in memory.
+    Query values and conditions are functions of a chunk of records, e.g.
+    lambda games: games['Home']['Points'] - games['Away']['Points'] > 5.5.
+    Only decided games are used unless decided_only=False, the same way analyze_results drops ties.
+
+    Parameters:
+        path (str): Archive file
+        overtime (bool): The games were simulated with overtime, adds the Overtime Percentage row to results_df (default False)
+        chunk_size (int): Games read at a time (default 100000)
+    '''
+
+    def __init__(self, path, overtime=False, chunk_size=DEFAULT_CHUNK_SIZE):
+        self.path = path
+        self.overtime = overtime
+        self.chunk_size = chunk_size
+        self.records = np.load(path, mmap_mode='r')
+
+    def __len__(self):
+        return len(self.records)
+
+    # chunks of records, loaded into memory one at a time
+    def chunks(self, decided_only=True):
+        for start in range(0, len(self.records), self.chunk_size):
+            records = np.asarray(self.records[start:start + self.chunk_size])
+            if decided_only:
+                records = records[records['Home']['Points'] != records['Away']['Points']]
+            yield records
+
+    # mean of value over the games
+    def mean(self, value, decided_only=True):
+        total, games = 0.0, 0
+        for records in self.chunks(decided_only):
+            total += np.sum(value(records), dtype=float)
+            games += len(records)
+        return total / games if games > 0 else None
+
+    # share of games where condition is True
+    def probability(self, condition, decided_only=True):
+        return self.mean(lambda records: np.asarray(condition(records), dtype=float), decided_only)
+
+    # counts of value in each bin (bins as in np.histogram edges)
+    def histogram(self, value, bins, decided_only=True):
+        counts = np.zeros(len(bins) - 1, dtype=np.int64)
+        for records in self.chunks(decided_only):
+            counts += np.histogram(value(records), bins=bins)[0]
+        return counts
+
+    # every game folded into a SimulationAccumulator, for results_df, standard errors or the score histogram
+    def accumulator(self):
+        accumulator = SimulationAccumulator()
+        for records in self.chunks(decided_only=False):
+            if len(records) > 0:
+                accumulator.add_batch(game_metrics(records, self.overtime))
+        return accumulator
+
+    # same layout as analyze_results, rebuilt from the archive (Possessions is the average over the archived games)
+    def results_df(self, team_a_name, team_b_name):
+        possessions = self.mean(lambda records: records['Possessions'], decided_only=False)
+        return self.accumulator().results_df(possessions, team_a_name, team_b_name)
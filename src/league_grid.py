@@ -0,0 +1,157 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from compiled_matrix import STATES, matrix_to_array, normalize_rows
+from exact_distribution import possession_points_batch
+from points_convolution import pmf_distributions, round_summary
+from paired_simulation import simulate_paired_games, paired_deltas
+from rotation_simulation import lineup_count_matrix
+from transition_matrices import calculate_scaled_pace
+from simulation_functions import apply_home_court_advantage, home_court_diff_tables
+from assess_teams import update_or_remove_player_data
+
+
+# Every team against every other team in one job. Each team's offense and defense count matrices are
+# built once (noise free expected counts, see ratings_count_matrix), and the home and away matrices of
+# all pairs are sums of them, scaled for home court and normalized as one (teams x teams x states x states)
+# array. All pairs are then solved together (a batched absorbing chain solve and one FFT convolution of
+# every pair's game points) or simulated together on common random numbers.
+
+
+# offense and defense count matrices (teams x states x states) and scaled pace of every team
+def team_arrays(teamsDF1, teams):
+    offense, defense, paces = [], [], []
+    for team in teams:
+        roster = teamsDF1[teamsDF1['Team'] == team].drop_duplicates(subset='PlayerID')
+        offense.append(matrix_to_array(lineup_count_matrix(roster, 'O')))
+        defense.append(matrix_to_array(lineup_count_matrix(roster, 'D')))
+        paces.append(calculate_scaled_pace(roster['pace_O'].mean(), roster['pace_D'].mean()))
+    return np.array(offense), np.array(defense), np.array(paces)
+
+
+# home court scaling of every transition for the home and the away team, up to a constant per row that the
+# row normalization takes back out, so apply_home_court_advantage on a matrix of ones gives it exactly
+def home_court_scales(HFA, home_court_diffs=None):
+    ones = pd.DataFrame(1.0, index=STATES, columns=STATES)
+    home_scale, away_scale = apply_home_court_advantage(ones, ones, HFA, home_court_diffs)
+    return matrix_to_array(home_scale), matrix_to_array(away_scale)
+
+
+def _normalize(counts):
+    return normalize_rows(counts.reshape(-1, len(STATES))).reshape(counts.shape)
+
+
+# home and away transition matrices of every (home team, away team) pair, shape teams x teams x states x states.
+# HFA is one value per home team
+def pair_matrices(offense, defense, HFA, home_court_diffs=None):
+    scales = [home_court_scales(team_hfa, home_court_diffs) for team_hfa in HFA]
+    home_scale = np.array([scale[0] for scale in scales])[:, None]
+    away_scale = np.array([scale[1] for scale in scales])[:, None]
+
+    home_matrices = _normalize((offense[:, None] + defense[None, :]) * home_scale)
+    away_matrices = _normalize((offense[None, :] + defense[:, None]) * away_scale)
+    return home_matrices, away_matrices
+
+
+# win percentage and supremacy of the home team of every pair (teams x teams, nan on the diagonal)
+def pair_results(home_matrices, away_matrices, possessions, engine='exact', number_of_simulations=20000, seed=None,
+                 method='fft'):
+    num_teams = len(possessions)
+    home_index, away_index = np.nonzero(~np.eye(num_teams, dtype=bool))
+    pair_possessions = possessions[home_index, away_index]
+
+    if engine == 'exact':
+        home_pmfs = possession_points_batch(home_matrices[home_index, away_index])
+        away_pmfs = possession_points_batch(away_matrices[home_index, away_index])
+        summary = round_summary(pmf_distributions(home_pmfs, away_pmfs, pair_possessions, method), home_index, away_index)
+    else:
+        scenario_matrices = list(zip(home_matrices[home_index, away_index], away_matrices[home_index, away_index], pair_possessions))
+        team_a_points, team_b_points = simulate_paired_games(scenario_matrices, number_of_simulations, seed=seed)
+        summary = paired_deltas(team_a_points, team_b_points, list(range(len(home_index))))
+
+    win_pct = np.full((num_teams, num_teams), np.nan)
+    supremacy = np.full((num_teams, num_teams), np.nan)
+    win_pct[home_index, away_index] = summary['Win Percentage'].to_numpy()
+    supremacy[home_index, away_index] = summary['Supremacy'].to_numpy()
+    return win_pct, supremacy
+
+
+def league_grid(teamsDF, teams=None, HFA=0.8, possession_adjust=0, players_to_update=None, engine='exact',
+                number_of_simulations=20000, seed=None, method='fft', home_court_diffs=None):
+
+    '''
+    Returns every ordered team pair's neutral, home and away win percentage and expected margin, and a power rating table.
+
+    The pairs table has one row per team and opponent, from the team's point of view: Home is the team hosting
+    the opponent, Away is the team visiting the opponent. Power Rating is the least squares fit of the neutral
+    margins (margin of a against b = rating of a - rating of b, ratings averaging 0), i.e. the expected neutral
+    margin against an average team.
+
+    Parameters:
+        teamsDF: teamsDF
+        teams (list): Team codes (default every team in teamsDF, e.g. the 18 EuroLeague or 20 Eurocup teams)
+        HFA (float or dict): Home court advantage, or a dictionary of home team code -> home court advantage
+                            (teams missing from it get 0, default 0.8)
+        possession_adjust (float): Possession adjustment applied to every pair (default 0)
+        players_to_update (list): List of dictionaries to add or remove players (default no changes)
+        engine (str): 'exact' (every pair solved by convolution) or 'paired' (every pair simulated on the same
+                      uniforms, default 'exact')
+        number_of_simulations (int): Simulations per pair for the paired engine (default 20000)
+        seed (int): Random seed for the paired engine (default None)
+        method (str): 'fft' or 'squaring' for the exact engine (default 'fft')
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff from home_court_advantage
+                                (default the notebook's)
+    '''
+
+    teamsDF1 = update_or_remove_player_data(players_to_update or [], teamsDF)
+    teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
+    teams = sorted(teamsDF1['Team'].unique()) if teams is None else list(teams)
+    num_teams = len(teams)
+
+    offense, defense, paces = team_arrays(teamsDF1, teams)
+    possessions = (paces[:, None] + paces[None, :]) / 2 + possession_adjust
+    home_hfa = [HFA.get(team, 0) if isinstance(HFA, dict) else HFA for team in teams]
+    home_court_diffs = home_court_diff_tables(home_court_diffs)
+
+    # same seed for both, so the neutral and home court grids are simulated on the same uniforms
+    neutral_win, neutral_margin = pair_results(*pair_matrices(offense, defense, [0] * num_teams, home_court_diffs), possessions,
+                                               engine, number_of_simulations, seed, method)
+    home_win, home_margin = pair_results(*pair_matrices(offense, defense, home_hfa, home_court_diffs), possessions,
+                                         engine, number_of_simulations, seed, method)
+
+    team_index, opponent_index = np.nonzero(~np.eye(num_teams, dtype=bool))
+    pairs = pd.DataFrame({'Team': np.array(teams)[team_index],
+                          'Opponent': np.array(teams)[opponent_index],
+                          'Neutral Win Percentage': neutral_win[team_index, opponent_index],
+                          'Neutral Margin': neutral_margin[team_index, opponent_index],
+                          'Home Win Percentage': home_win[team_index, opponent_index],
+                          'Home Margin': home_margin[team_index, opponent_index],
+                          # visiting the opponent is the opponent's home game, seen from the other side
+                          'Away Win Percentage': 1 - home_win[opponent_index, team_index],
+                          'Away Margin': -home_margin[opponent_index, team_index],
+                          'Possessions': possessions[team_index, opponent_index]})
+
+    # with every pair played, the least squares ratings are each team's total margin over both orders of its pairs
+    # divided by twice the number of teams
+    ratings = pd.DataFrame({'Team': teams,
+                            'Power Rating': np.nansum(neutral_margin - neutral_margin.T, axis=1) / (2 * num_teams),
+                            'Neutral Win Percentage': np.nanmean(neutral_win, axis=1),
+                            'Home Win Percentage': np.nanmean(home_win, axis=1),
+                            'Away Win Percentage': np.nanmean(1 - home_win.T, axis=1)})
+    ratings = ratings.sort_values('Power Rating', ascending=False).reset_index(drop=True)
+    ratings.insert(0, 'Rank', np.arange(1, num_teams + 1))
+
+    return pairs, ratings
+
+
+# teams x opponents table of one column of the pairs table, in power rating order when ratings are given
+def grid_table(pairs, column='Neutral Win Percentage', ratings=None):
+    table = pairs.pivot(index='Team', columns='Opponent', values=column)
+    if ratings is not None:
+        order = list(ratings['Team'])
+        table = table.reindex(index=order, columns=order)
+    return table
@@ -0,0 +1,153 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+from exact_distribution import possession_outcome_distribution
+from simulation_functions import build_matchup_matrices
+from assess_teams import update_or_remove_player_data
+
+
+# Live win probability for a game in progress. Each team's per possession points distribution is solved
+# once from the matchup's transition matrices and its convolution powers (points from n possessions) are
+# cached, so a query is two lookups and one correlation of the remaining points distributions.
+
+PERIOD_SECONDS = 600
+REGULATION_PERIODS = 4
+REGULATION_SECONDS = PERIOD_SECONDS * REGULATION_PERIODS
+OVERTIME_SECONDS = 300
+
+
+# seconds left in the game, PeriodSecondsElapsed counts up from 600 seconds left on the clock like
+# clean_playbyplay_data, so an overtime period starts at 300 seconds elapsed
+def seconds_remaining(period, period_seconds_elapsed):
+    return (PERIOD_SECONDS - period_seconds_elapsed) + max(REGULATION_PERIODS - period, 0) * PERIOD_SECONDS
+
+
+class LiveWinProbability:
+
+    '''
+    Win probability and projected margin for a matchup in progress.
+
+    Parameters:
+        team_a_matrix (DataFrame or array): Home team transition matrix (e.g., HomeTeamMatrix)
+        team_b_matrix (DataFrame or array): Away team transition matrix (e.g., AwayTeamMatrix)
+        simmedpossessions (float): Expected possessions per team over a full game
+    '''
+
+    def __init__(self, team_a_matrix, team_b_matrix, simmedpossessions):
+        self.simmedpossessions = simmedpossessions
+        self.possession_points = [possession_outcome_distribution(team_a_matrix)['points'],
+                                  possession_outcome_distribution(team_b_matrix)['points']]
+
+        # points distribution from 0, 1, 2, ... possessions for each team, enough for a full game
+        max_possessions = int(np.ceil(simmedpossessions)) + 2
+        self.points_powers = []
+        for points in self.possession_points:
+            powers = [np.array([1.0])]
+            for _ in range(max_possessions):
+                powers.append(np.convolve(powers[-1], points))
+            self.points_powers.append(powers)
+
+        self.overtime_win_percentage = self._overtime_win_percentage()
+
+    def _power(self, team, possessions):
+        powers = self.points_powers[team]
+        while possessions >= len(powers):
+            powers.append(np.convolve(powers[-1], self.possession_points[team]))
+        return powers[possessions]
+
+    # points distribution from a fractional number of possessions, mixing the two nearest whole counts
+    def remaining_points(self, team, possessions):
+        possessions = max(possessions, 0)
+        full_possessions = int(possessions)
+        fraction = possessions - full_possessions
+
+        points = self._power(team, full_possessions)
+        if fraction > 0:
+            next_points = self._power(team, full_possessions + 1)
+            points = np.pad(points * (1 - fraction), (0, len(next_points) - len(points))) + next_points * fraction
+        return points
+
+    # distribution of team a minus team b points, index 0 is the largest possible team b lead
+    def _margin_distribution(self, team_a_possessions, team_b_possessions):
+        team_a_points = self.remaining_points(0, team_a_possessions)
+        team_b_points = self.remaining_points(1, team_b_possessions)
+        margin = np.convolve(team_a_points, team_b_points[::-1])
+        return margin, len(team_b_points) - 1
+
+    def _overtime_win_percentage(self):
+        possessions = self.simmedpossessions * OVERTIME_SECONDS / REGULATION_SECONDS
+        margin, offset = self._margin_distribution(possessions, possessions)
+        win, tie = margin[offset + 1:].sum(), margin[offset]
+        # overtimes are repeated until someone wins
+        return win / (1 - tie) if tie < 1 else 0.5
+
+    # possessions left for each team, the team with the ball gets the extra half possession
+    def remaining_possessions(self, period, period_seconds_elapsed, possession=None):
+        per_team = self.simmedpossessions * seconds_remaining(period, period_seconds_elapsed) / REGULATION_SECONDS
+        extra = 0.5 if possession == 'home' else -0.5 if possession == 'away' else 0
+        if per_team == 0:
+            extra = 0
+        return max(per_team + extra, 0), max(per_team - extra, 0)
+
+    def win_probability(self, home_score, away_score, period, period_seconds_elapsed, possession=None):
+
+        '''
+        Returns the home and away win probability and projected final margin and total.
+
+        Parameters:
+            home_score (int): Current home team points
+            away_score (int): Current away team points
+            period (int): Current period (5 and up for overtime)
+            period_seconds_elapsed (int): Seconds elapsed in the period, as in clean_playbyplay_data
+            possession (str): 'home', 'away' or None if between possessions (default None)
+        '''
+
+        home_possessions, away_possessions = self.remaining_possessions(period, period_seconds_elapsed, possession)
+        margin, offset = self._margin_distribution(home_possessions, away_possessions)
+
+        # final margin = current lead + remaining margin
+        lead = home_score - away_score
+        final_margins = np.arange(len(margin)) - offset + lead
+        win = margin[final_margins > 0].sum()
+        tie = margin[final_margins == 0].sum()
+        home_win = win + tie * self.overtime_win_percentage
+
+        # expected points are linear in the number of possessions
+        expected_home = home_possessions * (np.arange(len(self.possession_points[0])) * self.possession_points[0]).sum()
+        expected_away = away_possessions * (np.arange(len(self.possession_points[1])) * self.possession_points[1]).sum()
+
+        return {'Win Percentage': (home_win, 1 - home_win),
+                'Overtime Percentage': tie,
+                'Projected Margin': (final_margins * margin).sum(),
+                'Projected Total': home_score + away_score + expected_home + expected_away,
+                'Remaining Possessions': (home_possessions, away_possessions)}
+
+
+def live_win_probability_model(home_team, away_team, HFA, teamsDF, possession_adjust=0, players_to_update=None,
+                               home_court_diffs=None, seed=None):
+
+    '''
+    Returns a LiveWinProbability for a matchup, built once before the game and queried as it goes.
+
+    Parameters:
+        home_team (str): Team code (e.g., 'MAD')
+        away_team (str): Team code (e.g., 'BAR')
+        HFA (float): Home court advantage (e.g., 0.8)
+        teamsDF: teamsDF
+        possession_adjust (float): Possession adjustment (default 0)
+        players_to_update (list): List of dictionaries to add or remove players (default no changes)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff from home_court_advantage
+                                (default the notebook's)
+        seed (int): Random seed for the transition matrix sampling (default None)
+    '''
+
+    teamsDF1 = update_or_remove_player_data(players_to_update or [], teamsDF)
+    teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
+
+    HomeTeamMatrix, AwayTeamMatrix, simmedpossessions = build_matchup_matrices(home_team, away_team, HFA, teamsDF1,
+                                                                               home_court_diffs, seed=seed)
+
+    return LiveWinProbability(HomeTeamMatrix, AwayTeamMatrix, simmedpossessions + possession_adjust)
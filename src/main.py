@@ -60,7 +60,8 @@ def main():
     homeusage_for=homeusage_for,
     awayusage_for=awayusage_for,
     homeusage_against=homeusage_against,
-    awayusage_against=awayusage_against)
+    awayusage_against=awayusage_against,
+    home_court_diffs=[homeODiff, homeDDiff, awayODiff, awayDDiff])
 
 
 
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from batch_simulation import run_multiple_games_batch
+from compiled_matrix import compile_matrix
+from simulation_functions import build_matchup_matrices
+from assess_teams import update_or_remove_player_data
+
+
+# Common random numbers for roster what-if comparisons. The baseline and every scenario are simulated
+# on the same uniforms (the same draw at each step of each possession of each game), so the difference
+# between them is not buried in independent Monte Carlo noise.
+
+# points for every simulated game of several matchup scenarios, all run on the same uniforms
+def simulate_paired_games(scenario_matrices, num_games, seed=None, chunk_size=1000, max_steps=25):
+    compiled = [(compile_matrix(team_a_matrix), compile_matrix(team_b_matrix), simmedpossessions)
+                for team_a_matrix, team_b_matrix, simmedpossessions in scenario_matrices]
+    possession_slots = max(int(simmedpossessions) for _, _, simmedpossessions in compiled) + 1
+
+    rng = np.random.default_rng(seed)
+    team_a_points = np.zeros((len(compiled), num_games))
+    team_b_points = np.zeros((len(compiled), num_games))
+
+    for chunk_start in range(0, num_games, chunk_size):
+        chunk_games = min(chunk_size, num_games - chunk_start)
+        uniforms = (rng.random((chunk_games, possession_slots, max_steps)),
+                    rng.random((chunk_games, possession_slots, max_steps)))
+
+        for scenario, (team_a_matrix, team_b_matrix, simmedpossessions) in enumerate(compiled):
+            results, _ = run_multiple_games_batch(team_a_matrix, team_b_matrix, chunk_games, simmedpossessions,
+                                                  rng=rng, max_steps=max_steps, uniforms=uniforms)
+            team_a_points[scenario, chunk_start:chunk_start + chunk_games] = results[0]['Points']
+            team_b_points[scenario, chunk_start:chunk_start + chunk_games] = results[1]['Points']
+
+    return team_a_points, team_b_points
+
+
+# per game terms of a ratio of sums (e.g. wins over decided games): their mean is zero and their standard
+# error is the ratio's (delta method), so a difference of two paired ratios keeps the games paired
+def _ratio_terms(numerator, denominator):
+    ratio = numerator.sum(axis=-1, keepdims=True) / denominator.sum(axis=-1, keepdims=True)
+    return (numerator - ratio * denominator) / denominator.mean(axis=-1, keepdims=True)
+
+
+# win percentage and supremacy of each scenario, and the paired difference from the first (baseline) scenario
+def paired_deltas(team_a_points, team_b_points, scenario_names):
+    margin = team_a_points - team_b_points
+    decided = margin != 0
+    num_games = margin.shape[1]
+
+    # both are taken over the decided games, and so are their standard errors
+    win_terms = _ratio_terms((margin > 0).astype(float), decided.astype(float))
+    margin_terms = _ratio_terms(margin, decided.astype(float))
+    win_differences = win_terms - win_terms[0]
+    margin_differences = margin_terms - margin_terms[0]
+
+    rows = []
+    for scenario, name in enumerate(scenario_names):
+        win_pct = (margin[scenario] > 0).sum() / decided[scenario].sum()
+        supremacy = margin[scenario][decided[scenario]].sum() / decided[scenario].sum()
+        rows.append({'Scenario': name,
+                     'Win Percentage': win_pct,
+                     'Supremacy': supremacy,
+                     'Win Percentage Delta SE': win_differences[scenario].std(ddof=1) / np.sqrt(num_games),
+                     'Supremacy Delta SE': margin_differences[scenario].std(ddof=1) / np.sqrt(num_games),
+                     'Unpaired Supremacy Delta SE': np.sqrt((margin_terms[scenario].var(ddof=1) + margin_terms[0].var(ddof=1)) / num_games),
+                     'Simulations': num_games})
+
+    deltas = pd.DataFrame(rows)
+    deltas.insert(3, 'Win Percentage Delta', deltas['Win Percentage'] - deltas['Win Percentage'].iloc[0])
+    deltas.insert(4, 'Supremacy Delta', deltas['Supremacy'] - deltas['Supremacy'].iloc[0])
+
+    return deltas
+
+
+def compare_roster_scenarios(home_team, away_team, HFA, scenarios, number_of_simulations, possession_adjust, teamsDF,
+                             baseline_players_to_update=None, seed=None, home_court_diffs=None):
+
+    '''
+    Returns the win percentage and supremacy change of each roster scenario against a baseline, with paired standard errors.
+
+    Parameters:
+        home_team (str): Team code (e.g., 'MAD')
+        away_team (str): Team code (e.g., 'BAR')
+        HFA (float): Home court advantage (e.g., 0.8)
+        scenarios (dict): Scenario name -> players_to_update list
+                          (e.g., {'Campazzo out': [{'Player': 'CAMPAZZO, FACUNDO', 'Action': 'remove'}]})
+        number_of_simulations (int): Number of simulations, shared by every scenario
+        possession_adjust (float): Possession adjustment
+        teamsDF: teamsDF
+        baseline_players_to_update (list): players_to_update for the baseline (default no changes)
+        seed (int): Random seed (default None)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff from home_court_advantage
+                                (default the notebook's)
+    '''
+
+    seed_sequence = np.random.SeedSequence(seed)
+    matrix_seed, simulation_seed = seed_sequence.spawn(2)
+    scenario_names = ['Baseline'] + list(scenarios.keys())
+    roster_changes = [baseline_players_to_update or []] + list(scenarios.values())
+
+    scenario_matrices = []
+    for players_to_update in roster_changes:
+        teamsDF1 = update_or_remove_player_data(players_to_update, teamsDF)
+        teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
+
+        # the transition matrices are themselves sampled, so every scenario starts them from the same random state
+        np.random.seed(matrix_seed.generate_state(1)[0])
+        HomeTeamMatrix, AwayTeamMatrix, simmedpossessions = build_matchup_matrices(home_team, away_team, HFA, teamsDF1,
+                                                                                   home_court_diffs)
+        scenario_matrices.append((HomeTeamMatrix, AwayTeamMatrix, simmedpossessions + possession_adjust))
+
+    team_a_points, team_b_points = simulate_paired_games(scenario_matrices, number_of_simulations, seed=simulation_seed)
+
+    return paired_deltas(team_a_points, team_b_points, scenario_names)
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor
+from batch_simulation import simulate_games_compact
+from compact_results import CompactGameResults
+from compiled_matrix import compile_matrix
+
+
+# Split the simulations of one matchup across a process pool. Each chunk gets its own child seed
+# spawned from a SeedSequence, so a given master seed and worker count always gives the same results.
+# Workers send their games back as CompactGameResults, which are much smaller to pickle than metric arrays.
+
+# number of games simulated by each worker, earlier chunks take the remainder
+def split_simulations(num_games, workers):
+    chunk_size, remainder = divmod(num_games, workers)
+    return [chunk_size + (1 if chunk < remainder else 0) for chunk in range(workers)]
+
+
+# simulate one chunk of games in a worker process
+def _simulate_chunk(team_a_compiled, team_b_compiled, num_games, simmedpossessions, seed_sequence, overtime=False,
+                    pace_dispersion=None, sampler='random'):
+    return simulate_games_compact(team_a_compiled, team_b_compiled, num_games, simmedpossessions,
+                                  rng=np.random.default_rng(seed_sequence), overtime=overtime, pace_dispersion=pace_dispersion,
+                                  sampler=sampler)
+
+
+# join chunk results back together in chunk order, as metric dictionaries like run_multiple_games_batch
+def merge_chunk_results(chunk_results):
+    return CompactGameResults.concatenate(chunk_results).metrics()
+
+
+# simulate multiple games across a pool of worker processes
+def run_multiple_games_parallel(team_a_matrix, team_b_matrix, num_games, simmedpossessions, workers, seed=None, overtime=False,
+                                pace_dispersion=None, sampler='random'):
+
+    '''
+    Parallel version of run_multiple_games_batch.
+
+    Returns results in the same format as run_multiple_games_batch, along with simmedpossessions.
+    Results are identical for the same seed and number of workers.
+
+    Parameters:
+        team_a_matrix (DataFrame or array): Home team transition matrix (e.g., HomeTeamMatrix)
+        team_b_matrix (DataFrame or array): Away team transition matrix (e.g., AwayTeamMatrix)
+        num_games (int): Number of games to simulate
+        simmedpossessions (float): Possessions per team per game
+        workers (int): Number of worker processes (e.g., 32)
+        seed (int): Master seed, each worker gets an independent child seed (default None)
+        overtime (bool): Resolve tied games with overtime (default False)
+        pace_dispersion (float): Standard deviation of each game's possessions (default None, fixed possessions)
+        sampler (str): 'random', 'stratified' or 'sobol', each worker's chunk is its own sample (default 'random')
+    '''
+
+    team_a_compiled = compile_matrix(team_a_matrix)
+    team_b_compiled = compile_matrix(team_b_matrix)
+    chunk_sizes = split_simulations(num_games, workers)
+    child_seeds = np.random.SeedSequence(seed).spawn(workers)
+
+    if workers == 1:
+        chunk_results = [_simulate_chunk(team_a_compiled, team_b_compiled, chunk_sizes[0], simmedpossessions, child_seeds[0],
+                                         overtime, pace_dispersion, sampler)]
+    else:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures = [executor.submit(_simulate_chunk, team_a_compiled, team_b_compiled, chunk_size, simmedpossessions, child_seed,
+                                       overtime, pace_dispersion, sampler)
+                       for chunk_size, child_seed in zip(chunk_sizes, child_seeds)]
+            chunk_results = [future.result() for future in futures]
+
+    return merge_chunk_results(chunk_results), simmedpossessions
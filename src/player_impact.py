@@ -0,0 +1,136 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from rotation_simulation import RATING_STATS, ratings_count_matrix
+from points_convolution import round_distributions, round_summary
+from paired_simulation import simulate_paired_games, paired_deltas
+from transition_matrices import calculate_scaled_pace
+from simulation_functions import apply_home_court_advantage
+from assess_teams import update_or_remove_player_data
+
+
+# Impact of every player of a matchup, measured by taking them out of the roster. A team's ratings are
+# usage weighted averages, so removing one player only subtracts their share from the rating and usage
+# sums, and every removal of both rosters is calculated from the same sums in one pass. Each scenario
+# gets noise free matrices (see ratings_count_matrix) and the whole set is solved together like a round
+# of fixtures, or simulated on common random numbers.
+
+
+# usage weighted rating of every stat for the full roster (first row) and with each player removed (one row each).
+# A player carrying all of the team's usage can't be removed, their row is nan
+def removal_ratings(team_df, side):
+    usage = team_df[f'usage_{side}'].to_numpy(dtype=float)
+    ratings = team_df[[f'{stat}_{side}' for stat in RATING_STATS]].to_numpy(dtype=float)
+
+    contributions = ratings * usage[:, None]
+    rating_sums = contributions.sum(axis=0)
+    usage_sum = usage.sum()
+
+    remaining_usage = np.broadcast_to((usage_sum - usage)[:, None], contributions.shape)
+    removed = np.divide(rating_sums[None, :] - contributions, remaining_usage, out=np.full(contributions.shape, np.nan),
+                        where=remaining_usage > 0)
+    return np.vstack([rating_sums / usage_sum, removed])
+
+
+# scaled pace of the full roster (first entry) and with each player removed
+def removal_paces(team_df):
+    pace_O = team_df['pace_O'].to_numpy(dtype=float)
+    pace_D = team_df['pace_D'].to_numpy(dtype=float)
+    count = len(team_df)
+
+    paces = [calculate_scaled_pace(pace_O.mean(), pace_D.mean())]
+    if count > 1:
+        paces += list(calculate_scaled_pace((pace_O.sum() - pace_O) / (count - 1), (pace_D.sum() - pace_D) / (count - 1)))
+    return np.array(paces)
+
+
+# offense and defense count matrices of the full roster and of every removal (None for players that can't be removed)
+def removal_matrices(team_df):
+    return {side: [None if np.isnan(ratings).any() else ratings_count_matrix(dict(zip(RATING_STATS, ratings)))
+                   for ratings in removal_ratings(team_df, side)]
+            for side in ('O', 'D')}
+
+
+# roster positions of the players whose removal leaves usage on both offense and defense
+def removable_players(matrices):
+    return [index for index in range(len(matrices['O']) - 1)
+            if matrices['O'][index + 1] is not None and matrices['D'][index + 1] is not None]
+
+
+def player_impact_report(home_team, away_team, HFA, teamsDF, possession_adjust=0, players_to_update=None,
+                         engine='exact', number_of_simulations=20000, seed=None, home_court_diffs=None):
+
+    '''
+    Returns every player's win percentage and supremacy impact on their team, ranked, from removing them.
+
+    Impact is the team's baseline value minus its value without the player, so a positive impact means
+    the team is better with the player.
+
+    Parameters:
+        home_team (str): Team code (e.g., 'MAD')
+        away_team (str): Team code (e.g., 'BAR')
+        HFA (float): Home court advantage (e.g., 0.8)
+        teamsDF: teamsDF
+        possession_adjust (float): Possession adjustment (default 0)
+        players_to_update (list): List of dictionaries to add or remove players before the report (default no changes)
+        engine (str): 'exact' (every scenario solved by convolution) or 'paired' (simulated on common random numbers,
+                      default 'exact')
+        number_of_simulations (int): Simulations per scenario for the paired engine (default 20000)
+        seed (int): Random seed for the paired engine (default None)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff from home_court_advantage
+                                (default the notebook's)
+    '''
+
+    teamsDF1 = update_or_remove_player_data(players_to_update or [], teamsDF)
+    teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
+    rosters = [teamsDF1[teamsDF1['Team'] == team].drop_duplicates(subset='PlayerID').reset_index(drop=True)
+               for team in (home_team, away_team)]
+
+    matrices = [removal_matrices(roster) for roster in rosters]
+    paces = [removal_paces(roster) for roster in rosters]
+
+    # scenario 0 is the baseline, then every home removal, then every away removal (a team's only player is skipped)
+    scenarios = ([(0, 0)] + [(index + 1, 0) for index in removable_players(matrices[0])] +
+                 [(0, index + 1) for index in removable_players(matrices[1])])
+    scenario_matrices = []
+    for home_index, away_index in scenarios:
+        team1 = matrices[0]['O'][home_index] + matrices[1]['D'][away_index]
+        team2 = matrices[1]['O'][away_index] + matrices[0]['D'][home_index]
+        HomeTeamMatrix, AwayTeamMatrix = apply_home_court_advantage(team1, team2, HFA, home_court_diffs)
+        simmedpossessions = (paces[0][home_index] + paces[1][away_index]) / 2 + possession_adjust
+        scenario_matrices.append((HomeTeamMatrix, AwayTeamMatrix, simmedpossessions))
+
+    if engine == 'exact':
+        summary = round_summary(round_distributions(scenario_matrices), [home_team] * len(scenarios), [away_team] * len(scenarios))
+        win_pct = summary['Win Percentage'].to_numpy()
+        supremacy = summary['Supremacy'].to_numpy()
+    else:
+        team_a_points, team_b_points = simulate_paired_games(scenario_matrices, number_of_simulations, seed=seed)
+        deltas = paired_deltas(team_a_points, team_b_points, list(range(len(scenarios))))
+        win_pct = deltas['Win Percentage'].to_numpy()
+        supremacy = deltas['Supremacy'].to_numpy()
+
+    rows = []
+    for scenario, (home_index, away_index) in enumerate(scenarios[1:], start=1):
+        team, roster, index, sign = ((home_team, rosters[0], home_index - 1, 1) if home_index else
+                                     (away_team, rosters[1], away_index - 1, -1))
+        rows.append({'Team': team,
+                     'PlayerID': roster.loc[index, 'PlayerID'],
+                     'Player': roster.loc[index, 'Player'],
+                     'Home Win Percentage': win_pct[scenario],
+                     'Home Supremacy': supremacy[scenario],
+                     # from the player's own team's point of view
+                     'Win Percentage Impact': sign * (win_pct[0] - win_pct[scenario]),
+                     'Supremacy Impact': sign * (supremacy[0] - supremacy[scenario])})
+
+    report = pd.DataFrame(rows, columns=['Team', 'PlayerID', 'Player', 'Home Win Percentage', 'Home Supremacy',
+                                         'Win Percentage Impact', 'Supremacy Impact'])
+    report = report.sort_values('Win Percentage Impact', ascending=False).reset_index(drop=True)
+    report.insert(0, 'Rank', np.arange(1, len(report) + 1))
+    report.attrs['Baseline'] = {'Home Win Percentage': win_pct[0], 'Home Supremacy': supremacy[0]}
+
+    return report
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+
+
+# Player level box scores drawn inside each simulated game. Every simulated make, miss, turnover and
+# rebound of a team is handed to one of its players with a multinomial draw, using the same usage and
+# shooting shares run_full_simuluation uses for its average box score, so each player gets a distribution
+# of stat lines instead of a single expected line.
+
+# box score stat -> (team metric of the simulated game, column of NormalizedEstimates2 giving each player's share)
+PLAYER_EVENTS = {
+    'FTM': (lambda metrics: metrics['FT Makes'], lambda players: players['FTM']),
+    'FT Misses': (lambda metrics: metrics['FT Attempts'] - metrics['FT Makes'], lambda players: players['FTA'] - players['FTM']),
+    '2FGM': (lambda metrics: metrics['2pt Makes'], lambda players: players['2FGM']),
+    '2FG Misses': (lambda metrics: metrics['2pt Attempts'] - metrics['2pt Makes'], lambda players: players['2FGA'] - players['2FGM']),
+    '3FGM': (lambda metrics: metrics['3pt Makes'], lambda players: players['3FGM']),
+    '3FG Misses': (lambda metrics: metrics['3pt Attempts'] - metrics['3pt Makes'], lambda players: players['3FGA'] - players['3FGM']),
+    'TO': (lambda metrics: metrics['Turnovers'], lambda players: players['TO']),
+    'ORB': (lambda metrics: metrics['OREB'], lambda players: players['ORB']),
+    # same share of team defensive rebounds credited to players as the average box score
+    'DRB': (lambda metrics: metrics['DREB'] * .93, lambda players: players['DRB']),
+}
+
+PLAYER_QUANTILES = (0.1, 0.5, 0.9)
+
+
+# split each game's team total between players, returns games x players counts
+def attribute_events(team_totals, player_weights, rng):
+    totals = np.rint(np.maximum(team_totals, 0)).astype(np.int64)
+    weights = np.clip(np.nan_to_num(np.asarray(player_weights, dtype=float)), 0, None)
+    if weights.sum() <= 0:
+        return np.zeros((len(totals), len(weights)), dtype=np.int64)
+    return rng.multinomial(totals, weights / weights.sum())
+
+
+# every simulated game's stat line for each player of one team
+def team_player_games(team_metrics, players, rng):
+    player_games = {stat: attribute_events(team_total(team_metrics), player_share(players), rng)
+                    for stat, (team_total, player_share) in PLAYER_EVENTS.items()}
+
+    player_games['FTA'] = player_games['FTM'] + player_games.pop('FT Misses')
+    player_games['2FGA'] = player_games['2FGM'] + player_games.pop('2FG Misses')
+    player_games['3FGA'] = player_games['3FGM'] + player_games.pop('3FG Misses')
+    player_games['Pts'] = player_games['3FGM'] * 3 + player_games['2FGM'] * 2 + player_games['FTM']
+    player_games['TRB'] = player_games['ORB'] + player_games['DRB']
+
+    return player_games
+
+
+def simulate_player_box_scores(game_results, NormalizedEstimates2, home_team, away_team, seed=None,
+                               stats=('Pts', 'TRB'), quantiles=PLAYER_QUANTILES):
+
+    '''
+    Returns the average and quantiles of each player's simulated stats.
+
+    Parameters:
+        game_results (tuple): Home and away metrics of every simulated game (e.g., SimulationAccumulator.game_results())
+        NormalizedEstimates2 (DataFrame): Player estimates built in run_full_simuluation
+        home_team (str): Team code for the home team
+        away_team (str): Team code for the away team
+        seed (int): Random seed (default None)
+        stats (tuple): Stats to report quantiles for (default ('Pts', 'TRB'))
+        quantiles (tuple): Quantiles to report (default P10, P50 and P90)
+    '''
+
+    rng = np.random.default_rng(seed)
+    players = NormalizedEstimates2.drop_duplicates(subset=['Team', 'PlayerID'])
+    rows = []
+
+    for team, team_metrics in zip([home_team, away_team], game_results):
+        team_players = players[players['Team'] == team].fillna(0).reset_index(drop=True)
+        if len(team_players) == 0 or len(team_metrics) == 0:
+            continue
+        player_games = team_player_games(team_metrics, team_players, rng)
+
+        for index, player in team_players.iterrows():
+            row = {'Team': team, 'PlayerID': player['PlayerID'], 'Player': player['Player']}
+            for stat in stats:
+                values = player_games[stat][:, index]
+                row[stat] = values.mean()
+                for quantile in quantiles:
+                    row[f"{stat} P{int(round(quantile * 100))}"] = np.quantile(values, quantile)
+            rows.append(row)
+
+    player_box_scores = pd.DataFrame(rows)
+    if len(player_box_scores) == 0:
+        return player_box_scores
+
+    return player_box_scores.round(2).sort_values(by=['Team', stats[0]], ascending=[False, False])
@@ -0,0 +1,94 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import pandas as pd
+from season_simulation import fixture_distribution
+from assess_teams import update_or_remove_player_data
+
+
+# Best-of-N playoff series. The higher seed's win probability at home and on the road is calculated once
+# from the matchup machinery, after that the series odds from any score are an exact enumeration of the
+# games left, so updating them after each game costs nothing.
+
+# home court of the higher seed for each game ('H') or the lower seed ('A')
+SERIES_FORMATS = {
+    3: 'HAH',     # Eurocup playoffs
+    5: 'HHAAH',   # EuroLeague playoffs
+}
+
+
+# higher seed's win probability at home and away, each matchup is only built once. home_court_diffs is homeODiff,
+# homeDDiff, awayODiff and awayDDiff from home_court_advantage (the notebook's if not given)
+def series_game_probabilities(higher_seed, lower_seed, teamsDF, HFA=0.8, possession_adjust=0, players_to_update=None,
+                              engine='exact', number_of_simulations=20000, seed=None, home_court_diffs=None):
+    teamsDF1 = update_or_remove_player_data(players_to_update or [], teamsDF)
+    teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
+
+    home = fixture_distribution(higher_seed, lower_seed, HFA, teamsDF1, possession_adjust=possession_adjust, engine=engine,
+                                number_of_simulations=number_of_simulations, seed=seed, home_court_diffs=home_court_diffs)
+    away = fixture_distribution(lower_seed, higher_seed, HFA, teamsDF1, possession_adjust=possession_adjust, engine=engine,
+                                number_of_simulations=number_of_simulations, seed=seed, home_court_diffs=home_court_diffs)
+
+    return {'Home': home['Win Percentage'], 'Away': 1 - away['Win Percentage']}
+
+
+# probability of every way the series can finish, starting from the current series score
+def series_outcomes(game_probabilities, best_of=3, series_score=(0, 0), home_pattern=None):
+    home_pattern = home_pattern or SERIES_FORMATS[best_of]
+    wins_needed = best_of // 2 + 1
+
+    # (higher seed wins, lower seed wins) -> probability of reaching that score
+    states = {tuple(series_score): 1.0}
+    finished = {}
+
+    while states:
+        next_states = {}
+        for (higher_wins, lower_wins), probability in states.items():
+            if higher_wins == wins_needed or lower_wins == wins_needed:
+                finished[(higher_wins, lower_wins)] = finished.get((higher_wins, lower_wins), 0) + probability
+                continue
+
+            game = higher_wins + lower_wins
+            win_probability = game_probabilities['Home'] if home_pattern[game] == 'H' else game_probabilities['Away']
+            for score, outcome_probability in [((higher_wins + 1, lower_wins), win_probability),
+                                               ((higher_wins, lower_wins + 1), 1 - win_probability)]:
+                next_states[score] = next_states.get(score, 0) + probability * outcome_probability
+        states = next_states
+
+    return finished
+
+
+def series_probabilities(game_probabilities, higher_seed, lower_seed, best_of=3, series_score=(0, 0), home_pattern=None):
+
+    '''
+    Returns series win probabilities and the distribution of final series scores and lengths.
+
+    Parameters:
+        game_probabilities (dict): Higher seed win probability at 'Home' and 'Away' (e.g., from series_game_probabilities)
+        higher_seed (str): Team code of the team with home court advantage (e.g., 'PAM')
+        lower_seed (str): Team code of the other team (e.g., 'HTA')
+        best_of (int): Number of games in the series, 3 or 5 (default 3)
+        series_score (tuple): Games already won by (higher_seed, lower_seed) (default (0, 0))
+        home_pattern (str): Home court by game, 'H' for the higher seed (default 'HAH' for 3 games, 'HHAAH' for 5)
+    '''
+
+    finished = series_outcomes(game_probabilities, best_of=best_of, series_score=series_score, home_pattern=home_pattern)
+    wins_needed = best_of // 2 + 1
+
+    outcomes = pd.DataFrame([{'Winner': higher_seed if higher_wins == wins_needed else lower_seed,
+                              'Series Score': f"{higher_wins}-{lower_wins}",
+                              'Games': higher_wins + lower_wins,
+                              'Probability': probability}
+                             for (higher_wins, lower_wins), probability in sorted(finished.items(), key=lambda item: (-item[0][0], item[0][1]))])
+
+    summary = pd.DataFrame([{"Metric": "Series Win Percentage",
+                             higher_seed: outcomes.loc[outcomes['Winner'] == higher_seed, 'Probability'].sum(),
+                             lower_seed: outcomes.loc[outcomes['Winner'] == lower_seed, 'Probability'].sum()}] +
+                           [{"Metric": f"{games} Games",
+                             higher_seed: outcomes.loc[(outcomes['Winner'] == higher_seed) & (outcomes['Games'] == games), 'Probability'].sum(),
+                             lower_seed: outcomes.loc[(outcomes['Winner'] == lower_seed) & (outcomes['Games'] == games), 'Probability'].sum()}
+                            for games in sorted(outcomes['Games'].unique())])
+
+    return summary, outcomes
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from exact_distribution import possession_outcome_distribution, MAX_POSSESSION_POINTS
+from score_distribution import _line_probabilities
+from simulation_functions import build_matchup_matrices
+from assess_teams import update_or_remove_player_data
+
+
+# Game level points distributions from per possession points distributions, for a whole round at once.
+# Each team's per possession PMF is solved from its transition matrix, and the game PMF is its n-fold
+# convolution, calculated as the n-th power of its Fourier transform (or by repeated squaring). Every
+# matchup of a round is one row of the same arrays. A fractional possession count is played the way the
+# simulation engines and exact_distribution play it: the whole possessions, then one more possession whose
+# points count the fraction times. The whole possessions' distributions stay on whole points and the last
+# possession's points are kept beside them. round_summary combines the two, and points_distribution,
+# margin_distribution and total_distribution give a matchup's full game distributions for pricing lines.
+
+# floating point noise from the FFT is cleared below this
+FFT_TOLERANCE = 1e-13
+
+
+# per possession points PMF (0 to MAX_POSSESSION_POINTS) for every transition matrix, one row each
+def possession_points_pmfs(transition_matrices):
+    return np.vstack([possession_outcome_distribution(transition_matrix)['points'] for transition_matrix in transition_matrices])
+
+
+def _fft_length(support):
+    # smallest power of two that holds the support, so the circular convolution does not wrap around
+    return 1 << int(np.ceil(np.log2(max(support, 2))))
+
+
+def _clean(pmfs):
+    pmfs = np.where(pmfs > FFT_TOLERANCE, pmfs, 0)
+    return pmfs / pmfs.sum(axis=1, keepdims=True)
+
+
+# points PMF of the whole possessions of each row (the integer part of its possessions), by FFT.
+# returns an array with one row per PMF, index = points
+def game_points_pmfs(pmfs, possessions):
+    pmfs = np.atleast_2d(np.asarray(pmfs, dtype=float))
+    possessions = np.broadcast_to(np.asarray(possessions, dtype=float), (len(pmfs),))
+    full_possessions = np.floor(possessions)
+
+    support = int(full_possessions.max() * MAX_POSSESSION_POINTS) + 1
+    spectrum = np.fft.rfft(pmfs, n=_fft_length(support), axis=1)
+    game_pmfs = np.fft.irfft(spectrum ** full_possessions[:, None], n=_fft_length(support), axis=1)[:, :support]
+
+    return _clean(game_pmfs)
+
+
+# same result by repeated squaring with direct convolutions, no FFT rounding
+def game_points_pmfs_squaring(pmfs, possessions):
+    pmfs = np.atleast_2d(np.asarray(pmfs, dtype=float))
+    possessions = np.broadcast_to(np.asarray(possessions, dtype=float), (len(pmfs),))
+    support = int(np.floor(possessions).max() * MAX_POSSESSION_POINTS) + 1
+
+    game_pmfs = np.zeros((len(pmfs), support))
+    for row, (pmf, row_possessions) in enumerate(zip(pmfs, possessions)):
+        result, power, exponent = np.array([1.0]), pmf, int(row_possessions)
+        while exponent > 0:
+            if exponent & 1:
+                result = np.convolve(result, power)
+            exponent >>= 1
+            if exponent:
+                power = np.convolve(power, power)
+        game_pmfs[row, :len(result)] = result
+
+    return game_pmfs
+
+
+# cross-correlation of each row, index 0 is a margin of -(columns of team_b_pmfs - 1)
+def _correlate(team_a_pmfs, team_b_pmfs):
+    support = team_a_pmfs.shape[1] + team_b_pmfs.shape[1] - 1
+    length = _fft_length(support)
+
+    # correlating with b is convolving with b reversed
+    return np.fft.irfft(np.fft.rfft(team_a_pmfs, n=length, axis=1) *
+                        np.fft.rfft(team_b_pmfs[:, ::-1], n=length, axis=1), n=length, axis=1)[:, :support]
+
+
+# margin (team a minus team b) PMF of each row by cross-correlation. index 0 is a margin of -(columns of team_b_pmfs - 1)
+def margin_pmfs(team_a_pmfs, team_b_pmfs):
+    team_a_pmfs, team_b_pmfs = np.atleast_2d(team_a_pmfs), np.atleast_2d(team_b_pmfs)
+    return _clean(_correlate(team_a_pmfs, team_b_pmfs)), team_b_pmfs.shape[1] - 1
+
+
+# total points PMF of each row, index = total points
+def total_pmfs(team_a_pmfs, team_b_pmfs):
+    team_a_pmfs, team_b_pmfs = np.atleast_2d(team_a_pmfs), np.atleast_2d(team_b_pmfs)
+    support = team_a_pmfs.shape[1] + team_b_pmfs.shape[1] - 1
+    length = _fft_length(support)
+
+    total = np.fft.irfft(np.fft.rfft(team_a_pmfs, n=length, axis=1) *
+                         np.fft.rfft(team_b_pmfs, n=length, axis=1), n=length, axis=1)[:, :support]
+    return _clean(total)
+
+
+def round_distributions(matchup_matrices, method='fft'):
+
+    '''
+    Returns game points, margin and total distributions for every matchup of a round, one row per matchup.
+
+    A team's game points are its whole possessions' points plus Fraction times the points of one more possession,
+    so the arrays are kept in those two parts. points_distribution, margin_distribution and total_distribution
+    combine them into a matchup's full game distributions.
+
+        'Home Whole Points', 'Away Whole Points': whole possessions' points PMFs, index = points
+        'Whole Margin': whole possessions' home minus away PMF, index - 'Whole Margin Offset' = margin
+        'Whole Total': whole possessions' total points PMF, index = total points
+        'Home Last Possession', 'Away Last Possession': per possession points PMFs of the fractional possession
+        'Fraction': fractional part of each matchup's possessions
+
+    Parameters:
+        matchup_matrices (list): (HomeTeamMatrix, AwayTeamMatrix, simmedpossessions) of each matchup,
+                                 as built for simulate_matchup (possession_adjust already added)
+        method (str): 'fft' or 'squaring' (default 'fft')
+    '''
+
+    home_pmfs = possession_points_pmfs([matrices[0] for matrices in matchup_matrices])
+    away_pmfs = possession_points_pmfs([matrices[1] for matrices in matchup_matrices])
+    possessions = np.array([matrices[2] for matrices in matchup_matrices], dtype=float)
+
+    return pmf_distributions(home_pmfs, away_pmfs, possessions, method)
+
+
+# round_distributions from per possession points PMFs that are already solved, one row per matchup
+def pmf_distributions(home_pmfs, away_pmfs, possessions, method='fft'):
+    game_pmfs = game_points_pmfs if method == 'fft' else game_points_pmfs_squaring
+    home_points = game_pmfs(home_pmfs, possessions)
+    away_points = game_pmfs(away_pmfs, possessions)
+    margin, offset = margin_pmfs(home_points, away_points)
+
+    return {'Home Whole Points': home_points,
+            'Away Whole Points': away_points,
+            'Whole Margin': margin,
+            'Whole Margin Offset': offset,
+            'Whole Total': total_pmfs(home_points, away_points),
+            'Home Last Possession': np.atleast_2d(home_pmfs),
+            'Away Last Possession': np.atleast_2d(away_pmfs),
+            'Fraction': np.broadcast_to(np.asarray(possessions, dtype=float) % 1, (len(home_points),))}
+
+
+def _mean_and_variance(pmfs):
+    values = np.arange(pmfs.shape[1])
+    mean = pmfs @ values
+    return mean, pmfs @ values ** 2 - mean ** 2
+
+
+# win percentage, supremacy and total of every matchup from its distributions, ties dropped like analyze_results
+# (tie_tolerance as in matchup_outcome_probabilities)
+def round_summary(distributions, home_teams, away_teams, tie_tolerance=1e-9):
+    margin = distributions['Whole Margin']
+    margins = np.arange(margin.shape[1]) - distributions['Whole Margin Offset']
+    fraction = distributions['Fraction']
+    home_last, away_last = distributions['Home Last Possession'], distributions['Away Last Possession']
+    last_points = np.arange(home_last.shape[1])
+
+    # final margin of every whole possession margin and pair of last possession points (home x, away y),
+    # shape matchups x x x y x margins, and the probability of each last possession pair
+    last_shift = fraction[:, None, None] * (last_points[:, None] - last_points[None, :])
+    final_margins = margins[None, None, None, :] + last_shift[..., None]
+    last_probability = home_last[:, :, None] * away_last[:, None, :]
+    tied = np.abs(final_margins) <= tie_tolerance
+
+    win = np.einsum('rxy,rm,rxym->r', last_probability, margin, final_margins > tie_tolerance)
+    tie = np.einsum('rxy,rm,rxym->r', last_probability, margin, tied)
+    decided = 1 - tie
+
+    home_whole, home_whole_variance = _mean_and_variance(distributions['Home Whole Points'])
+    away_whole, away_whole_variance = _mean_and_variance(distributions['Away Whole Points'])
+    home_last_mean, home_last_variance = _mean_and_variance(home_last)
+    away_last_mean, away_last_variance = _mean_and_variance(away_last)
+    home_expected = home_whole + fraction * home_last_mean
+    away_expected = away_whole + fraction * away_last_mean
+
+    # home points of the tied games, taken back out so the averages are over decided games only. For each
+    # margin m, sum over a of a P(home whole = a) P(away whole = a - m), plus the last possession's points
+    points = np.arange(distributions['Home Whole Points'].shape[1])
+    tied_whole_points = _correlate(distributions['Home Whole Points'] * points, distributions['Away Whole Points'])
+    tied_points = (np.einsum('rxy,rm,rxym->r', last_probability, tied_whole_points, tied) +
+                   np.einsum('rxy,rx,rm,rxym->r', last_probability, fraction[:, None] * last_points[None, :], margin, tied))
+    # tied games have equal points, so they take the same points out of both teams
+    home_decided = (home_expected - tied_points) / decided
+    away_decided = (away_expected - tied_points) / decided
+
+    return pd.DataFrame({'Home': home_teams,
+                         'Away': away_teams,
+                         'Win Percentage': win / decided,
+                         'Tie Percentage': tie,
+                         'Supremacy': home_decided - away_decided,
+                         'Total': home_decided + away_decided,
+                         'Total SD': np.sqrt(home_whole_variance + away_whole_variance +
+                                             fraction ** 2 * (home_last_variance + away_last_variance))})
+
+
+# values and probabilities of whole + fraction x last, from the whole possessions' PMF and the last possession's PMF
+# (index - offset = value), in the format of game_points_distribution
+def _with_last_possession(whole_pmf, whole_offset, last_pmf, last_offset, fraction):
+    values = ((np.arange(len(whole_pmf)) - whole_offset)[:, None] +
+              fraction * (np.arange(len(last_pmf)) - last_offset)[None, :]).ravel()
+    probabilities = np.outer(whole_pmf, last_pmf).ravel()
+    keep = probabilities > FFT_TOLERANCE
+    return values[keep], probabilities[keep] / probabilities[keep].sum()
+
+
+# full game points distribution of one team ('Home' or 'Away') in matchup row, as (values, probabilities)
+def points_distribution(distributions, row, team='Home'):
+    return _with_last_possession(distributions[f'{team} Whole Points'][row], 0, distributions[f'{team} Last Possession'][row], 0,
+                                 distributions['Fraction'][row])
+
+
+# full game home minus away margin distribution of matchup row, as (values, probabilities)
+def margin_distribution(distributions, row):
+    last_margin, last_offset = margin_pmfs(distributions['Home Last Possession'][row], distributions['Away Last Possession'][row])
+    return _with_last_possession(distributions['Whole Margin'][row], distributions['Whole Margin Offset'], last_margin[0],
+                                 last_offset, distributions['Fraction'][row])
+
+
+# full game total points distribution of matchup row, as (values, probabilities)
+def total_distribution(distributions, row):
+    last_total = total_pmfs(distributions['Home Last Possession'][row], distributions['Away Last Possession'][row])
+    return _with_last_possession(distributions['Whole Total'][row], 0, last_total[0], 0, distributions['Fraction'][row])
+
+
+# over, push and under probabilities of every matchup for each total points line, one row per matchup and line
+def round_total_probabilities(distributions, home_teams, away_teams, totals):
+    tables = []
+    for row, (home_team, away_team) in enumerate(zip(home_teams, away_teams)):
+        lines, below, push = _line_probabilities(*total_distribution(distributions, row), totals)
+        tables.append(pd.DataFrame({'Home': home_team, 'Away': away_team, 'Total': lines,
+                                    'Over': 1 - below - push, 'Push': push, 'Under': below}))
+    return pd.concat(tables, ignore_index=True)
+
+
+# home cover, push and away cover probabilities of every matchup for each home spread (e.g., -5.5 means home gives
+# 5.5 points), one row per matchup and spread
+def round_spread_probabilities(distributions, home_teams, away_teams, spreads):
+    tables = []
+    for row, (home_team, away_team) in enumerate(zip(home_teams, away_teams)):
+        # home covers when margin + spread > 0, i.e. the margin is above -spread
+        lines, below, push = _line_probabilities(*margin_distribution(distributions, row), -np.asarray(spreads, dtype=float))
+        tables.append(pd.DataFrame({'Home': home_team, 'Away': away_team, 'Spread': -lines,
+                                    'Home Cover': 1 - below - push, 'Push': push, 'Away Cover': below}))
+    return pd.concat(tables, ignore_index=True)
+
+
+def round_points_distributions(fixtures, teamsDF, HFA=0.8, possession_adjust=0, players_to_update=None, method='fft',
+                               home_court_diffs=None, seed=None):
+
+    '''
+    Returns the summary of every fixture of a round and its points, margin and total distributions (see
+    round_distributions, price lines with round_total_probabilities and round_spread_probabilities).
+
+    Parameters:
+        fixtures (DataFrame): Fixtures with Home_Code and Away_Code (and optionally HFA) columns
+        teamsDF: teamsDF
+        HFA (float): Home court advantage for fixtures without an HFA column (default 0.8)
+        possession_adjust (float): Possession adjustment applied to every fixture (default 0)
+        players_to_update (list): List of dictionaries to add or remove players (default no changes)
+        method (str): 'fft' or 'squaring' (default 'fft')
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff from home_court_advantage
+                                (default the notebook's)
+        seed (int): Random seed for the transition matrix sampling, each fixture gets its own child seed (default None)
+    '''
+
+    teamsDF1 = update_or_remove_player_data(players_to_update or [], teamsDF)
+    teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
+
+    fixture_seeds = np.random.SeedSequence(seed).generate_state(len(fixtures)) if seed is not None else [None] * len(fixtures)
+    matchup_matrices = []
+    for fixture, fixture_seed in zip(fixtures.itertuples(index=False), fixture_seeds):
+        HomeTeamMatrix, AwayTeamMatrix, simmedpossessions = build_matchup_matrices(fixture.Home_Code, fixture.Away_Code,
+                                                                                   getattr(fixture, 'HFA', HFA), teamsDF1,
+                                                                                   home_court_diffs, seed=fixture_seed)
+        matchup_matrices.append((HomeTeamMatrix, AwayTeamMatrix, simmedpossessions + possession_adjust))
+
+    distributions = round_distributions(matchup_matrices, method=method)
+    summary = round_summary(distributions, list(fixtures['Home_Code']), list(fixtures['Away_Code']))
+
+    return summary, distributions
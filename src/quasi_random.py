@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+
+try:
+    from scipy.stats import qmc
+except ImportError:
+    # scipy is optional, it is only needed for sampler='sobol'
+    qmc = None
+
+
+# Lower variance draws for the batch engine. Pseudo random draws leave the share of turnovers, trips to
+# the line, 2pt and 3pt attempts and makes to chance in every batch of games. Here the draws of each
+# possession slot are spread evenly over the games instead, so every batch gets close to the expected
+# share of each outcome. Each game on its own is still a fair draw. Points, and with them the supremacy
+# and totals, converge noticeably faster (about 1.7-3x lower variance in benchmark_sampler_variance). The
+# win percentage gains much less (1-1.7x depending on the matchup), whether a close game is won is
+# mostly down to the later, pseudo random draws.
+#
+# 'stratified' is a Latin hypercube: for every possession slot and step, each of the num_games equal
+# strata of [0, 1) gets exactly one draw. 'sobol' uses a scrambled Sobol sequence, which also spreads the
+# draws evenly in pairs of slots.
+
+SAMPLERS = ('random', 'stratified', 'sobol')
+
+# draws of each possession taken from the low variance points: the possession start (turnover, trip to
+# the line, 2pt or 3pt attempt) and the draw after it, which settles most shots. Later draws of a
+# possession (rebounds, second free throws) stay pseudo random, spreading them gains little.
+QUASI_STEPS = 2
+
+
+# one point in each 1 / num_points stratum of every dimension, strata shuffled independently per dimension
+def stratified_points(num_points, dimensions, rng):
+    strata = rng.permuted(np.tile(np.arange(num_points)[:, None], (1, dimensions)), axis=0)
+    return (strata + rng.random((num_points, dimensions))) / num_points
+
+
+# scrambled Sobol points, drawn in a power of two block so the first num_points keep most of their balance
+def sobol_points(num_points, dimensions, rng):
+    if qmc is None:
+        raise ImportError("sampler='sobol' needs scipy, install it or use sampler='stratified'")
+    sobol = qmc.Sobol(dimensions, scramble=True, seed=rng)
+    return sobol.random_base2(int(np.ceil(np.log2(max(num_points, 2)))))[:num_points]
+
+
+def check_sampler(sampler):
+    if sampler not in SAMPLERS:
+        raise ValueError(f"sampler must be one of {', '.join(SAMPLERS)}, not '{sampler}'")
+
+
+# uniforms for the first quasi_steps draws of every possession slot of num_games games, shape
+# (num_games, slots, quasi_steps), or None for the 'random' sampler
+def possession_uniforms(num_games, slots, rng, sampler='stratified', quasi_steps=QUASI_STEPS):
+    check_sampler(sampler)
+    if sampler == 'random' or num_games == 0:
+        return None
+    points = stratified_points if sampler == 'stratified' else sobol_points
+    return points(num_games, slots * quasi_steps, rng).reshape(num_games, slots, quasi_steps)
@@ -0,0 +1,227 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from batch_simulation import simulate_team_games_batch, calculate_team_metrics_batch
+from exact_distribution import possession_outcome_distribution
+from simulation_accumulator import SimulationAccumulator
+from compiled_matrix import compile_matrix
+from transition_matrices import calculate_elo_probability, calculate_scaled_pace, transition_probability_matrix
+from simulation_functions import apply_home_court_advantage
+from assess_teams import update_or_remove_player_data
+from simulation_cache import fingerprint
+
+
+# Rotation aware simulation. The usual matrices average a team's whole roster weighted by usage, so a
+# stretch of bench minutes plays the same as the starters. Here a rotation plan says which five players
+# are on court over which possessions, and every game switches to that segment's matrices as it goes.
+#
+# Lineup matrices hold the expected transition counts of one possession (what generate_team_matrix
+# samples with calcs possessions, without the sampling noise), so an offense and a defense lineup combine
+# by adding them like the full roster matrices. They are cached by the lineup's sorted PlayerIDs and ratings.
+
+# possessions per rotation segment when a plan is built from PossessionCount
+SEGMENT_POSSESSIONS = 8
+
+RATING_STATS = ['to', 'fta', 'two_attempt', 'three_attempt', 'three_made', 'two_made', 'ftm', 'oreb']
+
+
+def lineup_key(lineup_df):
+    return tuple(sorted(lineup_df['PlayerID'].unique()))
+
+
+# hash of the columns lineup_count_matrix reads, whatever order the lineup's rows are in
+def lineup_ratings_fingerprint(lineup_df, side='O'):
+    columns = [f'{stat}_{side}' for stat in RATING_STATS] + [f'usage_{side}']
+    rows = lineup_df[['PlayerID'] + columns].reset_index(drop=True)
+    return fingerprint(rows.sort_values('PlayerID'))
+
+
+# expected transition counts per possession from usage weighted ratings (stat -> rating, see RATING_STATS)
+def ratings_count_matrix(ratings):
+    probabilities = transition_probability_matrix(
+        turnover_prob=calculate_elo_probability(ratings['to'], target_prob=0.12),
+        ft_attempt_prob=calculate_elo_probability(ratings['fta'], target_prob=0.09),
+        two_point_attempt_prob=calculate_elo_probability(ratings['two_attempt'], target_prob=0.41),
+        three_point_attempt_prob=calculate_elo_probability(ratings['three_attempt'], target_prob=0.28),
+        three_made_prob=calculate_elo_probability(ratings['three_made'], target_prob=0.37),
+        two_made_prob=calculate_elo_probability(ratings['two_made'], target_prob=0.55),
+        ft_made_prob=calculate_elo_probability(ratings['ftm'], target_prob=0.78),
+        ft_oreb_prob=calculate_elo_probability(ratings['oreb'], target_prob=0.175),
+        two_pt_oreb_prob=calculate_elo_probability(ratings['oreb'], target_prob=0.327),
+        three_pt_oreb_prob=calculate_elo_probability(ratings['oreb'], target_prob=0.300))
+
+    # visits to each state times the probability of each move out of it
+    visits = possession_outcome_distribution(probabilities)['expected_counts']
+    return probabilities.mul(visits, axis=0)
+
+
+# expected transition counts per possession for a lineup's offense ('O') or defense ('D')
+def lineup_count_matrix(lineup_df, side='O'):
+    usage = lineup_df[f'usage_{side}'] / lineup_df[f'usage_{side}'].sum()
+    return ratings_count_matrix({stat: (lineup_df[f'{stat}_{side}'] * usage).sum() for stat in RATING_STATS})
+
+
+class LineupMatrixCache:
+
+    '''
+    Lineup count matrices memoized by side, sorted PlayerID tuple and a fingerprint of the lineup's
+    rating and usage columns.
+
+    A player's ratings are the same on any team, so a cache can be shared across simulations and
+    matchups, and a lineup whose ratings changed since (a new teamsDF) gets a new entry.
+    '''
+
+    def __init__(self):
+        self.matrices = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, lineup_df, side='O'):
+        key = (side, lineup_key(lineup_df), lineup_ratings_fingerprint(lineup_df, side))
+        if key in self.matrices:
+            self.hits += 1
+        else:
+            self.misses += 1
+            self.matrices[key] = lineup_count_matrix(lineup_df, side)
+        return self.matrices[key]
+
+    def clear(self):
+        self.matrices.clear()
+        self.hits = 0
+        self.misses = 0
+
+
+LINEUP_MATRIX_CACHE = LineupMatrixCache()
+
+
+# rotation plan from each player's PossessionCount: the game is split into segments and each segment goes to
+# the five players furthest behind their share, so starters open the game and the bench fills the gaps
+def rotation_plan(team_df, simmedpossessions, segment_possessions=SEGMENT_POSSESSIONS):
+    players = team_df.drop_duplicates(subset='PlayerID').reset_index(drop=True)
+    lineup_size = min(5, len(players))
+
+    # scale the possession counts so they add up to five players on court for the whole game
+    target = players['PossessionCount'].fillna(0).clip(lower=0).to_numpy(dtype=float)
+    target = np.minimum(target * lineup_size * simmedpossessions / max(target.sum(), 1e-9), simmedpossessions)
+
+    num_segments = max(1, int(round(simmedpossessions / segment_possessions)))
+    boundaries = np.append(np.round(np.linspace(0, simmedpossessions, num_segments + 1)[:-1]), simmedpossessions)
+
+    remaining = target.copy()
+    rows = []
+    for start, end in zip(boundaries[:-1], boundaries[1:]):
+        # most possessions still owed per possession left, ties to the larger possession count
+        urgency = remaining / (simmedpossessions - start)
+        on_court = np.lexsort((-target, -urgency))[:lineup_size]
+        remaining[on_court] -= end - start
+        lineup = tuple(sorted(players.loc[on_court, 'PlayerID']))
+
+        if rows and rows[-1]['Lineup'] == lineup:
+            rows[-1]['End Possession'] = end
+        else:
+            rows.append({'Start Possession': start, 'End Possession': end, 'Lineup': lineup})
+
+    return pd.DataFrame(rows)
+
+
+# stretch a plan to simmedpossessions and combine both teams' plans into segments where neither lineup changes
+def matchup_segments(home_plan, away_plan, simmedpossessions):
+    plans = []
+    for plan in (home_plan, away_plan):
+        scale = simmedpossessions / plan['End Possession'].max()
+        plans.append((plan['End Possession'].to_numpy(dtype=float) * scale, list(plan['Lineup'])))
+
+    boundaries = np.unique(np.concatenate([[0.0], plans[0][0], plans[1][0]]))
+    rows = []
+    for start, end in zip(boundaries[:-1], boundaries[1:]):
+        home_lineup, away_lineup = [lineups[min(np.searchsorted(ends, end - 1e-9), len(lineups) - 1)]
+                                    for ends, lineups in plans]
+        rows.append({'Start Possession': start, 'End Possession': end,
+                     'Home Lineup': home_lineup, 'Away Lineup': away_lineup})
+
+    return pd.DataFrame(rows)
+
+
+# home and away transition matrices for every segment, each lineup's matrices come from the cache
+def segment_matrices(segments, teamsDF1, HFA, cache, home_court_diffs=None):
+    players = teamsDF1.drop_duplicates(subset='PlayerID').set_index('PlayerID', drop=False)
+    matrices = []
+    for segment in segments.itertuples(index=False):
+        home_df = players.loc[list(segment[2])]
+        away_df = players.loc[list(segment[3])]
+        team1 = cache.get(home_df, 'O') + cache.get(away_df, 'D')
+        team2 = cache.get(away_df, 'O') + cache.get(home_df, 'D')
+        HomeTeamMatrix, AwayTeamMatrix = apply_home_court_advantage(team1, team2, HFA, home_court_diffs)
+        matrices.append((compile_matrix(HomeTeamMatrix), compile_matrix(AwayTeamMatrix)))
+    return matrices
+
+
+# simulate games segment by segment, adding each chunk of games to the accumulator
+def run_multiple_games_rotation(segments, matrices, num_games, rng=None, accumulator=None, chunk_size=5000, max_steps=25):
+    rng = np.random.default_rng() if rng is None else rng
+    accumulator = SimulationAccumulator() if accumulator is None else accumulator
+    lengths = (segments['End Possession'] - segments['Start Possession']).to_numpy(dtype=float)
+
+    for chunk_start in range(0, num_games, chunk_size):
+        chunk_games = min(chunk_size, num_games - chunk_start)
+        totals = [None, None]
+        for length, segment_matrices_pair in zip(lengths, matrices):
+            for team, transition_matrix in enumerate(segment_matrices_pair):
+                counts, points = simulate_team_games_batch(transition_matrix, chunk_games, length, rng, max_steps)
+                totals[team] = (counts, points) if totals[team] is None else (totals[team][0] + counts, totals[team][1] + points)
+
+        team_a_metrics = calculate_team_metrics_batch(*totals[0])
+        team_b_metrics = calculate_team_metrics_batch(*totals[1])
+        team_a_metrics['DREB'] = team_b_metrics['Opp DREB']
+        team_b_metrics['DREB'] = team_a_metrics['Opp DREB']
+        accumulator.add_batch((team_a_metrics, team_b_metrics))
+
+    return accumulator
+
+
+def simulate_rotation_matchup(home_team, away_team, HFA, number_of_simulations, possession_adjust, teamsDF,
+                              home_rotation=None, away_rotation=None, players_to_update=None, seed=None, cache=None,
+                              home_court_diffs=None):
+
+    '''
+    Returns simulated team level stats with lineups following a rotation plan, and the segments that were played.
+
+    Parameters:
+        home_team (str): Team code (e.g., 'MAD')
+        away_team (str): Team code (e.g., 'BAR')
+        HFA (float): Home court advantage (e.g., 0.8)
+        number_of_simulations (int): Number of simulations
+        possession_adjust (float): Possession adjustment
+        teamsDF: teamsDF
+        home_rotation (DataFrame): Start Possession, End Possession and Lineup (tuple of 5 PlayerIDs) columns
+                                   (default built from PossessionCount with rotation_plan)
+        away_rotation (DataFrame): Same for the away team
+        players_to_update (list): List of dictionaries to add or remove players (default no changes)
+        seed (int): Random seed (default None)
+        cache (LineupMatrixCache): Lineup matrix cache (default the shared LINEUP_MATRIX_CACHE)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff from home_court_advantage
+                                (default the notebook's)
+    '''
+
+    cache = LINEUP_MATRIX_CACHE if cache is None else cache
+    teamsDF1 = update_or_remove_player_data(players_to_update or [], teamsDF)
+    teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
+    home_df = teamsDF1[teamsDF1['Team'] == home_team]
+    away_df = teamsDF1[teamsDF1['Team'] == away_team]
+
+    # same pace as calculate_transition_matrix_defense
+    simmedpossessions = (calculate_scaled_pace(home_df['pace_O'].mean(), home_df['pace_D'].mean()) +
+                         calculate_scaled_pace(away_df['pace_O'].mean(), away_df['pace_D'].mean())) / 2 + possession_adjust
+
+    home_rotation = rotation_plan(home_df, simmedpossessions) if home_rotation is None else home_rotation
+    away_rotation = rotation_plan(away_df, simmedpossessions) if away_rotation is None else away_rotation
+    segments = matchup_segments(home_rotation, away_rotation, simmedpossessions)
+    matrices = segment_matrices(segments, teamsDF1, HFA, cache, home_court_diffs)
+
+    accumulator = run_multiple_games_rotation(segments, matrices, number_of_simulations, rng=np.random.default_rng(seed))
+
+    return accumulator.results_df(simmedpossessions, home_team, away_team).round(3), segments
@@ -3,9 +3,26 @@
 
 # In[ ]:
 
+import numpy as np
+import pandas as pd
+from player_simulation import simulate_player_box_scores
+from simulation_cache import simulation_fingerprint
+from simulation_functions import simulate_matchup
+from assess_teams import update_or_remove_player_data
+
+
+# rosters the matchup is simulated with: teamsDF with players_to_update applied, players in the most recent game only
+def simulation_rosters(teamsDF, players_to_update):
+    teamsDF1 = update_or_remove_player_data(players_to_update or [], teamsDF)
+    return teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
+
+
 
 def run_full_simuluation (home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust,
-                         teamsDF, homeusage_for, awayusage_for, homeusage_against, awayusage_against):
+                         teamsDF, homeusage_for, awayusage_for, homeusage_against, awayusage_against, engine='reference', seed=None,
+                         workers=None, win_tolerance=None, supremacy_tolerance=None, score_histogram=False,
+                         player_distributions=False, overtime=False, pace_dispersion=None, sampler='random',
+                         archive_path=None, checkpoint=None, possession_durations=None, home_court_diffs=None):
 
     '''
     Returns simulated team level stats and player level box score.
@@ -22,12 +39,46 @@ def run_full_simuluation (home_team, away_team, HFA, players_to_update, number_o
         awayusage_for: awayusage_for
         homeusage_against: homeusage_against
         awayusage_against: awayusage_against
+        engine (str): 'reference' (possession by possession), 'batch' (vectorized), 'clock' (vectorized, possessions
+                      played against a 600 second period clock, also returns per quarter lines) or 'exact'
+                      (no sampling, default 'reference')
+        seed (int): Random seed, every engine gives the same results for the same seed (default None)
+        workers (int): Split the batch engine's simulations across this many processes, batch engine without
+                       tolerances only (default None)
+        win_tolerance (float): Stop simulating once the win percentage standard error is below this (default None)
+        supremacy_tolerance (float): Stop simulating once the supremacy standard error is below this (default None)
+        score_histogram (bool): Also return the joint (home points, away points) histogram (default False)
+        player_distributions (bool): Also return P10/P50/P90 points and rebounds for each player, drawn inside
+                                     every simulated game (default False, not available with the exact engine)
+        overtime (bool): Play tied games on through 5 minute overtimes instead of dropping them (default False)
+        pace_dispersion (float): Standard deviation of each game's possessions around the expected pace (default None)
+        sampler (str): 'random', 'stratified' or 'sobol' draws for the batch engine, the last two lower the variance
+                       of the supremacy a lot more than of the win percentage (default 'random')
+        archive_path (str): Also save every simulated game to this .npy file, read it back with GameArchive
+                            (default None, not available with the exact engine)
+        checkpoint (MatchupCheckpoint): Save the simulation state after every chunk of games and resume from it
+                                        (default None, batch and reference engines only, see run_checkpointed_simulation)
+        possession_durations (DataFrame): Team and Duration of observed possessions for the clock engine, e.g.
+                                          possession_durations(OffensePlayerDataNEW1) from src/clock_simulation.py
+                                          (default None, every team's durations come from its pace)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff from home_court_advantage
+                                (default the notebook's)
     '''
     
-    teamsDF1 = update_or_remove_player_data(players_to_update, teamsDF)
-    teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
-    
-    SimmedGameStats = simulate_matchup(home_team, away_team, HFA, number_of_simulations, possession_adjust)
+    teamsDF1 = simulation_rosters(teamsDF, players_to_update)
+    
+    SimmedGameStats = simulate_matchup(home_team, away_team, HFA, number_of_simulations, possession_adjust, teamsDF1,
+                                       engine=engine, seed=seed, workers=workers,
+                                       win_tolerance=win_tolerance, supremacy_tolerance=supremacy_tolerance,
+                                       score_histogram=score_histogram, keep_games=player_distributions,
+                                       overtime=overtime, pace_dispersion=pace_dispersion, sampler=sampler,
+                                       archive_path=archive_path, checkpoint=checkpoint,
+                                       possession_durations=possession_durations, home_court_diffs=home_court_diffs)
+    if score_histogram or player_distributions or engine == 'clock':
+        SimmedGameStats, *MatchupOutputs = SimmedGameStats
+        ScoreHistogram = MatchupOutputs.pop(0) if score_histogram else None
+        GameResults = MatchupOutputs.pop(0) if player_distributions else None
+        PeriodLines = MatchupOutputs.pop(0) if engine == 'clock' else None
 
     playerstats1A = pd.concat([homeusage_for,awayusage_for])
     playerstats13 = (playerstats1A.sort_values(['PlayerID', 'Season', 'Gamecode', 'Possession'], 
@@ -157,5 +208,91 @@ def run_full_simuluation (home_team, away_team, HFA, players_to_update, number_o
     
     SimmedBoxScore = SimmedBoxScore.fillna(0).round(2).sort_values(by=['Team','Pts'], ascending=[False,False])
     
-    return SimmedGameStats, SimmedBoxScore
+    outputs = [SimmedGameStats, SimmedBoxScore]
+    if score_histogram:
+        outputs.append(ScoreHistogram)
+    if player_distributions:
+        outputs.append(simulate_player_box_scores(GameResults, NormalizedEstimates2, home_team, away_team, seed=seed))
+    if engine == 'clock':
+        outputs.append(PeriodLines)
+    return tuple(outputs)
+
+
+
+def run_cached_simulation(cache, home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust,
+                          teamsDF, homeusage_for, awayusage_for, homeusage_against, awayusage_against, seed=None,
+                          home_court_diffs=None, simulate=run_full_simuluation, **simulation_options):
+
+    '''
+    Returns the outputs of run_full_simuluation, read from cache when the same inputs were simulated before.
+
+    Calls without a seed are not repeatable, so they are always simulated and never stored. Calls with an
+    archive_path are always simulated too, so the archive gets written.
+
+    Parameters:
+        cache (SimulationCache): Cache to read and store results
+        seed (int): Random seed (default None, not cached)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff the matrices are built with (default the
+                                 notebook's), passed on to simulate
+        simulate (function): Called with the same arguments on a cache miss (default run_full_simuluation, the round
+                             scripts pass their own)
+        simulation_options: Any other run_full_simuluation arguments (e.g., engine='batch', overtime=True)
+        Other parameters as in run_full_simuluation
+    '''
+
+    usage_frames = [homeusage_for, awayusage_for, homeusage_against, awayusage_against]
+    if seed is None or simulation_options.get('archive_path') is not None:
+        cache.bypassed += 1
+        return simulate(home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust,
+                        teamsDF, *usage_frames, seed=seed, home_court_diffs=home_court_diffs, **simulation_options)
+
+    if home_court_diffs is None:
+        home_court_diffs = [homeODiff, homeDDiff, awayODiff, awayDDiff]
+    # keyed on the same rosters and home court differences the matrices are built from
+    key = simulation_fingerprint(home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust,
+                                 simulation_rosters(teamsDF, players_to_update), usage_frames, seed, simulation_options,
+                                 home_court_diffs)
+    outputs = cache.get(key)
+    if outputs is None:
+        outputs = cache.put(key, simulate(home_team, away_team, HFA, players_to_update, number_of_simulations,
+                                          possession_adjust, teamsDF, *usage_frames, seed=seed,
+                                          home_court_diffs=home_court_diffs, **simulation_options))
+    return outputs
+
+
+
+def run_checkpointed_simulation(checkpoint, home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust,
+                                teamsDF, homeusage_for, awayusage_for, homeusage_against, awayusage_against, seed=None,
+                                home_court_diffs=None, **simulation_options):
+
+    '''
+    Returns the outputs of run_full_simuluation, checkpointed so an interrupted batch run can be resumed.
+
+    A matchup finished before the interruption is read back from checkpoint. The one that was in progress continues
+    from its last saved chunk with the accumulator and random states it had, so the outputs are the same as
+    those of an uninterrupted run. Matchups are told apart by the same fingerprint as run_cached_simulation,
+    so changed inputs start over.
+
+    Parameters:
+        checkpoint (SimulationCheckpoint): Checkpoint directory of the batch run
+        seed (int): Random seed (default None)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff the matrices are built with (default the
+                                 notebook's)
+        simulation_options: Any other run_full_simuluation arguments (engine must be 'batch' or 'reference')
+        Other parameters as in run_full_simuluation
+    '''
+
+    usage_frames = [homeusage_for, awayusage_for, homeusage_against, awayusage_against]
+    if home_court_diffs is None:
+        home_court_diffs = [homeODiff, homeDDiff, awayODiff, awayDDiff]
+    # keyed on the same rosters and home court differences the matrices are built from, so a roster change starts over
+    key = simulation_fingerprint(home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust,
+                                 simulation_rosters(teamsDF, players_to_update), usage_frames, seed, simulation_options,
+                                 home_court_diffs)
+    if key in checkpoint:
+        return checkpoint.outputs(key)
 
+    outputs = run_full_simuluation(home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust,
+                                   teamsDF, *usage_frames, seed=seed, checkpoint=checkpoint.matchup(key),
+                                   home_court_diffs=home_court_diffs, **simulation_options)
+    return checkpoint.complete(key, outputs)
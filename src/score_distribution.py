@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+
+
+# Joint distribution of the final score, kept as a sparse histogram of (home points, away points) so any
+# spread or total line can be priced without simulating the matchup again. Only score pairs that actually
+# occur are stored, one row each, with the share of simulated games (or the exact probability) ending there.
+
+SCORE_COLUMNS = ['Home Points', 'Away Points', 'Games', 'Probability']
+
+# points are rounded before pairs are counted, the fractional possession makes scores like 81.37
+SCORE_DECIMALS = 2
+
+# tolerance for a margin or total landing exactly on the line (a push)
+LINE_TOLERANCE = 1e-9
+
+
+# sparse histogram of final scores from arrays of simulated points
+def score_histogram(home_points, away_points, decimals=SCORE_DECIMALS):
+    pairs = np.round(np.column_stack([np.asarray(home_points, dtype=float),
+                                      np.asarray(away_points, dtype=float)]), decimals)
+    return score_histogram_from_counts(pairs, np.ones(len(pairs), dtype=np.int64))
+
+
+# sparse histogram from (home points, away points) pairs and how many games ended with each, pairs may repeat
+def score_histogram_from_counts(pairs, counts):
+    pairs = np.asarray(pairs, dtype=float).reshape(-1, 2)
+    if len(pairs) == 0:
+        return pd.DataFrame(columns=SCORE_COLUMNS)
+
+    unique_pairs, inverse = np.unique(pairs, axis=0, return_inverse=True)
+    games = np.bincount(inverse.ravel(), weights=counts, minlength=len(unique_pairs))
+
+    return pd.DataFrame({'Home Points': unique_pairs[:, 0],
+                         'Away Points': unique_pairs[:, 1],
+                         'Games': games.astype(np.int64),
+                         'Probability': games / games.sum()})
+
+
+# exact histogram from each team's game points distribution (e.g., from game_points_distribution)
+def score_histogram_from_distributions(home_distribution, away_distribution, min_probability=1e-9):
+    home_values, home_probs = home_distribution
+    away_values, away_probs = away_distribution
+
+    joint = np.outer(home_probs, away_probs)
+    home_index, away_index = np.nonzero(joint >= min_probability)
+    probability = joint[home_index, away_index]
+
+    return pd.DataFrame({'Home Points': np.round(home_values[home_index], SCORE_DECIMALS),
+                         'Away Points': np.round(away_values[away_index], SCORE_DECIMALS),
+                         'Games': np.nan,
+                         'Probability': probability / probability.sum()})
+
+
+# sorted distinct values and the cumulative probability up to and including each
+def _cumulative(values, probabilities):
+    distinct, inverse = np.unique(values, return_inverse=True)
+    return distinct, np.cumsum(np.bincount(inverse.ravel(), weights=probabilities, minlength=len(distinct)))
+
+
+# probability mass strictly below and exactly on each line
+def _line_probabilities(values, probabilities, lines):
+    distinct, cumulative = _cumulative(values, probabilities)
+    cumulative = np.concatenate([[0.0], cumulative])
+    lines = np.atleast_1d(np.asarray(lines, dtype=float))
+
+    below = cumulative[np.searchsorted(distinct, lines - LINE_TOLERANCE, side='left')]
+    at_or_below = cumulative[np.searchsorted(distinct, lines + LINE_TOLERANCE, side='right')]
+    return lines, below, at_or_below - below
+
+
+def _margins(score_histogram):
+    return (score_histogram['Home Points'].to_numpy(dtype=float) - score_histogram['Away Points'].to_numpy(dtype=float),
+            score_histogram['Probability'].to_numpy(dtype=float))
+
+
+# home cover, push and away cover probabilities for each home spread (e.g., -5.5 means home gives 5.5 points)
+def spread_probabilities(score_histogram, spreads):
+    margins, probabilities = _margins(score_histogram)
+
+    # home covers when margin + spread > 0, i.e. the margin is above -spread
+    lines, below, push = _line_probabilities(margins, probabilities, -np.asarray(spreads, dtype=float))
+
+    return pd.DataFrame({'Spread': -lines,
+                         'Home Cover': 1 - below - push,
+                         'Push': push,
+                         'Away Cover': below})
+
+
+# over, push and under probabilities for each total points line
+def total_probabilities(score_histogram, totals):
+    total_points = score_histogram['Home Points'].to_numpy(dtype=float) + score_histogram['Away Points'].to_numpy(dtype=float)
+    probabilities = score_histogram['Probability'].to_numpy(dtype=float)
+
+    lines, below, push = _line_probabilities(total_points, probabilities, totals)
+
+    return pd.DataFrame({'Total': lines,
+                         'Over': 1 - below - push,
+                         'Push': push,
+                         'Under': below})
+
+
+# quantiles of the home minus away margin
+def margin_quantiles(score_histogram, quantiles=(0.1, 0.25, 0.5, 0.75, 0.9)):
+    margins, probabilities = _margins(score_histogram)
+    distinct, cumulative = _cumulative(margins, probabilities)
+
+    quantiles = np.asarray(quantiles, dtype=float)
+    index = np.minimum(np.searchsorted(cumulative, quantiles - LINE_TOLERANCE, side='left'), len(distinct) - 1)
+
+    return pd.Series(distinct[index], index=quantiles, name='Margin')
@@ -0,0 +1,222 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from batch_simulation import run_multiple_games_batch_streaming
+from exact_distribution import exact_score_histogram
+from simulation_functions import build_matchup_matrices, home_court_diff_tables
+from simulation_cache import fingerprint
+from assess_teams import update_or_remove_player_data
+
+
+# Regular season standings simulator. Each remaining fixture is run through the matchup machinery once
+# and its joint score distribution cached, then the rest of the season is sampled many times at once
+# from those distributions and every sampled season is ranked with the EuroLeague tiebreakers.
+#
+# Tiebreakers, in order: wins, head to head wins among all the tied teams, head to head point difference
+# among all the tied teams, overall point difference, points scored, then a coin flip. The head to head
+# mini-league is calculated once for the whole tied group and not re-applied to smaller subsets.
+
+# default position cut offs for the EuroLeague regular season
+TOP_POSITIONS = 4
+PLAYOFF_POSITIONS = 6
+PLAY_IN_POSITIONS = 10
+
+
+# joint score distribution of one fixture with tied scores removed, as arrays ready for sampling. A seed (int or
+# SeedSequence) starts both the transition matrix sampling and the batch engine from fixed states
+def fixture_distribution(home_team, away_team, HFA, teamsDF1, possession_adjust=0, engine='exact',
+                         number_of_simulations=20000, seed=None, home_court_diffs=None):
+    seed_sequence = seed if isinstance(seed, np.random.SeedSequence) else np.random.SeedSequence(seed)
+    matrix_seed, simulation_seed = seed_sequence.spawn(2)
+    HomeTeamMatrix, AwayTeamMatrix, simmedpossessions = build_matchup_matrices(
+        home_team, away_team, HFA, teamsDF1, home_court_diffs, seed=None if seed is None else matrix_seed.generate_state(1)[0])
+
+    if engine == 'exact':
+        histogram = exact_score_histogram(HomeTeamMatrix, AwayTeamMatrix, simmedpossessions + possession_adjust)
+    else:
+        accumulator, _ = run_multiple_games_batch_streaming(HomeTeamMatrix, AwayTeamMatrix, number_of_simulations,
+                                                            simmedpossessions + possession_adjust,
+                                                            rng=np.random.default_rng(simulation_seed))
+        histogram = accumulator.score_histogram()
+
+    # ties are dropped the same way analyze_results drops them
+    histogram = histogram[histogram['Home Points'] != histogram['Away Points']]
+    probabilities = histogram['Probability'].to_numpy(dtype=float)
+
+    return {'Home Points': histogram['Home Points'].to_numpy(dtype=float),
+            'Away Points': histogram['Away Points'].to_numpy(dtype=float),
+            'Cumulative': np.cumsum(probabilities) / probabilities.sum(),
+            'Win Percentage': probabilities[histogram['Home Points'].to_numpy() > histogram['Away Points'].to_numpy()].sum() / probabilities.sum()}
+
+
+# fixture_cache key of one fixture: both teams' rows of teamsDF1 (so roster changes and new ratings miss the
+# cache), the home court difference matrices and every setting the distribution depends on
+def fixture_key(home_team, away_team, HFA, teamsDF1, possession_adjust, engine, number_of_simulations, seed, home_court_diffs):
+    rosters = teamsDF1[teamsDF1['Team'].isin([home_team, away_team])]
+    return fingerprint(home_team, away_team, HFA, rosters, possession_adjust, engine,
+                       number_of_simulations if engine != 'exact' else None, seed, list(home_court_diffs))
+
+
+# seed of one fixture, from the run's seed and the fixture's own key, so it is the same whichever fixtures
+# were already cached and in whatever order the fixtures come
+def fixture_seed(seed, key):
+    if seed is None:
+        return None
+    return np.random.SeedSequence([seed, int(key[:16], 16)])
+
+
+# fixture distributions for every remaining game, reusing anything already in fixture_cache
+def fixture_distributions(remaining_fixtures, teamsDF1, HFA=0.8, possession_adjust=0, engine='exact',
+                          number_of_simulations=20000, seed=None, fixture_cache=None, home_court_diffs=None):
+    fixture_cache = {} if fixture_cache is None else fixture_cache
+    home_court_diffs = home_court_diff_tables(home_court_diffs)
+
+    distributions = []
+    for fixture in remaining_fixtures.itertuples(index=False):
+        fixture_hfa = getattr(fixture, 'HFA', HFA)
+        key = fixture_key(fixture.Home_Code, fixture.Away_Code, fixture_hfa, teamsDF1, possession_adjust, engine,
+                          number_of_simulations, seed, home_court_diffs)
+        if key not in fixture_cache:
+            fixture_cache[key] = fixture_distribution(fixture.Home_Code, fixture.Away_Code, fixture_hfa, teamsDF1,
+                                                      possession_adjust=possession_adjust, engine=engine,
+                                                      number_of_simulations=number_of_simulations,
+                                                      seed=fixture_seed(seed, key), home_court_diffs=home_court_diffs)
+        distributions.append(fixture_cache[key])
+
+    return distributions
+
+
+# points of every remaining fixture in every sampled season, shape (seasons, fixtures)
+def sample_fixture_scores(distributions, num_seasons, rng):
+    home_points = np.zeros((num_seasons, len(distributions)))
+    away_points = np.zeros((num_seasons, len(distributions)))
+
+    for fixture, distribution in enumerate(distributions):
+        index = np.searchsorted(distribution['Cumulative'], rng.random(num_seasons), side='right')
+        index = np.minimum(index, len(distribution['Cumulative']) - 1)
+        home_points[:, fixture] = distribution['Home Points'][index]
+        away_points[:, fixture] = distribution['Away Points'][index]
+
+    return home_points, away_points
+
+
+# wins and point difference of team i against team j, from games already played
+def head_to_head_tables(played_games, team_index):
+    num_teams = len(team_index)
+    h2h_wins = np.zeros((num_teams, num_teams))
+    h2h_points = np.zeros((num_teams, num_teams))
+    if played_games is None:
+        return h2h_wins, h2h_points
+
+    for game in played_games.itertuples(index=False):
+        if game.Home_Code not in team_index or game.Away_Code not in team_index:
+            continue
+        home, away = team_index[game.Home_Code], team_index[game.Away_Code]
+        margin = game.Home_Points - game.Away_Points
+        h2h_wins[home, away] += margin > 0
+        h2h_wins[away, home] += margin < 0
+        h2h_points[home, away] += margin
+        h2h_points[away, home] -= margin
+
+    return h2h_wins, h2h_points
+
+
+# final position (1 = first) of every team in every sampled season
+def rank_seasons(wins, point_difference, points_scored, h2h_wins, h2h_points, rng):
+    # head to head records only count games against teams level on wins
+    tied = wins[:, :, None] == wins[:, None, :]
+    tied_h2h_wins = (h2h_wins * tied).sum(axis=2)
+    tied_h2h_points = (h2h_points * tied).sum(axis=2)
+
+    # lexsort sorts by the last key first, every key is negated so higher is better
+    order = np.lexsort((rng.random(wins.shape), -points_scored, -point_difference,
+                        -tied_h2h_points, -tied_h2h_wins, -wins), axis=-1)
+
+    positions = np.empty_like(order)
+    np.put_along_axis(positions, order, np.arange(1, wins.shape[1] + 1)[None, :].repeat(len(wins), axis=0), axis=1)
+    return positions
+
+
+def simulate_season(standings, remaining_fixtures, teamsDF, num_seasons=20000, played_games=None, HFA=0.8,
+                    possession_adjust=0, players_to_update=None, engine='exact', number_of_simulations=20000,
+                    seed=None, fixture_cache=None, top_positions=TOP_POSITIONS, playoff_positions=PLAYOFF_POSITIONS,
+                    play_in_positions=PLAY_IN_POSITIONS, home_court_diffs=None):
+
+    '''
+    Returns the final position distribution and top 4, playoff and play-in probabilities of every team.
+
+    Parameters:
+        standings (DataFrame): Current standings with Team, Wins, Points For and Points Against columns
+        remaining_fixtures (DataFrame): Games left to play with Home_Code and Away_Code (and optionally HFA) columns
+        teamsDF: teamsDF
+        num_seasons (int): Number of seasons to sample (default 20000)
+        played_games (DataFrame): Games already played with Home_Code, Away_Code, Home_Points and Away_Points
+                                  columns, used for head to head tiebreakers (default None)
+        HFA (float): Home court advantage for fixtures without an HFA column (default 0.8)
+        possession_adjust (float): Possession adjustment applied to every fixture (default 0)
+        players_to_update (list): List of dictionaries to add or remove players (default no changes)
+        engine (str): 'exact' or 'batch', how each fixture's score distribution is calculated (default 'exact')
+        number_of_simulations (int): Simulations per fixture for the batch engine (default 20000)
+        seed (int): Random seed, starts every fixture's transition matrices and simulations and the season sampling
+                    from fixed states (default None)
+        fixture_cache (dict): Fixture distributions from a previous call, filled in and reused. Keyed by both
+                              rosters' rows of teamsDF, players_to_update applied, and the simulation settings, so
+                              changed ratings or rosters are recalculated (default None)
+        top_positions (int): Positions counted as top 4 (default 4)
+        playoff_positions (int): Positions that qualify straight to the playoffs (default 6)
+        play_in_positions (int): Last position that qualifies for the play-in (default 10)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff from home_court_advantage
+                                (default the notebook's)
+    '''
+
+    teamsDF1 = update_or_remove_player_data(players_to_update or [], teamsDF)
+    teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
+
+    rng = np.random.default_rng(np.random.SeedSequence(seed).spawn(1)[0])
+
+    teams = list(standings['Team'])
+    team_index = {team: index for index, team in enumerate(teams)}
+    home_index = remaining_fixtures['Home_Code'].map(team_index).to_numpy()
+    away_index = remaining_fixtures['Away_Code'].map(team_index).to_numpy()
+
+    distributions = fixture_distributions(remaining_fixtures, teamsDF1, HFA=HFA, possession_adjust=possession_adjust,
+                                          engine=engine, number_of_simulations=number_of_simulations,
+                                          seed=seed, fixture_cache=fixture_cache, home_court_diffs=home_court_diffs)
+    home_points, away_points = sample_fixture_scores(distributions, num_seasons, rng)
+    home_wins = (home_points > away_points).astype(float)
+
+    # fixtures x teams indicators, so season totals are matrix products
+    num_teams = len(teams)
+    home_onehot = np.eye(num_teams)[home_index]
+    away_onehot = np.eye(num_teams)[away_index]
+
+    wins = standings['Wins'].to_numpy(dtype=float) + home_wins @ home_onehot + (1 - home_wins) @ away_onehot
+    points_for = (standings['Points For'].to_numpy(dtype=float) + home_points @ home_onehot + away_points @ away_onehot)
+    points_against = (standings['Points Against'].to_numpy(dtype=float) + away_points @ home_onehot + home_points @ away_onehot)
+
+    played_wins, played_points = head_to_head_tables(played_games, team_index)
+    h2h_wins = np.repeat(played_wins[None, :, :], num_seasons, axis=0)
+    h2h_points = np.repeat(played_points[None, :, :], num_seasons, axis=0)
+    for fixture, (home, away) in enumerate(zip(home_index, away_index)):
+        margin = home_points[:, fixture] - away_points[:, fixture]
+        h2h_wins[:, home, away] += home_wins[:, fixture]
+        h2h_wins[:, away, home] += 1 - home_wins[:, fixture]
+        h2h_points[:, home, away] += margin
+        h2h_points[:, away, home] -= margin
+
+    positions = rank_seasons(wins, points_for - points_against, points_for, h2h_wins, h2h_points, rng)
+
+    position_counts = np.stack([(positions == position).mean(axis=0) for position in range(1, num_teams + 1)], axis=1)
+    season_table = pd.DataFrame(position_counts, columns=list(range(1, num_teams + 1)))
+    season_table.insert(0, 'Team', teams)
+    season_table.insert(1, 'Expected Wins', wins.mean(axis=0))
+    season_table.insert(2, 'Average Position', positions.mean(axis=0))
+    season_table.insert(3, 'Top 4', (positions <= top_positions).mean(axis=0))
+    season_table.insert(4, 'Playoffs', (positions <= playoff_positions).mean(axis=0))
+    season_table.insert(5, 'Play-In', ((positions > playoff_positions) & (positions <= play_in_positions)).mean(axis=0))
+
+    return season_table.sort_values('Average Position').reset_index(drop=True)
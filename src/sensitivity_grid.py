@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from exact_distribution import possession_outcome_distribution, game_points_distribution, matchup_outcome_probabilities
+from paired_simulation import simulate_paired_games
+from simulation_functions import build_base_matrices, apply_home_court_advantage
+from assess_teams import update_or_remove_player_data
+
+
+# Sweep home court advantage and possession adjustment for one matchup. The offense and defense matrices
+# are built once, since HFA only rescales how they are combined and possession_adjust only changes how
+# many possessions are played. Every grid point is then run in one pass on the same random numbers.
+
+# win percentage, supremacy and total of every grid point from simulated points, ties dropped like analyze_results
+def grid_results(team_a_points, team_b_points, grid):
+    rows = []
+    for (HFA, possession_adjust, simmedpossessions), home_points, away_points in zip(grid, team_a_points, team_b_points):
+        decided = home_points != away_points
+        num_games = decided.sum()
+        rows.append({'HFA': HFA,
+                     'Possession Adjust': possession_adjust,
+                     'Possessions': simmedpossessions,
+                     'Win Percentage': (home_points[decided] > away_points[decided]).sum() / num_games if num_games > 0 else None,
+                     'Supremacy': (home_points[decided] - away_points[decided]).mean() if num_games > 0 else None,
+                     'Total': (home_points[decided] + away_points[decided]).mean() if num_games > 0 else None,
+                     'Tie Percentage': 1 - num_games / len(home_points)})
+    return pd.DataFrame(rows)
+
+
+# same table calculated exactly, each team's possession distribution is solved once per HFA value
+def exact_grid_results(matrices_by_hfa, possession_adjust_values, simmedpossessions):
+    rows = []
+    for HFA, (HomeTeamMatrix, AwayTeamMatrix) in matrices_by_hfa.items():
+        home_points = possession_outcome_distribution(HomeTeamMatrix)['points']
+        away_points = possession_outcome_distribution(AwayTeamMatrix)['points']
+
+        for possession_adjust in possession_adjust_values:
+            possessions = simmedpossessions + possession_adjust
+            outcome = matchup_outcome_probabilities(game_points_distribution(home_points, possessions),
+                                                    game_points_distribution(away_points, possessions))
+            rows.append({'HFA': HFA,
+                         'Possession Adjust': possession_adjust,
+                         'Possessions': possessions,
+                         'Win Percentage': outcome['Win Percentage'][0] if outcome['Supremacy'] is not None else None,
+                         'Supremacy': outcome['Supremacy'],
+                         'Total': outcome['Total'],
+                         'Tie Percentage': outcome['Tie Percentage']})
+    return pd.DataFrame(rows)
+
+
+def sensitivity_grid(home_team, away_team, HFA_values, possession_adjust_values, number_of_simulations, teamsDF,
+                     players_to_update=None, engine='batch', seed=None, home_court_diffs=None):
+
+    '''
+    Returns win percentage, supremacy and total for every combination of HFA and possession_adjust.
+
+    Parameters:
+        home_team (str): Team code (e.g., 'MAD')
+        away_team (str): Team code (e.g., 'BAR')
+        HFA_values (list): Home court advantages to try (e.g., [0, 0.4, 0.8, 1.2])
+        possession_adjust_values (list): Possession adjustments to try (e.g., [-7, -3, 0])
+        number_of_simulations (int): Number of simulations per grid point, ignored by the exact engine
+        teamsDF: teamsDF
+        players_to_update (list): List of dictionaries to add or remove players (default no changes)
+        engine (str): 'batch' (simulated on common random numbers) or 'exact' (default 'batch')
+        seed (int): Random seed, starts the transition matrix sampling and the batch engine (default None)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff from home_court_advantage
+                                (default the notebook's)
+    '''
+
+    teamsDF1 = update_or_remove_player_data(players_to_update or [], teamsDF)
+    teamsDF1 = teamsDF1[teamsDF1['PlayedInMostRecentGame'] == 1]
+
+    team1, team2, simmedpossessions = build_base_matrices(home_team, away_team, teamsDF1, seed=seed)
+    matrices_by_hfa = {HFA: apply_home_court_advantage(team1, team2, HFA, home_court_diffs) for HFA in HFA_values}
+
+    if engine == 'exact':
+        return exact_grid_results(matrices_by_hfa, possession_adjust_values, simmedpossessions)
+
+    grid = [(HFA, possession_adjust, simmedpossessions + possession_adjust)
+            for HFA in HFA_values for possession_adjust in possession_adjust_values]
+    scenario_matrices = [matrices_by_hfa[HFA] + (possessions,) for HFA, _, possessions in grid]
+
+    team_a_points, team_b_points = simulate_paired_games(scenario_matrices, number_of_simulations, seed=seed)
+
+    return grid_results(team_a_points, team_b_points, grid)
@@ -0,0 +1,327 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import numpy as np
+import pandas as pd
+from score_distribution import SCORE_DECIMALS, score_histogram_from_counts
+from compact_results import CompactGameResults
+
+
+# Streaming aggregation of simulated games. Games are added as they are produced (one at a time from
+# run_multiple_games or in arrays from run_multiple_games_batch), so memory stays constant no matter
+# how many games are simulated. Means and variances use Welford's method, merged with Chan's formula
+# for batches.
+
+POINTS_BINS = np.arange(0, 201)
+MARGIN_BINS = np.arange(-100, 101)
+
+# per game count of overtimes played, added to the game metrics when ties are resolved by overtime
+OVERTIME_KEY = 'Overtimes'
+
+# raw scores held before they are reduced into the sparse score histogram
+SCORE_REDUCE_SIZE = 1000000
+
+# a (team a points, team b points) pair, rounded to SCORE_DECIMALS, is held as one integer key so reducing
+# the histogram is a 1-d unique instead of a row-wise one
+SCORE_SCALE = 10 ** SCORE_DECIMALS
+SCORE_KEY_SHIFT = 32
+
+
+class SimulationAccumulator:
+
+    '''
+    Running totals for the simulated games of one matchup.
+
+    Tied games are counted but left out of the averages, the same way analyze_results drops them.
+    The joint (home points, away points) histogram keeps every game, ties included. Games simulated with
+    overtime are counted towards the Overtime Percentage.
+
+    Parameters:
+        points_bins (array): Bin edges for each team's points histogram (default 0-200 by 1)
+        margin_bins (array): Bin edges for the team a minus team b margin histogram (default -100-100 by 1)
+        buffer_size (int): Games added one at a time are folded in after this many (default 1000)
+        keep_games (bool): Also keep every decided game's metrics, e.g. for player level box scores (default False).
+                           Games added as CompactGameResults are kept in that form until game_results() is called
+        archive (GameArchiveWriter): Also write every game, ties included, to this archive (default None)
+    '''
+
+    def __init__(self, points_bins=POINTS_BINS, margin_bins=MARGIN_BINS, buffer_size=1000, keep_games=False, archive=None):
+        self.buffer_size = buffer_size
+        self.keep_games = keep_games
+        self.archive = archive
+        self.kept_games = []
+        self.pending = []
+        self.points_bins = np.asarray(points_bins, dtype=float)
+        self.margin_bins = np.asarray(margin_bins, dtype=float)
+        self.metric_keys = None
+        self.games = 0
+        self.ties = 0
+        self.decided = 0
+        self.team_a_wins = 0
+        self.team_b_wins = 0
+        self.totals = None
+        self.means = None
+        self.m2 = None
+        self.points_histogram = np.zeros((2, len(self.points_bins) - 1), dtype=np.int64)
+        self.margin_histogram = np.zeros(len(self.margin_bins) - 1, dtype=np.int64)
+        self.overtime_games = None
+        self.overtime_periods = 0
+        self.score_keys = np.zeros(0, dtype=np.int64)
+        self.score_counts = np.zeros(0, dtype=np.int64)
+        self.score_batches = []
+        self.pending_scores = 0
+
+    def _start(self, team_a_keys, team_b_keys):
+        self.metric_keys = ([key for key in team_a_keys if key != OVERTIME_KEY],
+                            [key for key in team_b_keys if key != OVERTIME_KEY])
+        # one row per value tracked: team a metrics, team b metrics, then margin and total
+        size = len(self.metric_keys[0]) + len(self.metric_keys[1]) + 2
+        self.totals = np.zeros(size)
+        self.means = np.zeros(size)
+        self.m2 = np.zeros(size)
+
+    def _values(self, team_a_metrics, team_b_metrics):
+        team_a_points = np.asarray(team_a_metrics['Points'], dtype=float)
+        team_b_points = np.asarray(team_b_metrics['Points'], dtype=float)
+        return np.vstack([np.asarray(team_a_metrics[key], dtype=float) for key in self.metric_keys[0]] +
+                         [np.asarray(team_b_metrics[key], dtype=float) for key in self.metric_keys[1]] +
+                         [team_a_points - team_b_points, team_a_points + team_b_points])
+
+    def _histogram(self, values, bins):
+        index = np.searchsorted(bins, values, side='right') - 1
+        index = np.clip(index, 0, len(bins) - 2)
+        return np.bincount(index, minlength=len(bins) - 1)
+
+    # hold score keys until enough have built up to be worth reducing
+    def _add_scores(self, keys, counts):
+        self.score_batches.append((keys, counts))
+        self.pending_scores += len(keys)
+        if self.pending_scores >= SCORE_REDUCE_SIZE:
+            self._reduce_scores()
+
+    # fold the held keys into the sparse score histogram (unique keys and their counts)
+    def _reduce_scores(self):
+        if not self.score_batches:
+            return
+        keys = np.concatenate([self.score_keys] + [keys for keys, _ in self.score_batches])
+        counts = np.concatenate([self.score_counts] + [counts for _, counts in self.score_batches])
+        self.score_keys, inverse = np.unique(keys, return_inverse=True)
+        self.score_counts = np.bincount(inverse, weights=counts, minlength=len(self.score_keys)).astype(np.int64)
+        self.score_batches = []
+        self.pending_scores = 0
+
+    # (team a points, team b points) pairs of the reduced histogram
+    def score_pairs(self):
+        self._reduce_scores()
+        return np.column_stack([self.score_keys >> SCORE_KEY_SHIFT,
+                                self.score_keys & ((1 << SCORE_KEY_SHIFT) - 1)]) / SCORE_SCALE
+
+    # add one simulated game, in the format produced by run_multiple_games
+    def add_game(self, team_a_metrics, team_b_metrics):
+        self.pending.append((team_a_metrics, team_b_metrics))
+        if len(self.pending) >= self.buffer_size:
+            self.flush()
+        return self
+
+    # add a list of simulated games, in the format produced by run_multiple_games
+    def add_games(self, results):
+        if len(results) == 0:
+            return self
+        team_a_metrics = {key: np.array([game[0][key] for game in results], dtype=float) for key in results[0][0]}
+        team_b_metrics = {key: np.array([game[1][key] for game in results], dtype=float) for key in results[0][1]}
+        return self.add_batch((team_a_metrics, team_b_metrics))
+
+    # fold any games added one at a time into the running totals
+    def flush(self):
+        pending, self.pending = self.pending, []
+        return self.add_games(pending)
+
+    # add many simulated games, in the format produced by run_multiple_games_batch or as CompactGameResults
+    def add_batch(self, results):
+        compact = results if isinstance(results, CompactGameResults) else None
+        team_a_metrics, team_b_metrics = results.metrics() if compact is not None else results
+        if self.archive is not None:
+            self.archive.add_batch(results, (team_a_metrics, team_b_metrics))
+        if self.metric_keys is None:
+            self._start(team_a_metrics.keys(), team_b_metrics.keys())
+
+        team_a_points = np.asarray(team_a_metrics['Points'], dtype=float)
+        team_b_points = np.asarray(team_b_metrics['Points'], dtype=float)
+        decided = team_a_points != team_b_points
+        num_games = len(team_a_points)
+        num_decided = int(decided.sum())
+
+        self.games += num_games
+        self.ties += num_games - num_decided
+        if OVERTIME_KEY in team_a_metrics:
+            overtimes = np.asarray(team_a_metrics[OVERTIME_KEY])
+            self.overtime_games = (self.overtime_games or 0) + int((overtimes > 0).sum())
+            self.overtime_periods += int(overtimes.sum())
+        self._add_scores((np.round(team_a_points * SCORE_SCALE).astype(np.int64) << SCORE_KEY_SHIFT) +
+                         np.round(team_b_points * SCORE_SCALE).astype(np.int64), np.ones(num_games, dtype=np.int64))
+        if num_decided == 0:
+            return self
+
+        if self.keep_games and compact is not None:
+            self.kept_games.append(compact.select(decided))
+        elif self.keep_games:
+            self.kept_games.append(({key: np.asarray(value)[decided] for key, value in team_a_metrics.items()},
+                                    {key: np.asarray(value)[decided] for key, value in team_b_metrics.items()}))
+
+        values = self._values(team_a_metrics, team_b_metrics)[:, decided]
+        batch_means = values.mean(axis=1)
+        batch_m2 = ((values - batch_means[:, None]) ** 2).sum(axis=1)
+        self._merge_moments(num_decided, values.sum(axis=1), batch_means, batch_m2)
+
+        self.team_a_wins += int((team_a_points[decided] > team_b_points[decided]).sum())
+        self.team_b_wins += int((team_b_points[decided] > team_a_points[decided]).sum())
+
+        self.points_histogram[0] += self._histogram(team_a_points[decided], self.points_bins)
+        self.points_histogram[1] += self._histogram(team_b_points[decided], self.points_bins)
+        self.margin_histogram += self._histogram(team_a_points[decided] - team_b_points[decided], self.margin_bins)
+
+        return self
+
+    def _merge_moments(self, count, totals, means, m2):
+        combined = self.decided + count
+        delta = means - self.means
+        self.means = self.means + delta * count / combined
+        self.m2 = self.m2 + m2 + delta ** 2 * self.decided * count / combined
+        self.totals = self.totals + totals
+        self.decided = combined
+
+    # combine with an accumulator built from a different set of games (e.g., another worker)
+    def merge(self, other):
+        self.flush()
+        other.flush()
+        if other.metric_keys is None:
+            return self
+        if self.metric_keys is None:
+            self._start(*other.metric_keys)
+
+        self.games += other.games
+        self.ties += other.ties
+        if other.overtime_games is not None:
+            self.overtime_games = (self.overtime_games or 0) + other.overtime_games
+            self.overtime_periods += other.overtime_periods
+        other._reduce_scores()
+        self._add_scores(other.score_keys, other.score_counts)
+        self.kept_games.extend(other.kept_games)
+        if other.decided > 0:
+            self._merge_moments(other.decided, other.totals, other.means, other.m2)
+        self.team_a_wins += other.team_a_wins
+        self.team_b_wins += other.team_b_wins
+        self.points_histogram += other.points_histogram
+        self.margin_histogram += other.margin_histogram
+
+        return self
+
+    def _variances(self):
+        if self.decided < 2:
+            return np.zeros_like(self.m2)
+        return self.m2 / (self.decided - 1)
+
+    # same layout as analyze_results
+    def results_df(self, simmedpossessions, team_a_name, team_b_name):
+        self.flush()
+        metrics_data = []
+        num_games = self.decided
+
+        if num_games == 0:
+            metrics_data.append({"Metric": "Average", team_a_name: None, team_b_name: None})
+            metrics_data.append({"Metric": "Win Percentage", team_a_name: 0, team_b_name: 0})
+            metrics_data.append({"Metric": "Tie Percentage", team_a_name: 1, team_b_name: None})
+            metrics_data.append({"Metric": "Supremacy", team_a_name: None, team_b_name: None})
+            metrics_data.append({"Metric": "Total", team_a_name: None, team_b_name: None})
+            return pd.DataFrame(metrics_data)
+
+        team_a_keys, team_b_keys = self.metric_keys
+        team_a_totals = dict(zip(team_a_keys, self.totals[:len(team_a_keys)]))
+        team_b_totals = dict(zip(team_b_keys, self.totals[len(team_a_keys):len(team_a_keys) + len(team_b_keys)]))
+
+        for key in team_a_keys:
+            team_a_average = team_a_totals[key] / num_games
+            team_b_average = team_b_totals[key] / num_games if key in team_b_totals else None
+            metrics_data.append({"Metric": key, team_a_name: team_a_average, team_b_name: team_b_average})
+
+        metrics_data.append({"Metric": "Win Percentage", team_a_name: self.team_a_wins / num_games, team_b_name: self.team_b_wins / num_games})
+
+        sup_team_a = (team_a_totals['Points'] - team_b_totals['Points']) / num_games
+        sup_team_b = (team_b_totals['Points'] - team_a_totals['Points']) / num_games
+        metrics_data.append({"Metric": "Supremacy", team_a_name: sup_team_a, team_b_name: sup_team_b})
+
+        total_points = (team_a_totals['Points'] + team_b_totals['Points']) / num_games
+        metrics_data.append({"Metric": "Total", team_a_name: total_points, team_b_name: total_points})
+        metrics_data.append({"Metric": "Possessions", team_a_name: simmedpossessions, team_b_name: simmedpossessions})
+        if self.overtime_games is not None:
+            overtime_pct = self.overtime_percentage()
+            metrics_data.append({"Metric": "Overtime Percentage", team_a_name: overtime_pct, team_b_name: overtime_pct})
+
+        return pd.DataFrame(metrics_data)
+
+    # standard error of every average reported in results_df
+    def standard_errors_df(self, team_a_name, team_b_name):
+        self.flush()
+        metrics_data = []
+        num_games = self.decided
+        if num_games == 0:
+            return pd.DataFrame(metrics_data, columns=["Metric", team_a_name, team_b_name])
+
+        team_a_keys, team_b_keys = self.metric_keys
+        standard_errors = np.sqrt(self._variances() / num_games)
+        team_a_errors = dict(zip(team_a_keys, standard_errors[:len(team_a_keys)]))
+        team_b_errors = dict(zip(team_b_keys, standard_errors[len(team_a_keys):len(team_a_keys) + len(team_b_keys)]))
+
+        for key in team_a_keys:
+            metrics_data.append({"Metric": key, team_a_name: team_a_errors[key], team_b_name: team_b_errors.get(key)})
+
+        win_error = self.win_standard_error()
+        metrics_data.append({"Metric": "Win Percentage", team_a_name: win_error, team_b_name: win_error})
+        metrics_data.append({"Metric": "Supremacy", team_a_name: standard_errors[-2], team_b_name: standard_errors[-2]})
+        metrics_data.append({"Metric": "Total", team_a_name: standard_errors[-1], team_b_name: standard_errors[-1]})
+        metrics_data.append({"Metric": "Simulations", team_a_name: self.games, team_b_name: self.games})
+
+        return pd.DataFrame(metrics_data)
+
+    # standard error of team a's win percentage
+    def win_standard_error(self):
+        self.flush()
+        if self.decided == 0:
+            return np.inf
+        win_pct = self.team_a_wins / self.decided
+        return np.sqrt(win_pct * (1 - win_pct) / self.decided)
+
+    # standard error of the supremacy (team a minus team b points)
+    def supremacy_standard_error(self):
+        self.flush()
+        if self.decided < 2:
+            return np.inf
+        return np.sqrt(self._variances()[-2] / self.decided)
+
+    # metrics of every decided game kept so far, in the format produced by run_multiple_games_batch
+    def game_results(self):
+        self.flush()
+        if not self.kept_games:
+            return {}, {}
+        kept_games = [games.metrics() if isinstance(games, CompactGameResults) else games for games in self.kept_games]
+        team_a_metrics = {key: np.concatenate([games[0][key] for games in kept_games]) for key in kept_games[0][0]}
+        team_b_metrics = {key: np.concatenate([games[1][key] for games in kept_games]) for key in kept_games[0][1]}
+        return team_a_metrics, team_b_metrics
+
+    # sparse joint histogram of final scores, see score_distribution for the spread and total helpers
+    def score_histogram(self):
+        self.flush()
+        return score_histogram_from_counts(self.score_pairs(), self.score_counts)
+
+    # share of games that needed at least one overtime (None if games were simulated without overtime)
+    def overtime_percentage(self):
+        self.flush()
+        if self.overtime_games is None:
+            return None
+        return self.overtime_games / self.games if self.games > 0 else 0
+
+    def tie_percentage(self):
+        self.flush()
+        return self.ties / self.games if self.games > 0 else 0
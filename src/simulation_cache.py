@@ -0,0 +1,180 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import os
+import pickle
+import hashlib
+import numpy as np
+import pandas as pd
+
+
+# On disk cache of matchup simulation outputs. Every entry is stored under a fingerprint of everything
+# the outputs depend on, so rerunning a round where nothing changed reads the results back instead of
+# simulating again. Only seeded simulations are repeatable, so only they are cached.
+
+# bump when a change to the simulation gives different outputs for the same inputs
+CACHE_VERSION = 2
+
+DEFAULT_CACHE_BYTES = 512 * 1024 ** 2
+
+
+# feed a value into a hash, DataFrames by their contents and numbers by value whatever their type
+def _update_digest(digest, value):
+    if isinstance(value, pd.DataFrame):
+        digest.update(repr(list(value.columns)).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, pd.Series):
+        digest.update(repr(value.name).encode())
+        digest.update(pd.util.hash_pandas_object(value, index=False).to_numpy().tobytes())
+    elif isinstance(value, np.ndarray):
+        digest.update(f"{value.dtype}{value.shape}".encode())
+        digest.update(np.ascontiguousarray(value).tobytes())
+    elif isinstance(value, dict):
+        digest.update(f"dict{len(value)}".encode())
+        for key in sorted(value, key=repr):
+            _update_digest(digest, key)
+            _update_digest(digest, value[key])
+    elif isinstance(value, (list, tuple)):
+        digest.update(f"list{len(value)}".encode())
+        for item in value:
+            _update_digest(digest, item)
+    elif isinstance(value, (bool, np.bool_)):
+        digest.update(repr(bool(value)).encode())
+    elif isinstance(value, (int, np.integer)):
+        digest.update(repr(int(value)).encode())
+    elif isinstance(value, (float, np.floating)):
+        digest.update(repr(float(value)).encode())
+    else:
+        digest.update(repr(value).encode())
+    # separator, so consecutive values cannot run into each other
+    digest.update(b'|')
+
+
+def fingerprint(*values):
+    digest = hashlib.sha256()
+    for value in values:
+        _update_digest(digest, value)
+    return digest.hexdigest()
+
+
+def simulation_fingerprint(home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust, teamsDF1,
+                           usage_frames, seed, simulation_options=None, home_court_diffs=None):
+
+    '''
+    Returns the cache key of one run_full_simuluation call.
+
+    The transition matrices are sampled from the two rosters' ratings, so they are fingerprinted by what they are
+    built from: both teams' rows of the rosters that are simulated (teamsDF with players_to_update applied, see
+    simulation_rosters in run_simulation) and the home court difference matrices.
+
+    Parameters:
+        home_team (str): Team code (e.g., 'MAD')
+        away_team (str): Team code (e.g., 'BAR')
+        HFA (float): Home court advantage (e.g., 0.8)
+        players_to_update (list): List of dictionaries to add or remove players
+        number_of_simulations (int): Number of simulations
+        possession_adjust (float): Possession adjustment
+        teamsDF1: Rosters the matrices are built from
+        usage_frames (list): homeusage_for, awayusage_for, homeusage_against and awayusage_against
+        seed (int): Random seed
+        simulation_options (dict): Any other arguments that change the outputs (e.g., engine, workers, overtime)
+        home_court_diffs (list): homeODiff, homeDDiff, awayODiff and awayDDiff (default None)
+    '''
+
+    players_to_update = players_to_update or []
+    rosters = teamsDF1[teamsDF1['Team'].isin([home_team, away_team])]
+
+    return fingerprint(CACHE_VERSION, home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust,
+                       seed, simulation_options or {}, rosters, list(usage_frames), list(home_court_diffs or []))
+
+
+class SimulationCache:
+
+    '''
+    Content addressed on disk cache, one pickle file per key.
+
+    Once the files add up to more than max_bytes the least recently used are deleted. Reading an entry
+    counts as using it. hits, misses and bypassed (calls that could not be cached) are counted for report().
+
+    Parameters:
+        directory (str): Cache directory, created if missing
+        max_bytes (int): Size limit of the cache (default 512 MB)
+    '''
+
+    def __init__(self, directory, max_bytes=DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.bypassed = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    # cached value of key, or None (a file that cannot be read counts as a miss and is removed)
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                value = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except (pickle.UnpicklingError, EOFError, AttributeError, ImportError):
+            os.remove(path)
+            self.misses += 1
+            return None
+
+        os.utime(path)
+        self.hits += 1
+        return value
+
+    # store value under key, written to a temporary file first so a reader never sees half an entry
+    def put(self, key, value):
+        path = self._path(key)
+        temporary_path = f"{path}.{os.getpid()}.tmp"
+        with open(temporary_path, 'wb') as f:
+            pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(temporary_path, path)
+        self.evict()
+        return value
+
+    # one row per entry, least recently used first
+    def entries(self):
+        rows = []
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                stat = os.stat(os.path.join(self.directory, name))
+                rows.append({'Key': name[:-4], 'Bytes': stat.st_size, 'Last Used': stat.st_mtime})
+        return pd.DataFrame(rows, columns=['Key', 'Bytes', 'Last Used']).sort_values('Last Used').reset_index(drop=True)
+
+    # delete the least recently used entries until the cache fits in max_bytes
+    def evict(self):
+        entries = self.entries()
+        excess = entries['Bytes'].sum() - self.max_bytes
+        for entry in entries.itertuples(index=False):
+            if excess <= 0:
+                break
+            os.remove(self._path(entry.Key))
+            excess -= entry.Bytes
+            self.evictions += 1
+
+    def clear(self):
+        for key in self.entries()['Key']:
+            os.remove(self._path(key))
+
+    # hits, misses and size of the cache
+    def report(self):
+        entries = self.entries()
+        lookups = self.hits + self.misses
+        return pd.DataFrame([{'Hits': self.hits,
+                              'Misses': self.misses,
+                              'Bypassed': self.bypassed,
+                              'Hit Rate': self.hits / lookups if lookups > 0 else 0,
+                              'Entries': len(entries),
+                              'Megabytes': entries['Bytes'].sum() / 1024 ** 2,
+                              'Evictions': self.evictions}])
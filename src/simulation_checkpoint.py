@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# coding: utf-8
+
+# In[ ]:
+
+import os
+import pickle
+
+
+# Checkpoints for long batch runs (a round, a season of rounds). Every finished matchup is stored in its
+# own file under its simulation_fingerprint, written once, and the matchup in progress saves its transition
+# matrices, accumulator and random states to one partial file after every chunk of games, so a save never
+# rewrites the finished matchups. After a crash or Ctrl-C the same loop run again skips the finished
+# matchups and picks the interrupted one up at its last chunk, giving the same results as a run that was
+# never interrupted.
+
+# games between checkpoints, the batch engine's own chunk size so checkpointed results match unchecked ones
+CHECKPOINT_CHUNK_SIZE = 5000
+
+PARTIAL_FILE = 'partial.pkl'
+
+
+# pickled to a temporary file first, so an interruption while saving leaves the last version intact
+def _write(path, value):
+    temporary_path = f"{path}.{os.getpid()}.tmp"
+    with open(temporary_path, 'wb') as f:
+        pickle.dump(value, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temporary_path, path)
+
+
+def _read(path):
+    with open(path, 'rb') as f:
+        return pickle.load(f)
+
+
+class MatchupCheckpoint:
+
+    '''
+    State of the matchup in progress, saved through the SimulationCheckpoint it belongs to.
+
+    Parameters:
+        checkpoint (SimulationCheckpoint): The batch checkpoint
+        key (str): Fingerprint of the matchup
+    '''
+
+    def __init__(self, checkpoint, key):
+        self.checkpoint = checkpoint
+        self.key = key
+        self.chunk_size = checkpoint.chunk_size
+
+    # saved state of this matchup, or None if it has not started (or another matchup was in progress)
+    def load(self):
+        partial = self.checkpoint.partial
+        if partial is None or partial['key'] != self.key:
+            return None
+        return partial['state']
+
+    def save(self, **state):
+        self.checkpoint.partial = {'key': self.key, 'state': state}
+        self.checkpoint.save()
+
+
+class SimulationCheckpoint:
+
+    '''
+    Checkpoint directory of a batch run: one file with the outputs of each finished matchup and one with the
+    state of the matchup in progress.
+
+    Only one matchup is in progress at a time, starting another discards the partial state of the last.
+    Delete the files with clear() once the run is done.
+
+    Parameters:
+        directory (str): Checkpoint directory (e.g., 'data/checkpoints/round_33'), created if missing and
+                         resumed from if it holds an earlier run
+        chunk_size (int): Games simulated between checkpoints (default 5000)
+    '''
+
+    def __init__(self, directory, chunk_size=CHECKPOINT_CHUNK_SIZE):
+        self.directory = directory
+        self.chunk_size = chunk_size
+        self.partial = None
+        os.makedirs(directory, exist_ok=True)
+        if os.path.exists(self._partial_path()):
+            self.partial = _read(self._partial_path())
+
+    def _path(self, key):
+        return os.path.join(self.directory, f"{key}.pkl")
+
+    def _partial_path(self):
+        return os.path.join(self.directory, PARTIAL_FILE)
+
+    def __contains__(self, key):
+        return os.path.exists(self._path(key))
+
+    def matchup(self, key):
+        return MatchupCheckpoint(self, key)
+
+    # outputs of a finished matchup
+    def outputs(self, key):
+        return _read(self._path(key))
+
+    # write a finished matchup's outputs to their own file and drop its partial state
+    def complete(self, key, outputs):
+        _write(self._path(key), outputs)
+        self.partial = None
+        if os.path.exists(self._partial_path()):
+            os.remove(self._partial_path())
+        return outputs
+
+    # only the partial state is rewritten, the finished matchups' files are left alone
+    def save(self):
+        _write(self._partial_path(), self.partial)
+
+    def clear(self):
+        self.partial = None
+        for name in os.listdir(self.directory):
+            if name.endswith('.pkl'):
+                os.remove(os.path.join(self.directory, name))
@@ -3,11 +3,28 @@
 
 # In[ ]:
 
+import numpy as np
+import pandas as pd
+from collections import Counter
+from transition_matrices import calculate_transition_matrix_offense, calculate_transition_matrix_defense
+from batch_simulation import run_multiple_games_batch_streaming, overtime_possessions, MAX_OVERTIMES
+from exact_distribution import exact_matchup_results, exact_score_histogram
+from parallel_simulation import run_multiple_games_parallel
+from clock_simulation import (team_duration_tables, matchup_duration_tables, run_multiple_games_clock_streaming,
+                              period_lines_df)
+from simulation_accumulator import SimulationAccumulator
+from game_archive import GameArchiveWriter
+from compact_results import possession_points, count_row, stats_counter
+from compiled_matrix import CompiledMatrix, STATE_INDEX, compile_matrix
+
 
 # Functions to simulate possession, games, and multiple games and append to final dataset for results
 
 # function to simulate one possession 
 def simulate_possession(transition_matrix, initial_state='Initial Possession', max_steps=25):
+    if isinstance(transition_matrix, CompiledMatrix):
+        return transition_matrix.simulate_possession(initial_state, max_steps)
+
     states = transition_matrix.index
     terminal_states = ['3pt Make', '2pt Make', 'FT Make 2', 'Turnover', 
                         '2pt NonOreb', '3pt NonOreb', 'FT NonOreb']
@@ -26,6 +43,13 @@ def simulate_possession(transition_matrix, initial_state='Initial Possession', m
     return possession_steps
 
 
+# one possession as state codes (see compiled_matrix.STATES)
+def simulate_possession_codes(transition_matrix, max_steps=25):
+    if isinstance(transition_matrix, CompiledMatrix):
+        return transition_matrix.simulate_possession_codes(max_steps=max_steps)
+    return [STATE_INDEX[state] for state in simulate_possession(transition_matrix, max_steps=max_steps)]
+
+
 # count points scored on possession
 def calculate_possession_stats(possession):
     stats = Counter(possession)
@@ -42,33 +66,35 @@ def calculate_possession_stats(possession):
     return stats
 
 
-# simulate a game based on number of possessions in the game
+# simulate a game based on number of possessions in the game. possessions are tallied as state codes and
+# turned into Counters of labels once per game
 def simulate_game(team_a_matrix, team_b_matrix, simmedpossessions2):
-    team_a_stats = Counter()
-    team_b_stats = Counter()
+    team_a_codes, team_b_codes = [], []
+    team_a_points = team_b_points = 0
 
     full_possessions = int(simmedpossessions2)
     fractional_possession = simmedpossessions2 - full_possessions
 
     for _ in range(full_possessions):
-        team_a_possession = simulate_possession(team_a_matrix)
-        team_a_stats += calculate_possession_stats(team_a_possession)
-        
-        team_b_possession = simulate_possession(team_b_matrix)
-        team_b_stats += calculate_possession_stats(team_b_possession)
+        team_a_possession = simulate_possession_codes(team_a_matrix)
+        team_a_codes += team_a_possession
+        team_a_points += possession_points(team_a_possession)
+
+        team_b_possession = simulate_possession_codes(team_b_matrix)
+        team_b_codes += team_b_possession
+        team_b_points += possession_points(team_b_possession)
+
+    team_a_stats = count_row(team_a_codes, team_a_points)
+    team_b_stats = count_row(team_b_codes, team_b_points)
 
     if fractional_possession > 0:
-        team_a_fractional = simulate_possession(team_a_matrix)
-        team_a_fractional_stats = calculate_possession_stats(team_a_fractional)
-        for key in team_a_fractional_stats:
-            team_a_stats[key] += team_a_fractional_stats[key] * fractional_possession
-        
-        team_b_fractional = simulate_possession(team_b_matrix)
-        team_b_fractional_stats = calculate_possession_stats(team_b_fractional)
-        for key in team_b_fractional_stats:
-            team_b_stats[key] += team_b_fractional_stats[key] * fractional_possession
-    
-    return team_a_stats, team_b_stats
+        team_a_fractional = simulate_possession_codes(team_a_matrix)
+        team_a_stats = team_a_stats + count_row(team_a_fractional, possession_points(team_a_fractional)) * fractional_possession
+
+        team_b_fractional = simulate_possession_codes(team_b_matrix)
+        team_b_stats = team_b_stats + count_row(team_b_fractional, possession_points(team_b_fractional)) * fractional_possession
+
+    return stats_counter(team_a_stats), stats_counter(team_b_stats)
 
 
 # team metrics from game simulation
@@ -98,84 +124,307 @@ def calculate_team_metrics(stats):
     return metrics
 
 
+# simulate one game and return both teams' metrics
+def simulate_game_metrics(team_a_matrix, team_b_matrix, simmedpossessions, overtime=False, pace_dispersion=None):
+    # draw this game's possessions around the expected pace
+    if pace_dispersion:
+        simmedpossessions = max(np.random.normal(simmedpossessions, pace_dispersion), 1)
+
+    team_a_stats, team_b_stats = simulate_game(team_a_matrix, team_b_matrix, simmedpossessions)
+
+    # play 5 minute overtimes until the game is decided
+    overtimes = 0
+    while overtime and team_a_stats['Points'] == team_b_stats['Points'] and overtimes < MAX_OVERTIMES:
+        team_a_overtime, team_b_overtime = simulate_game(team_a_matrix, team_b_matrix, overtime_possessions(simmedpossessions))
+        team_a_stats.update(team_a_overtime)
+        team_b_stats.update(team_b_overtime)
+        overtimes += 1
+
+    # Calculate team metrics
+    team_a_metrics = calculate_team_metrics(team_a_stats)
+    team_b_metrics = calculate_team_metrics(team_b_stats)
+
+    # Assign each team's DREB metric to the opposing team's metrics
+    team_a_metrics['DREB'] = team_b_metrics.get('Opp DREB', 0)  # Team A gets Team B's DREB as Opp DREB
+    team_b_metrics['DREB'] = team_a_metrics.get('Opp DREB', 0)  # Team B gets Team A's DREB as Opp DREB
+
+    if overtime:
+        team_a_metrics['Overtimes'] = overtimes
+        team_b_metrics['Overtimes'] = overtimes
+
+    return team_a_metrics, team_b_metrics
+
+
 # simulate multiple games 
 def run_multiple_games(team_a_matrix, team_b_matrix, num_games, simmedpossessions):
     results = []
     
     for _ in range(num_games):
         # Use simmedpossessions in the game simulation
-        team_a_stats, team_b_stats = simulate_game(team_a_matrix, team_b_matrix, simmedpossessions)
-        
-        # Calculate team metrics
-        team_a_metrics = calculate_team_metrics(team_a_stats)
-        team_b_metrics = calculate_team_metrics(team_b_stats)
-        
-        # Assign each team's DREB metric to the opposing team's metrics
-        team_a_metrics['DREB'] = team_b_metrics.get('Opp DREB', 0)  # Team A gets Team B's DREB as Opp DREB
-        team_b_metrics['DREB'] = team_a_metrics.get('Opp DREB', 0)  # Team B gets Team A's DREB as Opp DREB
-        
-        results.append((team_a_metrics, team_b_metrics))
+        results.append(simulate_game_metrics(team_a_matrix, team_b_matrix, simmedpossessions))
     
     return results, simmedpossessions
-    
 
-# take results of all games simulated to find derived means for each stat
-def analyze_results(results, simmedpossessions, team_a_name, team_b_name):
-    filtered_results = [game for game in results if game[0]['Points'] != game[1]['Points']]
 
-    team_a_totals = {key: sum(game[0][key] for game in filtered_results) for key in results[0][0]}
-    team_b_totals = {key: sum(game[1][key] for game in filtered_results) for key in results[0][1]}
+# simulate multiple games, adding each game to an accumulator as it finishes instead of keeping every result
+def run_multiple_games_streaming(team_a_matrix, team_b_matrix, num_games, simmedpossessions, accumulator=None, overtime=False,
+                                 pace_dispersion=None):
+    accumulator = SimulationAccumulator() if accumulator is None else accumulator
+
+    for _ in range(num_games):
+        accumulator.add_game(*simulate_game_metrics(team_a_matrix, team_b_matrix, simmedpossessions, overtime=overtime,
+                                                    pace_dispersion=pace_dispersion))
+
+    return accumulator.flush(), simmedpossessions
     
-    num_games = len(filtered_results)  # Update number of games to only include non-tied games
 
-    metrics_data = []
+# keep simulating in chunks until the win percentage and supremacy standard errors are below the tolerances
+def run_multiple_games_adaptive(team_a_matrix, team_b_matrix, simmedpossessions, win_tolerance=None, supremacy_tolerance=None,
+                                max_simulations=40000, min_simulations=2000, chunk_size=2000, engine='batch', rng=None,
+                                accumulator=None, overtime=False, pace_dispersion=None, sampler='random'):
 
-    if num_games == 0:  
-        metrics_data.append({"Metric": "Average", team_a_name: None, team_b_name: None})
-        metrics_data.append({"Metric": "Win Percentage", team_a_name: 0, team_b_name: 0})
-        metrics_data.append({"Metric": "Tie Percentage", team_a_name: 1, team_b_name: None})
-        metrics_data.append({"Metric": "Supremacy", team_a_name: None, team_b_name: None})
-        metrics_data.append({"Metric": "Total", team_a_name: None, team_b_name: None})
-    else:
-        for key in team_a_totals.keys():
-            team_a_average = team_a_totals[key] / num_games
-            team_b_average = team_b_totals[key] / num_games if key in team_b_totals else None
-            metrics_data.append({"Metric": key, team_a_name: team_a_average, team_b_name: team_b_average})
+    '''
+    Simulates until the standard errors are small enough, or max_simulations is reached.
 
-        team_a_wins = sum(game[0]['Points'] > game[1]['Points'] for game in filtered_results)
-        team_b_wins = sum(game[1]['Points'] > game[0]['Points'] for game in filtered_results)
-        
-        metrics_data.append({"Metric": "Win Percentage", team_a_name: team_a_wins / num_games, team_b_name: team_b_wins / num_games})
+    Returns the SimulationAccumulator (accumulator.games is the number of simulations used) and simmedpossessions.
 
-        total_team_a_points = sum(game[0]['Points'] for game in filtered_results)
-        total_team_b_points = sum(game[1]['Points'] for game in filtered_results)
-        
-        sup_team_a = (total_team_a_points - total_team_b_points)/num_games
-        sup_team_b = (total_team_b_points - total_team_a_points)/num_games
-        
-        metrics_data.append({"Metric": "Supremacy", team_a_name: sup_team_a, team_b_name: sup_team_b})
+    Parameters:
+        team_a_matrix (DataFrame or CompiledMatrix): Home team transition matrix (e.g., HomeTeamMatrix)
+        team_b_matrix (DataFrame or CompiledMatrix): Away team transition matrix (e.g., AwayTeamMatrix)
+        simmedpossessions (float): Possessions per team per game
+        win_tolerance (float): Target standard error of the win percentage (e.g., 0.005, None to ignore)
+        supremacy_tolerance (float): Target standard error of the supremacy in points (e.g., 0.1, None to ignore)
+        max_simulations (int): Hard cap on the number of simulations (default 40000)
+        min_simulations (int): Always simulate at least this many games (default 2000)
+        chunk_size (int): Games simulated between checks (default 2000)
+        engine (str): 'batch' or 'reference' (default 'batch')
+        rng (Generator): numpy random generator for the batch engine
+        accumulator (SimulationAccumulator): Accumulator to add the games to (default a new one)
+        overtime (bool): Resolve tied games with overtime instead of dropping them (default False)
+        pace_dispersion (float): Standard deviation of each game's possessions (default None, fixed possessions)
+        sampler (str): 'random', 'stratified' or 'sobol' for the batch engine (default 'random'). The standard errors
+                       assume independent games, so with a stratified or Sobol sampler they overstate the error
+                       and the adaptive run stops later than it needs to. With 'sobol' the chunks are rounded down
+                       to a power of two, only the last chunk before max_simulations can be a partial block.
+    '''
+
+    rng = np.random.default_rng() if rng is None else rng
+    team_a_matrix = compile_matrix(team_a_matrix)
+    team_b_matrix = compile_matrix(team_b_matrix)
+    accumulator = SimulationAccumulator() if accumulator is None else accumulator
 
-        total_points = (total_team_a_points + total_team_b_points)/num_games
-        metrics_data.append({"Metric": "Total", team_a_name: total_points, team_b_name: total_points})
-        metrics_data.append({"Metric": "Possessions", team_a_name: simmedpossessions, team_b_name: simmedpossessions})
+    # Sobol points are only balanced in power of two blocks, as in run_multiple_games_batch_streaming
+    if engine == 'batch' and sampler == 'sobol':
+        chunk_size = 1 << int(np.log2(chunk_size))
 
-    results_df = pd.DataFrame(metrics_data)
+    while accumulator.games < max_simulations:
+        chunk_games = min(chunk_size, max_simulations - accumulator.games)
+        if engine == 'batch':
+            run_multiple_games_batch_streaming(team_a_matrix, team_b_matrix, chunk_games, simmedpossessions, rng=rng,
+                                               accumulator=accumulator, chunk_size=chunk_size, overtime=overtime,
+                                               pace_dispersion=pace_dispersion, sampler=sampler)
+        else:
+            run_multiple_games_streaming(team_a_matrix, team_b_matrix, chunk_games, simmedpossessions, accumulator=accumulator,
+                                         overtime=overtime, pace_dispersion=pace_dispersion)
+
+        if accumulator.games < min_simulations:
+            continue
+        win_done = win_tolerance is None or accumulator.win_standard_error() < win_tolerance
+        supremacy_done = supremacy_tolerance is None or accumulator.supremacy_standard_error() < supremacy_tolerance
+        if win_done and supremacy_done:
+            break
+
+    return accumulator, simmedpossessions
+
+
+# simulate in chunks, saving the accumulator and random states to checkpoint after every chunk so an interrupted
+# run continues from its last chunk. matrices is saved along with them so a resumed run does not rebuild them.
+def run_multiple_games_checkpointed(team_a_matrix, team_b_matrix, num_games, simmedpossessions, checkpoint, matrices=None,
+                                    engine='batch', rng=None, accumulator=None, overtime=False, pace_dispersion=None,
+                                    sampler='random'):
+    rng = np.random.default_rng() if rng is None else rng
+    accumulator = SimulationAccumulator() if accumulator is None else accumulator
+    team_a_matrix = compile_matrix(team_a_matrix)
+    team_b_matrix = compile_matrix(team_b_matrix)
+
+    state = checkpoint.load()
+    if state is not None:
+        accumulator, rng = state['accumulator'], state['rng']
+        # the reference engine draws from numpy's global random state, a block of uniforms at a time
+        np.random.set_state(state['global_random_state'])
+        team_a_matrix.set_block_state(state['uniform_blocks'][0])
+        team_b_matrix.set_block_state(state['uniform_blocks'][1])
+
+    # same chunks as run_multiple_games_batch_streaming, so the batch engine gives the same games
+    chunk_size = checkpoint.chunk_size
+    if engine == 'batch' and sampler == 'sobol':
+        chunk_size = 1 << int(np.log2(chunk_size))
+
+    while accumulator.games < num_games:
+        chunk_games = min(chunk_size, num_games - accumulator.games)
+        if engine == 'batch':
+            run_multiple_games_batch_streaming(team_a_matrix, team_b_matrix, chunk_games, simmedpossessions, rng=rng,
+                                               accumulator=accumulator, chunk_size=chunk_size, overtime=overtime,
+                                               pace_dispersion=pace_dispersion, sampler=sampler)
+        else:
+            run_multiple_games_streaming(team_a_matrix, team_b_matrix, chunk_games, simmedpossessions, accumulator=accumulator,
+                                         overtime=overtime, pace_dispersion=pace_dispersion)
+        checkpoint.save(matrices=matrices, accumulator=accumulator, rng=rng, global_random_state=np.random.get_state(),
+                        uniform_blocks=[team_a_matrix.get_block_state(), team_b_matrix.get_block_state()])
+
+    return accumulator, simmedpossessions
+
+
+# take results of all games simulated to find derived means for each stat
+def analyze_results(results, simmedpossessions, team_a_name, team_b_name):
+    accumulator = SimulationAccumulator().add_games(results)
+
+    results_df = accumulator.results_df(simmedpossessions, team_a_name, team_b_name)
 
     return results_df
 
-def simulate_matchup(home_team,away_team,HFA, number_of_simulations, possessionAdjust):
+# offense + defense count matrices for a matchup, before home court advantage is applied. The counts are
+# sampled from numpy's global random state, which a seed starts from a fixed state
+def build_base_matrices(home_team, away_team, teamsDF1, seed=None):
+    if seed is not None:
+        np.random.seed(np.random.SeedSequence(seed).generate_state(1)[0])
     team1O, team2O = calculate_transition_matrix_offense(teamsDF1, home_team,away_team, calcs=25000)
     team1D, team2D, simmedpossessions = calculate_transition_matrix_defense(teamsDF1, home_team,away_team, calcs=25000)
     team1 = team1O + team2D
     team2 = team2O + team1D
+
+    return team1, team2, simmedpossessions
+
+
+# homeODiff, homeDDiff, awayODiff and awayDDiff as returned by home_court_advantage, the notebook's if not given
+def home_court_diff_tables(home_court_diffs=None):
+    if home_court_diffs is not None:
+        return home_court_diffs
+    try:
+        return homeODiff, homeDDiff, awayODiff, awayDDiff
+    except NameError:
+        raise ValueError("home_court_diffs is needed: homeODiff, homeDDiff, awayODiff, awayDDiff from home_court_advantage") from None
+
+
+# scale the base matrices by home court advantage and normalize them into transition matrices
+def apply_home_court_advantage(team1, team2, HFA, home_court_diffs=None):
+    homeODiff, homeDDiff, awayODiff, awayDDiff = home_court_diff_tables(home_court_diffs)
     team1 = team1 * (1 + (HFA * (homeODiff + awayDDiff)))
     team2 = team2 * (1 + (HFA * (awayODiff + homeDDiff)))
     row_sums = team1.sum(axis=1)
     row_sums2 = team2.sum(axis=1)
     HomeTeamMatrix = team1.div(row_sums, axis=0).fillna(0)
     AwayTeamMatrix = team2.div(row_sums2, axis=0).fillna(0)
+
+    return HomeTeamMatrix, AwayTeamMatrix
+
+
+def build_matchup_matrices(home_team, away_team, HFA, teamsDF1, home_court_diffs=None, seed=None):
+    team1, team2, simmedpossessions = build_base_matrices(home_team, away_team, teamsDF1, seed=seed)
+    HomeTeamMatrix, AwayTeamMatrix = apply_home_court_advantage(team1, team2, HFA, home_court_diffs)
+
+    return HomeTeamMatrix, AwayTeamMatrix, simmedpossessions
+
+
+def simulate_matchup(home_team,away_team,HFA, number_of_simulations, possessionAdjust, teamsDF1, engine='reference', seed=None,
+                     workers=None, standard_errors=False, win_tolerance=None, supremacy_tolerance=None, score_histogram=False,
+                     keep_games=False, overtime=False, pace_dispersion=None, sampler='random', archive_path=None, checkpoint=None,
+                     possession_durations=None, home_court_diffs=None):
+    if engine == 'exact' and keep_games:
+        raise ValueError("keep_games needs simulated games, use the 'batch', 'clock' or 'reference' engine")
+    if engine == 'exact' and archive_path is not None:
+        raise ValueError("archive_path needs simulated games, use the 'batch', 'clock' or 'reference' engine")
+    if workers and (engine != 'batch' or win_tolerance is not None or supremacy_tolerance is not None):
+        raise ValueError("workers needs the 'batch' engine without win_tolerance or supremacy_tolerance")
+    if engine != 'batch' and sampler != 'random':
+        raise ValueError(f"sampler='{sampler}' needs the 'batch' engine")
+    if checkpoint is not None and (engine not in ('batch', 'reference') or workers or win_tolerance is not None or
+                                   supremacy_tolerance is not None or archive_path is not None):
+        raise ValueError("checkpoint works with the 'batch' and 'reference' engines, without workers, tolerances or archive_path")
+
+    state = None if checkpoint is None else checkpoint.load()
+    if state is not None:
+        # resuming an interrupted run, the matrices were built before the interruption
+        HomeTeamMatrix, AwayTeamMatrix, simmedpossessions = state['matrices']
+    else:
+        # the transition matrices are sampled and the reference engine draws from numpy's global random state,
+        # so a seed starts both from a fixed state and every engine gives the same results for the same seed
+        HomeTeamMatrix, AwayTeamMatrix, simmedpossessions = build_matchup_matrices(home_team, away_team, HFA, teamsDF1,
+                                                                                   home_court_diffs, seed=seed)
+
+    # compiled once here and shared by every simulated game
+    HomeCompiled = compile_matrix(HomeTeamMatrix)
+    AwayCompiled = compile_matrix(AwayTeamMatrix)
     
-    results, simmedpossessionsA = run_multiple_games(HomeTeamMatrix, AwayTeamMatrix, number_of_simulations, simmedpossessions + possessionAdjust)
-    box_score = analyze_results(results,simmedpossessionsA, home_team, away_team)
+    if engine == 'exact':
+        box_score = exact_matchup_results(HomeTeamMatrix, AwayTeamMatrix, simmedpossessions + possessionAdjust, home_team, away_team,
+                                          overtime=overtime, pace_dispersion=pace_dispersion)
+        outputs = [box_score.round(3)]
+        if standard_errors:
+            # no sampling, so every average is exact
+            errors = box_score[box_score['Metric'] != 'Possessions'].copy()
+            errors[[home_team, away_team]] = 0.0
+            outputs.append(errors)
+        if score_histogram:
+            outputs.append(exact_score_histogram(HomeTeamMatrix, AwayTeamMatrix, simmedpossessions + possessionAdjust,
+                                                 pace_dispersion=pace_dispersion))
+        return outputs[0] if len(outputs) == 1 else tuple(outputs)
+
+    # every game is written to the archive as it is added to the accumulator
+    archive = None if archive_path is None else GameArchiveWriter(archive_path, simmedpossessions + possessionAdjust)
+    accumulator = SimulationAccumulator(keep_games=keep_games, archive=archive)
+
+    if checkpoint is not None:
+        accumulator, simmedpossessionsA = run_multiple_games_checkpointed(HomeCompiled, AwayCompiled, number_of_simulations,
+                                                                          simmedpossessions + possessionAdjust, checkpoint,
+                                                                          (HomeTeamMatrix, AwayTeamMatrix, simmedpossessions),
+                                                                          engine=engine, rng=np.random.default_rng(seed),
+                                                                          accumulator=accumulator, overtime=overtime,
+                                                                          pace_dispersion=pace_dispersion, sampler=sampler)
+    elif engine == 'clock':
+        # possession counts come from the game clock, so pace_dispersion does not apply
+        duration_tables = team_duration_tables(teamsDF1, [home_team, away_team], possession_durations)
+        duration_tables = matchup_duration_tables(duration_tables[home_team], duration_tables[away_team],
+                                                  simmedpossessions + possessionAdjust)
+        accumulator, simmedpossessionsA, period_totals = run_multiple_games_clock_streaming(HomeCompiled, AwayCompiled, number_of_simulations,
+                                                                                           duration_tables, rng=np.random.default_rng(seed),
+                                                                                           accumulator=accumulator, overtime=overtime)
+    elif win_tolerance is not None or supremacy_tolerance is not None:
+        # adaptive mode, number_of_simulations is the hard cap
+        accumulator, simmedpossessionsA = run_multiple_games_adaptive(HomeCompiled, AwayCompiled, simmedpossessions + possessionAdjust,
+                                                                      win_tolerance, supremacy_tolerance, max_simulations=number_of_simulations,
+                                                                      engine=engine, rng=np.random.default_rng(seed), accumulator=accumulator,
+                                                                      overtime=overtime, pace_dispersion=pace_dispersion, sampler=sampler)
+    elif engine == 'batch' and workers:
+        results, simmedpossessionsA = run_multiple_games_parallel(HomeCompiled, AwayCompiled, number_of_simulations, simmedpossessions + possessionAdjust,
+                                                                  workers, seed=seed, overtime=overtime, pace_dispersion=pace_dispersion,
+                                                                  sampler=sampler)
+        accumulator.add_batch(results)
+    elif engine == 'batch':
+        accumulator, simmedpossessionsA = run_multiple_games_batch_streaming(HomeCompiled, AwayCompiled, number_of_simulations, simmedpossessions + possessionAdjust,
+                                                                             rng=np.random.default_rng(seed), accumulator=accumulator,
+                                                                             overtime=overtime, pace_dispersion=pace_dispersion,
+                                                                             sampler=sampler)
+    else:
+        accumulator, simmedpossessionsA = run_multiple_games_streaming(HomeCompiled, AwayCompiled, number_of_simulations, simmedpossessions + possessionAdjust,
+                                                                       accumulator=accumulator, overtime=overtime,
+                                                                       pace_dispersion=pace_dispersion)
+
+    box_score = accumulator.results_df(simmedpossessionsA, home_team, away_team)
+    if win_tolerance is not None or supremacy_tolerance is not None:
+        # games actually simulated before the tolerances were met, after every other row so Possessions keeps its place
+        simulations = pd.DataFrame([{"Metric": "Simulations", home_team: accumulator.games, away_team: accumulator.games}])
+        box_score = pd.concat([box_score, simulations], ignore_index=True)
+    if archive is not None:
+        archive.close()
 
-    return box_score.round(3)
\ No newline at end of file
+    outputs = [box_score.round(3)]
+    if standard_errors:
+        outputs.append(accumulator.standard_errors_df(home_team, away_team).round(3))
+    if score_histogram:
+        outputs.append(accumulator.score_histogram())
+    if keep_games:
+        outputs.append(accumulator.game_results())
+    if engine == 'clock':
+        outputs.append(period_lines_df(period_totals, accumulator.decided, home_team, away_team).round(3))
+    return outputs[0] if len(outputs) == 1 else tuple(outputs)
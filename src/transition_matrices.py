@@ -4,6 +4,11 @@
 # In[ ]:
 
 
+import math
+import numpy as np
+import pandas as pd
+
+
 # Function which uses Elo ratings to create scaled probabilities
 def calculate_elo_probability(rating, target_prob, target_rating=1500, scale_factor=1000):
     base_rating = target_rating + scale_factor * math.log10((1 / target_prob) - 1)
@@ -278,3 +283,59 @@ def calculate_transition_matrix_defense(elo_ratings_df, team1, team2, calcs):
 
     return team1_matrix, team2_matrix, scaled_pace_team
 
+
+# Transition probabilities implied by a set of possession outcome probabilities, without sampling possessions.
+# Same structure as the matrices generate_team_matrix builds, but each row already sums to 1.
+def transition_probability_matrix(turnover_prob, ft_attempt_prob, two_point_attempt_prob, three_point_attempt_prob,
+                                  three_made_prob, two_made_prob, ft_made_prob,
+                                  ft_oreb_prob, two_pt_oreb_prob, three_pt_oreb_prob):
+    states = [
+        'Initial Possession', '3pt Attempt', '3pt Make', '3pt Miss',
+        '2pt Attempt', '2pt Make', '2pt Miss',
+        'Trip to FT Line', 'FT Attempt 1', 'FT Attempt 2',
+        'FT Make 1', 'FT Miss 1', 'FT Make 2', 'FT Miss 2',
+        'Turnover', '2pt Oreb', '3pt Oreb', 'FT Oreb',
+        '2pt NonOreb', '3pt NonOreb', 'FT NonOreb', 'End Possession']
+
+    transition_matrix = pd.DataFrame(0.0, index=states, columns=states)
+
+    total_prob = turnover_prob + ft_attempt_prob + two_point_attempt_prob + three_point_attempt_prob
+    transition_matrix.loc['Initial Possession', 'Turnover'] = turnover_prob / total_prob
+    transition_matrix.loc['Initial Possession', 'Trip to FT Line'] = ft_attempt_prob / total_prob
+    transition_matrix.loc['Initial Possession', '2pt Attempt'] = two_point_attempt_prob / total_prob
+    transition_matrix.loc['Initial Possession', '3pt Attempt'] = three_point_attempt_prob / total_prob
+
+    transition_matrix.loc['2pt Attempt', '2pt Make'] = two_made_prob
+    transition_matrix.loc['2pt Attempt', '2pt Miss'] = 1 - two_made_prob
+    transition_matrix.loc['2pt Miss', '2pt Oreb'] = two_pt_oreb_prob
+    transition_matrix.loc['2pt Miss', '2pt NonOreb'] = 1 - two_pt_oreb_prob
+
+    transition_matrix.loc['3pt Attempt', '3pt Make'] = three_made_prob
+    transition_matrix.loc['3pt Attempt', '3pt Miss'] = 1 - three_made_prob
+    transition_matrix.loc['3pt Miss', '3pt Oreb'] = three_pt_oreb_prob
+    transition_matrix.loc['3pt Miss', '3pt NonOreb'] = 1 - three_pt_oreb_prob
+
+    transition_matrix.loc['Trip to FT Line', 'FT Attempt 1'] = 1
+    transition_matrix.loc['FT Attempt 1', 'FT Make 1'] = ft_made_prob
+    transition_matrix.loc['FT Attempt 1', 'FT Miss 1'] = 1 - ft_made_prob
+    transition_matrix.loc['FT Make 1', 'FT Attempt 2'] = 1
+    transition_matrix.loc['FT Miss 1', 'FT Attempt 2'] = 1
+    transition_matrix.loc['FT Attempt 2', 'FT Make 2'] = ft_made_prob
+    transition_matrix.loc['FT Attempt 2', 'FT Miss 2'] = 1 - ft_made_prob
+    transition_matrix.loc['FT Miss 2', 'FT Oreb'] = ft_oreb_prob
+    transition_matrix.loc['FT Miss 2', 'FT NonOreb'] = 1 - ft_oreb_prob
+
+    for oreb_state in ['2pt Oreb', '3pt Oreb', 'FT Oreb']:
+        transition_matrix.loc[oreb_state, 'Initial Possession'] = 1
+    for end_state in ['3pt Make', '2pt Make', 'FT Make 2', 'Turnover', '2pt NonOreb', '3pt NonOreb', 'FT NonOreb']:
+        transition_matrix.loc[end_state, 'End Possession'] = 1
+
+    return transition_matrix
+
+
+# League average transition probabilities (the target probabilities used for a 1500 rated team)
+def league_average_transition_matrix():
+    return transition_probability_matrix(turnover_prob=0.12, ft_attempt_prob=0.09, two_point_attempt_prob=0.41,
+                                         three_point_attempt_prob=0.28, three_made_prob=0.37, two_made_prob=0.55,
+                                         ft_made_prob=0.78, ft_oreb_prob=0.175, two_pt_oreb_prob=0.327,
+                                         three_pt_oreb_prob=0.300)
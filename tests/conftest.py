@@ -0,0 +1,63 @@
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from transition_matrices import transition_probability_matrix
+from batch_simulation import run_multiple_games_batch_streaming
+
+
+# simulated results are compared within this many standard errors, on fixed seeds
+STANDARD_ERRORS = 4
+
+RATING_COLUMNS = ['to', 'fta', 'two_attempt', 'three_attempt', 'three_made', 'two_made', 'ftm', 'oreb']
+
+
+# value of one metric of a results_df
+def metric(results_df, name, team):
+    return results_df.loc[results_df['Metric'] == name, team].iloc[0]
+
+
+def batch_accumulator(matrices, num_games=40000, simmedpossessions=70.4, seed=11):
+    accumulator, _ = run_multiple_games_batch_streaming(*matrices, num_games, simmedpossessions, rng=np.random.default_rng(seed))
+    return accumulator
+
+
+def team_matrix(turnover_prob=0.12, three_point_attempt_prob=0.28, three_made_prob=0.37, two_made_prob=0.55, oreb_prob=0.3):
+    return transition_probability_matrix(turnover_prob=turnover_prob, ft_attempt_prob=0.09, two_point_attempt_prob=0.41,
+                                         three_point_attempt_prob=three_point_attempt_prob, three_made_prob=three_made_prob,
+                                         two_made_prob=two_made_prob, ft_made_prob=0.78, ft_oreb_prob=0.175,
+                                         two_pt_oreb_prob=oreb_prob, three_pt_oreb_prob=oreb_prob)
+
+
+# home and away transition matrices of one matchup
+@pytest.fixture(scope='session')
+def matrices():
+    home = team_matrix()
+    away = team_matrix(turnover_prob=0.14, three_point_attempt_prob=0.32, three_made_prob=0.35, two_made_prob=0.52, oreb_prob=0.27)
+    return home, away
+
+
+# teamsDF shaped rosters with random ratings around 1500, ten players per team
+def make_rosters(teams=('MAD', 'BAR', 'PAN', 'OLY'), players=10, seed=0):
+    rng = np.random.default_rng(seed)
+    rows = []
+    for team in teams:
+        for number in range(players):
+            row = {'Team': team, 'PlayerID': f'{team}{number:02d}', 'Player': f'{team} PLAYER {number}',
+                   'PossessionCount': rng.uniform(5, 40), 'PlayedInMostRecentGame': 1}
+            for side in 'OD':
+                row.update({f'{stat}_{side}': 1500 + rng.normal(0, 40) for stat in RATING_COLUMNS})
+                row[f'usage_{side}'] = rng.uniform(0.5, 1.5)
+                row[f'pace_{side}'] = 1500 + rng.normal(0, 30)
+            rows.append(row)
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture
+def rosters():
+    return make_rosters()
@@ -0,0 +1,28 @@
+import numpy as np
+
+from conftest import STANDARD_ERRORS, metric, batch_accumulator
+from compiled_matrix import CompiledMatrix
+from simulation_functions import run_multiple_games
+from simulation_accumulator import SimulationAccumulator
+
+
+# the batch engine plays the same games as the reference engine, one possession at a time
+def test_batch_matches_reference_engine(matrices):
+    simmedpossessions = 70.4
+    np.random.seed(3)
+    reference_results, _ = run_multiple_games(*[CompiledMatrix(matrix) for matrix in matrices], 3000, simmedpossessions)
+    reference = SimulationAccumulator().add_games(reference_results)
+    batch = batch_accumulator(matrices, simmedpossessions=simmedpossessions)
+
+    reference_df = reference.results_df(simmedpossessions, 'A', 'B')
+    batch_df = batch.results_df(simmedpossessions, 'A', 'B')
+    reference_errors = reference.standard_errors_df('A', 'B')
+    batch_errors = batch.standard_errors_df('A', 'B')
+
+    for name in ['Points', '3pt Attempts', '2pt Attempts', 'Turnovers', 'Supremacy', 'Total']:
+        for team in ['A', 'B']:
+            error = np.hypot(metric(reference_errors, name, team), metric(batch_errors, name, team))
+            assert abs(metric(reference_df, name, team) - metric(batch_df, name, team)) < STANDARD_ERRORS * error, (name, team)
+
+    win_error = np.hypot(reference.win_standard_error(), batch.win_standard_error())
+    assert abs(metric(reference_df, 'Win Percentage', 'A') - metric(batch_df, 'Win Percentage', 'A')) < STANDARD_ERRORS * win_error
@@ -0,0 +1,33 @@
+import numpy as np
+import pytest
+
+from conftest import STANDARD_ERRORS, metric, batch_accumulator
+from clock_simulation import (REGULATION_PERIODS, UNIT_DURATION_TABLE, matchup_duration_tables, run_multiple_games_clock,
+                              run_multiple_games_clock_streaming)
+
+
+def test_clock_games_play_the_expected_possessions(matrices):
+    tables = matchup_duration_tables(UNIT_DURATION_TABLE * 17, UNIT_DURATION_TABLE * 15, 70.4)
+    (team_a, team_b), period_points, possessions = run_multiple_games_clock(*matrices, 4000, tables, np.random.default_rng(4),
+                                                                            overtime=True)
+
+    # the tables are rescaled so both teams average simmedpossessions, and possessions alternate within a period
+    assert possessions.mean() == pytest.approx(70.4, abs=0.5)
+    assert (np.abs(possessions[0] - possessions[1]) <= REGULATION_PERIODS + team_a['Overtimes']).all()
+
+    # the period lines add up to the final score and overtime leaves no ties
+    assert (period_points[:, :, 0].sum(axis=1) == team_a['Points']).all()
+    assert (period_points[:, :, 1].sum(axis=1) == team_b['Points']).all()
+    assert (team_a['Points'] != team_b['Points']).all()
+    assert (period_points[team_a['Overtimes'] == 0, REGULATION_PERIODS] == 0).all()
+
+
+def test_clock_engine_agrees_with_the_batch_engine(matrices):
+    tables = matchup_duration_tables(UNIT_DURATION_TABLE, UNIT_DURATION_TABLE, 70.4)
+    accumulator, possessions, _ = run_multiple_games_clock_streaming(*matrices, 20000, tables, rng=np.random.default_rng(6))
+    clock = accumulator.results_df(possessions, 'A', 'B')
+    batch = batch_accumulator(matrices, num_games=20000, simmedpossessions=possessions)
+
+    # possession counts vary from game to game on the clock, so the margin spread is wider but the average the same
+    supremacy_error = np.hypot(accumulator.supremacy_standard_error(), batch.supremacy_standard_error())
+    assert abs(metric(clock, 'Supremacy', 'A') - metric(batch.results_df(possessions, 'A', 'B'), 'Supremacy', 'A')) < STANDARD_ERRORS * supremacy_error
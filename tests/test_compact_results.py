@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from batch_simulation import simulate_games_compact
+from compact_results import CompactGameResults
+
+
+def assert_same_metrics(left, right):
+    for team in (0, 1):
+        assert left[team].keys() == right[team].keys()
+        for key in left[team]:
+            np.testing.assert_allclose(left[team][key], right[team][key], err_msg=key)
+
+
+@pytest.fixture(scope='module')
+def compact(matrices):
+    return simulate_games_compact(*matrices, 6000, 70.4, np.random.default_rng(9), overtime=True, pace_dispersion=3)
+
+
+def test_compact_results_are_small_and_complete(compact):
+    team_a, team_b = compact.metrics()
+
+    assert len(compact) == 6000 and compact.nbytes / len(compact) < 200
+    assert (team_a['Points'] != team_b['Points']).all()
+    # only the games that went to overtime keep overtime counts
+    assert len(compact.overtime_index) == (team_a['Overtimes'] > 0).sum() > 0
+    # the fractional possession is weighted into the points
+    assert team_a['Points'].mean() == pytest.approx(compact.team_counts(0)[1].mean())
+
+
+def test_select_and_concatenate_keep_every_game(compact):
+    mask = np.zeros(len(compact), dtype=bool)
+    mask[::3] = True
+    metrics = compact.metrics()
+
+    assert_same_metrics(compact.select(mask).metrics(), tuple({key: values[mask] for key, values in team.items()} for team in metrics))
+    joined = CompactGameResults.concatenate([compact.select(np.arange(len(compact)) < 2500), compact.select(np.arange(len(compact)) >= 2500)])
+    assert_same_metrics(joined.metrics(), metrics)
@@ -0,0 +1,31 @@
+import numpy as np
+
+from conftest import STANDARD_ERRORS
+from compiled_matrix import STATES, STATE_INDEX, CompiledMatrix
+
+
+def test_alias_tables_rebuild_probabilities(matrices):
+    compiled = CompiledMatrix(matrices[0])
+    num_columns = len(STATES)
+
+    # column k is drawn when it is kept, or when another column is not kept and aliases to it
+    rebuilt = compiled.alias_prob.copy()
+    for row in range(num_columns):
+        if compiled.probabilities[row].sum() > 0:
+            np.add.at(rebuilt[row], compiled.alias[row], 1 - compiled.alias_prob[row])
+    has_moves = compiled.probabilities.sum(axis=1) > 0
+    np.testing.assert_allclose(rebuilt[has_moves] / num_columns, compiled.probabilities[has_moves], atol=1e-12)
+
+
+def test_alias_sampling_frequencies(matrices):
+    compiled = CompiledMatrix(matrices[0])
+    num_draws = 200000
+    rng = np.random.default_rng(5)
+
+    for state in ['Initial Possession', '2pt Attempt', '3pt Miss', 'FT Attempt 2']:
+        row = STATE_INDEX[state]
+        draws = compiled.draw(np.full(num_draws, row), rng.random(num_draws))
+        frequencies = np.bincount(draws, minlength=len(STATES)) / num_draws
+        probabilities = compiled.probabilities[row]
+        errors = np.sqrt(probabilities * (1 - probabilities) / num_draws)
+        assert np.all(np.abs(frequencies - probabilities) <= STANDARD_ERRORS * errors + 1e-12), state
@@ -0,0 +1,48 @@
+import numpy as np
+
+from conftest import STANDARD_ERRORS, metric, batch_accumulator
+from batch_simulation import run_multiple_games_batch_streaming
+from exact_distribution import exact_matchup_results
+
+
+def test_batch_means_within_standard_error_of_exact(matrices):
+    simmedpossessions = 70.4
+    batch = batch_accumulator(matrices, simmedpossessions=simmedpossessions)
+    batch_df = batch.results_df(simmedpossessions, 'A', 'B')
+    batch_errors = batch.standard_errors_df('A', 'B')
+    exact_df = exact_matchup_results(*matrices, simmedpossessions, 'A', 'B')
+
+    for name in ['Points', 'Supremacy', 'Total']:
+        for team in ['A', 'B']:
+            assert abs(metric(batch_df, name, team) - metric(exact_df, name, team)) < STANDARD_ERRORS * metric(batch_errors, name, team), (name, team)
+    assert abs(metric(batch_df, 'Win Percentage', 'A') - metric(exact_df, 'Win Percentage', 'A')) < STANDARD_ERRORS * batch.win_standard_error()
+
+
+# overtime: every tie is played on until decided, in both engines
+def test_batch_overtime_within_standard_error_of_exact(matrices):
+    simmedpossessions = 70.4
+    accumulator, _ = run_multiple_games_batch_streaming(*matrices, 40000, simmedpossessions, rng=np.random.default_rng(12), overtime=True)
+    batch_df = accumulator.results_df(simmedpossessions, 'A', 'B')
+    exact_df = exact_matchup_results(*matrices, simmedpossessions, 'A', 'B', overtime=True)
+
+    assert accumulator.games == 40000
+    overtime = metric(exact_df, 'Overtime Percentage', 'A')
+    assert abs(metric(batch_df, 'Overtime Percentage', 'A') - overtime) < STANDARD_ERRORS * np.sqrt(overtime * (1 - overtime) / 40000)
+    assert abs(metric(batch_df, 'Win Percentage', 'A') - metric(exact_df, 'Win Percentage', 'A')) < STANDARD_ERRORS * accumulator.win_standard_error()
+
+
+# pace dispersion: the batch engine draws each game's possessions, the exact engine mixes over possession offsets
+def test_batch_pace_dispersion_within_standard_error_of_exact(matrices):
+    simmedpossessions = 70.4
+    accumulator, _ = run_multiple_games_batch_streaming(*matrices, 40000, simmedpossessions, rng=np.random.default_rng(13), pace_dispersion=4)
+    batch_df = accumulator.results_df(simmedpossessions, 'A', 'B')
+    batch_errors = accumulator.standard_errors_df('A', 'B')
+    exact_df = exact_matchup_results(*matrices, simmedpossessions, 'A', 'B', pace_dispersion=4)
+
+    for name in ['Points', 'Supremacy', 'Total']:
+        assert abs(metric(batch_df, name, 'A') - metric(exact_df, name, 'A')) < STANDARD_ERRORS * metric(batch_errors, name, 'A'), name
+    assert abs(metric(batch_df, 'Win Percentage', 'A') - metric(exact_df, 'Win Percentage', 'A')) < STANDARD_ERRORS * accumulator.win_standard_error()
+
+    # a varying pace spreads the totals
+    fixed = batch_accumulator(matrices, simmedpossessions=simmedpossessions, seed=13).standard_errors_df('A', 'B')
+    assert metric(batch_errors, 'Total', 'A') > metric(fixed, 'Total', 'A')
@@ -0,0 +1,43 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_simulation import run_multiple_games_batch_streaming
+from game_archive import GameArchive, GameArchiveWriter
+from simulation_accumulator import SimulationAccumulator
+
+
+# simulate with every game written to an archive, returning the accumulator and the archive read back
+def archived_run(matrices, path, num_games=12000, overtime=False, seed=5):
+    writer = GameArchiveWriter(path)
+    accumulator, simmedpossessions = run_multiple_games_batch_streaming(*matrices, num_games, 70.4, rng=np.random.default_rng(seed),
+                                                                        accumulator=SimulationAccumulator(archive=writer),
+                                                                        chunk_size=5000, overtime=overtime)
+    writer.close()
+    return accumulator, simmedpossessions, GameArchive(path, overtime=overtime, chunk_size=3000)
+
+
+# the archive stores float32, so the rebuilt results match to about single precision
+@pytest.mark.parametrize('overtime', [False, True])
+def test_archive_results_df_round_trip(matrices, tmp_path, overtime):
+    accumulator, simmedpossessions, archive = archived_run(matrices, str(tmp_path / 'MAD_BAR.npy'), overtime=overtime)
+
+    assert len(archive) == accumulator.games == 12000
+    assert [name for name in os.listdir(tmp_path)] == ['MAD_BAR.npy']
+    pd.testing.assert_frame_equal(archive.results_df('MAD', 'BAR'), accumulator.results_df(simmedpossessions, 'MAD', 'BAR'),
+                                  rtol=1e-5)
+    assert archive.accumulator().score_histogram().equals(accumulator.score_histogram())
+
+
+def test_archive_queries_match_the_games(matrices, tmp_path):
+    accumulator, _, archive = archived_run(matrices, str(tmp_path / 'games.npy'), num_games=7000)
+    records = np.load(str(tmp_path / 'games.npy'))
+    margin = records['Home']['Points'] - records['Away']['Points']
+    decided = margin[margin != 0]
+
+    # queries read 3000 games at a time and drop the ties unless told not to
+    assert archive.probability(lambda games: games['Home']['Points'] - games['Away']['Points'] > 5.5) == pytest.approx(np.mean(decided > 5.5))
+    assert archive.mean(lambda games: games['Home']['Points'], decided_only=False) == pytest.approx(records['Home']['Points'].mean(dtype=float))
+    assert archive.histogram(lambda games: games['Home']['Points'] - games['Away']['Points'], bins=[-100, 0, 100]).sum() == len(decided)
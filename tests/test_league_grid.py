@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import metric, make_rosters
+from compiled_matrix import STATES
+from exact_distribution import exact_matchup_results
+from league_grid import league_grid, grid_table
+from rotation_simulation import lineup_count_matrix
+from simulation_functions import apply_home_court_advantage
+from transition_matrices import calculate_scaled_pace
+
+
+# home court differences where the home team makes its shots a little more often
+def home_shooting_diffs():
+    home_o_diff = pd.DataFrame(0.0, index=STATES, columns=STATES)
+    home_o_diff.loc['2pt Attempt', '2pt Make'] = home_o_diff.loc['3pt Attempt', '3pt Make'] = 0.05
+    return [home_o_diff, 0, 0, 0]
+
+
+HOME_COURT_DIFFS = home_shooting_diffs()
+
+
+@pytest.fixture(scope='module')
+def grid():
+    return league_grid(make_rosters(), HFA=0.8, home_court_diffs=HOME_COURT_DIFFS)
+
+
+def test_grid_pair_matches_a_single_matchup(rosters, grid):
+    pairs, _ = grid
+    mad, bar = (rosters[rosters['Team'] == team] for team in ('MAD', 'BAR'))
+    HomeTeamMatrix, AwayTeamMatrix = apply_home_court_advantage(lineup_count_matrix(mad, 'O') + lineup_count_matrix(bar, 'D'),
+                                                                lineup_count_matrix(bar, 'O') + lineup_count_matrix(mad, 'D'),
+                                                                0.8, HOME_COURT_DIFFS)
+    possessions = (calculate_scaled_pace(mad['pace_O'].mean(), mad['pace_D'].mean()) +
+                   calculate_scaled_pace(bar['pace_O'].mean(), bar['pace_D'].mean())) / 2
+    single = exact_matchup_results(HomeTeamMatrix, AwayTeamMatrix, possessions, 'MAD', 'BAR')
+
+    pair = pairs[(pairs['Team'] == 'MAD') & (pairs['Opponent'] == 'BAR')].iloc[0]
+    assert pair['Home Win Percentage'] == pytest.approx(metric(single, 'Win Percentage', 'MAD'), abs=1e-6)
+    assert pair['Home Margin'] == pytest.approx(metric(single, 'Supremacy', 'MAD'), abs=1e-6)
+    assert pair['Possessions'] == pytest.approx(possessions)
+
+
+def test_grid_is_consistent_from_both_sides(grid):
+    pairs, ratings = grid
+    assert len(pairs) == 12 and len(ratings) == 4
+
+    neutral = grid_table(pairs, 'Neutral Win Percentage', ratings)
+    assert np.allclose((neutral + neutral.T).stack().dropna(), 1)
+    margins = grid_table(pairs, 'Neutral Margin')
+    assert np.allclose((margins + margins.T).stack().dropna(), 0)
+
+    # home court helps both ways, and the ratings average zero with the best team first
+    assert (pairs['Home Win Percentage'] > pairs['Neutral Win Percentage']).all()
+    assert (pairs['Away Win Percentage'] < pairs['Neutral Win Percentage']).all()
+    assert ratings['Power Rating'].sum() == pytest.approx(0, abs=1e-9)
+    assert ratings['Team'].iloc[0] == margins.sum(axis=1).idxmax()
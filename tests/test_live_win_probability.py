@@ -0,0 +1,31 @@
+import pytest
+
+from conftest import metric
+from exact_distribution import exact_matchup_results
+from live_win_probability import LiveWinProbability, seconds_remaining
+
+
+def test_tip_off_matches_the_exact_engine(matrices):
+    live = LiveWinProbability(*matrices, 70)
+    tip_off = live.win_probability(0, 0, 1, 0)
+    exact = exact_matchup_results(*matrices, 70, 'A', 'B', overtime=True)
+
+    assert tip_off['Overtime Percentage'] == pytest.approx(metric(exact, 'Overtime Percentage', 'A'))
+    assert tip_off['Win Percentage'][0] == pytest.approx(metric(exact, 'Win Percentage', 'A'), abs=1e-3)
+    assert tip_off['Projected Margin'] == pytest.approx(metric(exact, 'Supremacy', 'A'), abs=0.05)
+
+
+def test_the_clock_and_the_ball_move_the_odds(matrices):
+    live = LiveWinProbability(*matrices, 70.4)
+    # an overtime period starts at 300 seconds elapsed
+    assert seconds_remaining(1, 0) == 2400 and seconds_remaining(4, 600) == 0 and seconds_remaining(5, 300) == 300 and seconds_remaining(5, 600) == 0
+
+    # the same away lead is worth more the less time is left
+    odds = [live.win_probability(60, 64, 4, elapsed)['Win Percentage'][1] for elapsed in (0, 300, 540, 590)]
+    assert odds == sorted(odds) and odds[-1] > 0.9
+    assert live.win_probability(60, 64, 4, 600)['Win Percentage'] == (0, 1)
+
+    # level at the buzzer goes to overtime, the ball is worth something with time left
+    assert live.win_probability(70, 70, 4, 600)['Win Percentage'][0] == pytest.approx(live.overtime_win_percentage)
+    assert (live.win_probability(70, 70, 4, 560, possession='home')['Win Percentage'][0] >
+            live.win_probability(70, 70, 4, 560, possession='away')['Win Percentage'][0])
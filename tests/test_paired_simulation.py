@@ -0,0 +1,43 @@
+import numpy as np
+import pytest
+
+from paired_simulation import simulate_paired_games, paired_deltas
+
+
+# scores close enough that about one game in six is tied, the second scenario a little stronger on the same draws
+def tied_scores(num_games=20000, seed=3):
+    rng = np.random.default_rng(seed)
+    team_a_base = rng.integers(0, 6, num_games).astype(float)
+    team_b = rng.integers(0, 6, (2, num_games)).astype(float)
+    team_b[1] = team_b[0]
+    team_a = np.stack([team_a_base, team_a_base + (rng.random(num_games) < 0.2)])
+    return team_a, team_b
+
+
+def test_win_delta_se_matches_bootstrap_of_decided_games():
+    team_a, team_b = tied_scores()
+    deltas = paired_deltas(team_a, team_b, ['Baseline', 'Stronger'])
+    assert (team_a == team_b).mean() > 0.1
+
+    # resampling whole games keeps the pairing, and every statistic is recomputed over the decided games
+    rng = np.random.default_rng(5)
+    win_deltas, supremacy_deltas = [], []
+    for _ in range(400):
+        games = rng.integers(0, team_a.shape[1], team_a.shape[1])
+        resampled = paired_deltas(team_a[:, games], team_b[:, games], ['Baseline', 'Stronger'])
+        win_deltas.append(resampled['Win Percentage Delta'].iloc[1])
+        supremacy_deltas.append(resampled['Supremacy Delta'].iloc[1])
+
+    assert deltas['Win Percentage Delta SE'].iloc[1] == pytest.approx(np.std(win_deltas, ddof=1), rel=0.15)
+    assert deltas['Supremacy Delta SE'].iloc[1] == pytest.approx(np.std(supremacy_deltas, ddof=1), rel=0.15)
+    assert deltas['Win Percentage Delta SE'].iloc[0] == 0
+
+
+def test_common_random_numbers_shrink_the_supremacy_se(matrices):
+    home, away = matrices
+    team_a, team_b = simulate_paired_games([(home, away, 70.4), (home, away, 72.4)], 4000, seed=2)
+    deltas = paired_deltas(team_a, team_b, ['Baseline', 'More Possessions'])
+
+    # identical matrices on the same uniforms: the baseline is its own pair and the scenario stays close to it
+    assert deltas['Supremacy Delta SE'].iloc[0] == 0
+    assert deltas['Supremacy Delta SE'].iloc[1] < deltas['Unpaired Supremacy Delta SE'].iloc[1] / 2
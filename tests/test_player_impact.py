@@ -0,0 +1,38 @@
+import numpy as np
+import pytest
+
+from player_impact import removal_ratings, player_impact_report
+from rotation_simulation import RATING_STATS
+
+NO_HOME_COURT = [0, 0, 0, 0]
+
+
+def test_removal_ratings_drop_one_player(rosters):
+    team_df = rosters[rosters['Team'] == 'MAD'].reset_index(drop=True)
+    ratings = removal_ratings(team_df, 'O')
+    columns = [f'{stat}_O' for stat in RATING_STATS]
+
+    def usage_weighted(df):
+        return (df[columns].to_numpy() * df[['usage_O']].to_numpy()).sum(axis=0) / df['usage_O'].sum()
+
+    assert np.allclose(ratings[0], usage_weighted(team_df))
+    for index in range(len(team_df)):
+        assert np.allclose(ratings[index + 1], usage_weighted(team_df.drop(index)))
+
+
+def test_the_best_shooter_matters_most(rosters):
+    rosters = rosters[rosters['Team'].isin(['MAD', 'BAR'])].copy()
+    star = rosters['PlayerID'] == 'MAD03'
+    rosters.loc[star, ['two_made_O', 'three_made_O']] += 400
+    rosters.loc[star, 'usage_O'] = 3
+
+    report = player_impact_report('MAD', 'BAR', 0.8, rosters, home_court_diffs=NO_HOME_COURT)
+    assert len(report) == 20
+    assert report[report['Team'] == 'MAD'].sort_values('Win Percentage Impact')['PlayerID'].iloc[-1] == 'MAD03'
+    assert report.set_index('PlayerID').loc['MAD03', 'Supremacy Impact'] > 1
+
+    # the paired engine simulates the same scenarios, so it finds the same impact within its noise
+    paired = player_impact_report('MAD', 'BAR', 0.8, rosters, engine='paired', number_of_simulations=4000, seed=3,
+                                  home_court_diffs=NO_HOME_COURT)
+    assert (paired.set_index('PlayerID').loc['MAD03', 'Supremacy Impact'] ==
+            pytest.approx(report.set_index('PlayerID').loc['MAD03', 'Supremacy Impact'], abs=0.5))
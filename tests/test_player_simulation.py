@@ -0,0 +1,49 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from batch_simulation import run_multiple_games_batch_streaming
+from player_simulation import PLAYER_EVENTS, simulate_player_box_scores, team_player_games
+from simulation_accumulator import SimulationAccumulator
+
+
+# NormalizedEstimates2 shaped player shares, the second player of each team has twice the first's
+def player_estimates(teams=('MAD', 'BAR')):
+    rows = []
+    for team in teams:
+        for number, scale in enumerate([1.0, 2.0, 0.5]):
+            rows.append({'Team': team, 'PlayerID': f'{team}{number:02d}', 'Player': f'{team} PLAYER {number}',
+                         'FTM': 2 * scale, 'FTA': 3 * scale, '2FGM': 3 * scale, '2FGA': 6 * scale, '3FGM': 1 * scale,
+                         '3FGA': 3 * scale, 'TO': 1 * scale, 'ORB': 1 * scale, 'DRB': 3 * scale})
+    return pd.DataFrame(rows)
+
+
+@pytest.fixture(scope='module')
+def game_results(matrices):
+    accumulator, _ = run_multiple_games_batch_streaming(*matrices, 3000, 70.4, rng=np.random.default_rng(2),
+                                                        accumulator=SimulationAccumulator(keep_games=True))
+    return accumulator.game_results()
+
+
+def test_player_lines_add_up_to_the_team(game_results):
+    players = player_estimates().query("Team == 'MAD'").reset_index(drop=True)
+    player_games = team_player_games(game_results[0], players, np.random.default_rng(0))
+
+    # every simulated event goes to exactly one player
+    for stat, (team_total, _) in PLAYER_EVENTS.items():
+        if stat in player_games:
+            assert (player_games[stat].sum(axis=1) == np.rint(np.maximum(team_total(game_results[0]), 0))).all()
+    assert (player_games['Pts'].sum(axis=1) == np.rint(game_results[0]['FT Makes']) + 2 * np.rint(game_results[0]['2pt Makes']) +
+            3 * np.rint(game_results[0]['3pt Makes'])).all()
+    assert (player_games['2FGA'] >= player_games['2FGM']).all()
+
+
+def test_player_box_scores_follow_the_shares(game_results):
+    box_scores = simulate_player_box_scores(game_results, player_estimates(), 'MAD', 'BAR', seed=1).set_index('PlayerID')
+
+    assert len(box_scores) == 6
+    assert box_scores.loc['MAD01', 'Pts'] / box_scores.loc['MAD00', 'Pts'] == pytest.approx(2, rel=0.05)
+    assert (box_scores['Pts P10'] <= box_scores['Pts P50']).all() and (box_scores['Pts P50'] <= box_scores['Pts P90']).all()
+
+    # seeded draws repeat
+    pd.testing.assert_frame_equal(box_scores, simulate_player_box_scores(game_results, player_estimates(), 'MAD', 'BAR', seed=1).set_index('PlayerID'))
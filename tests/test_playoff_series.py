@@ -0,0 +1,29 @@
+import pytest
+
+from playoff_series import series_outcomes, series_probabilities
+
+
+def test_best_of_three_matches_closed_form():
+    home, away = 0.7, 0.45
+    summary, outcomes = series_probabilities({'Home': home, 'Away': away}, 'PAM', 'HTA', best_of=3)
+
+    # HAH: 2-0, or 2-1 with the deciding game at home
+    two_nil = home * away
+    two_one = (home * (1 - away) + (1 - home) * away) * home
+    assert outcomes['Probability'].sum() == pytest.approx(1)
+    assert summary.loc[summary['Metric'] == 'Series Win Percentage', 'PAM'].iloc[0] == pytest.approx(two_nil + two_one)
+    assert summary.loc[summary['Metric'] == '2 Games', 'PAM'].iloc[0] == pytest.approx(two_nil)
+    assert list(outcomes['Series Score']) == ['2-0', '2-1', '1-2', '0-2']
+
+
+def test_series_resumes_from_the_current_score():
+    game_probabilities = {'Home': 0.6, 'Away': 0.4}
+
+    # 2-2 in a best of five leaves only game five, at the higher seed's home
+    assert series_outcomes(game_probabilities, best_of=5, series_score=(2, 2)) == {(3, 2): pytest.approx(0.6), (2, 3): pytest.approx(0.4)}
+    # a finished series stays finished
+    assert series_outcomes(game_probabilities, best_of=5, series_score=(3, 1)) == {(3, 1): 1.0}
+
+    # a coin flip every game makes the series a coin flip whatever the home pattern
+    summary, _ = series_probabilities({'Home': 0.5, 'Away': 0.5}, 'A', 'B', best_of=5)
+    assert summary.loc[0, 'A'] == pytest.approx(0.5)
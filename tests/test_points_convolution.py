@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+
+from exact_distribution import (possession_outcome_distribution, game_points_distribution, matchup_outcome_probabilities,
+                                MAX_POSSESSION_POINTS)
+from score_distribution import score_histogram_from_distributions, total_probabilities, spread_probabilities
+from points_convolution import (game_points_pmfs, game_points_pmfs_squaring, pmf_distributions, round_summary, points_distribution,
+                                margin_distribution, total_distribution, round_total_probabilities, round_spread_probabilities)
+
+
+# the convolution engine and exact_distribution play a fractional possession the same way, so they must agree
+@pytest.mark.parametrize('simmedpossessions', [70.0, 70.4, 71.75])
+def test_convolution_matches_exact_distribution(matrices, simmedpossessions):
+    home_pmf, away_pmf = [possession_outcome_distribution(matrix)['points'] for matrix in matrices]
+    outcome = matchup_outcome_probabilities(game_points_distribution(home_pmf, simmedpossessions),
+                                            game_points_distribution(away_pmf, simmedpossessions))
+
+    for method in ['fft', 'squaring']:
+        summary = round_summary(pmf_distributions(np.vstack([home_pmf]), np.vstack([away_pmf]), np.array([simmedpossessions]), method),
+                                ['A'], ['B']).iloc[0]
+        assert summary['Win Percentage'] == pytest.approx(outcome['Win Percentage'][0], abs=1e-9)
+        assert summary['Tie Percentage'] == pytest.approx(outcome['Tie Percentage'], abs=1e-9)
+        assert summary['Supremacy'] == pytest.approx(outcome['Supremacy'], abs=1e-8)
+        assert summary['Total'] == pytest.approx(outcome['Total'], abs=1e-8)
+
+
+@pytest.mark.parametrize('method', ['fft', 'squaring'])
+def test_whole_possessions_keep_every_point(method):
+    # a possession scoring 4 points half the time, so the top of the support carries real mass
+    pmf = np.array([0.2, 0.1, 0.1, 0.1, 0.5])
+    game_pmfs = game_points_pmfs if method == 'fft' else game_points_pmfs_squaring
+    whole = game_pmfs(np.vstack([pmf, pmf]), np.array([12.5, 9.0]))
+
+    expected = np.array([1.0])
+    for _ in range(12):
+        expected = np.convolve(expected, pmf)
+    assert whole.shape[1] == 12 * MAX_POSSESSION_POINTS + 1
+    np.testing.assert_allclose(whole[0], expected, atol=1e-12)
+    assert whole[0] @ np.arange(whole.shape[1]) == pytest.approx(12 * pmf @ np.arange(len(pmf)))
+
+
+def test_full_game_distributions_match_exact_distribution(matrices):
+    simmedpossessions = 70.6
+    home_pmf, away_pmf = [possession_outcome_distribution(matrix)['points'] for matrix in matrices]
+    distributions = pmf_distributions(np.vstack([home_pmf]), np.vstack([away_pmf]), np.array([simmedpossessions]))
+    home_game = game_points_distribution(home_pmf, simmedpossessions)
+    away_game = game_points_distribution(away_pmf, simmedpossessions)
+
+    for team, (values, probabilities) in [('Home', home_game), ('Away', away_game)]:
+        full_values, full_probabilities = points_distribution(distributions, 0, team)
+        assert full_probabilities @ full_values == pytest.approx(probabilities @ values, abs=1e-9)
+
+    # the full total includes the last possession, the whole possession part alone falls short of it
+    total_values, total_probabilities_ = total_distribution(distributions, 0)
+    expected_total = home_game[1] @ home_game[0] + away_game[1] @ away_game[0]
+    assert total_probabilities_ @ total_values == pytest.approx(expected_total, abs=1e-9)
+    assert distributions['Whole Total'][0] @ np.arange(distributions['Whole Total'].shape[1]) < expected_total - 1
+
+    margin_values, margin_probabilities = margin_distribution(distributions, 0)
+    assert margin_probabilities @ margin_values == pytest.approx(
+        home_game[1] @ home_game[0] - away_game[1] @ away_game[0], abs=1e-9)
+
+    # lines priced from the convolution agree with the exact score histogram
+    histogram = score_histogram_from_distributions(home_game, away_game, min_probability=0)
+    totals = round_total_probabilities(distributions, ['A'], ['B'], [150.5, 158.5, 160.3])
+    np.testing.assert_allclose(totals[['Over', 'Push', 'Under']].to_numpy(),
+                               total_probabilities(histogram, [150.5, 158.5, 160.3])[['Over', 'Push', 'Under']].to_numpy(), atol=1e-6)
+    spreads = round_spread_probabilities(distributions, ['A'], ['B'], [-3.5, -2.4, 0.5])
+    np.testing.assert_allclose(spreads[['Home Cover', 'Push', 'Away Cover']].to_numpy(),
+                               spread_probabilities(histogram, [-3.5, -2.4, 0.5])[['Home Cover', 'Push', 'Away Cover']].to_numpy(),
+                               atol=1e-6)
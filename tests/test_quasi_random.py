@@ -0,0 +1,55 @@
+import numpy as np
+import pytest
+
+from batch_simulation import run_multiple_games_batch
+from compiled_matrix import compile_matrix
+from quasi_random import possession_uniforms, qmc
+from simulation_accumulator import SimulationAccumulator
+from simulation_functions import run_multiple_games_adaptive
+
+
+# records the number of games in every batch added
+class ChunkAccumulator(SimulationAccumulator):
+
+    def __init__(self):
+        super().__init__()
+        self.chunks = []
+
+    def add_batch(self, results):
+        games = self.games
+        added = super().add_batch(results)
+        self.chunks.append(self.games - games)
+        return added
+
+
+def test_stratified_draws_fill_every_stratum():
+    uniforms = possession_uniforms(500, 3, np.random.default_rng(1))
+    for slot in range(3):
+        for step in range(2):
+            assert (np.sort(np.floor(uniforms[:, slot, step] * 500)) == np.arange(500)).all()
+
+
+@pytest.mark.skipif(qmc is None, reason='sampler=sobol needs scipy')
+def test_adaptive_sobol_runs_whole_power_of_two_blocks(matrices):
+    home, away = (compile_matrix(matrix) for matrix in matrices)
+    accumulator, _ = run_multiple_games_adaptive(home, away, 70.4, win_tolerance=1e-6, max_simulations=5000,
+                                                 rng=np.random.default_rng(3), accumulator=ChunkAccumulator(), sampler='sobol')
+
+    # 2000 game checks become 1024, only the chunk cut short by max_simulations is a partial block
+    assert accumulator.chunks == [1024, 1024, 1024, 1024, 904]
+    assert accumulator.games == 5000
+
+
+# the quasi random samplers keep the expected results of the pseudo random one
+@pytest.mark.parametrize('sampler', ['stratified', 'sobol'])
+def test_samplers_agree_with_random_draws(matrices, sampler):
+    if sampler == 'sobol' and qmc is None:
+        pytest.skip('sampler=sobol needs scipy')
+    home, away = (compile_matrix(matrix) for matrix in matrices)
+    points = {}
+    for name in ('random', sampler):
+        (team_a, team_b), _ = run_multiple_games_batch(home, away, 16384, 70.4, np.random.default_rng(8), sampler=name)
+        points[name] = team_a['Points'] - team_b['Points']
+
+    standard_error = np.sqrt(points['random'].var(ddof=1) * 2 / 16384)
+    assert abs(points[sampler].mean() - points['random'].mean()) < 4 * standard_error
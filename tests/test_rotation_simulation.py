@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+
+from conftest import metric
+from rotation_simulation import LineupMatrixCache, lineup_count_matrix, rotation_plan, simulate_rotation_matchup
+
+NO_HOME_COURT = [0, 0, 0, 0]
+
+
+def test_lineup_cache_keys_on_ratings(rosters):
+    lineup = rosters[rosters['Team'] == 'MAD'].head(5)
+    cache = LineupMatrixCache()
+    first = cache.get(lineup, 'O')
+    assert cache.get(lineup.iloc[::-1], 'O') is first
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # same five PlayerIDs with new ratings (or usage) are a new entry, not the old matrix
+    rerated = lineup.assign(three_made_O=lineup['three_made_O'] + 100)
+    pd.testing.assert_frame_equal(cache.get(rerated, 'O'), lineup_count_matrix(rerated, 'O'))
+    reused = lineup.assign(usage_O=lineup['usage_O'][::-1].to_numpy())
+    pd.testing.assert_frame_equal(cache.get(reused, 'O'), lineup_count_matrix(reused, 'O'))
+    assert (cache.hits, cache.misses) == (1, 3)
+
+    # the defense columns are not read for an offense matrix
+    assert cache.get(lineup.assign(three_made_D=0), 'O') is first
+
+
+def test_rotation_plan_plays_five_for_the_whole_game(rosters):
+    plan = rotation_plan(rosters[rosters['Team'] == 'BAR'], 70)
+
+    assert plan['Start Possession'].iloc[0] == 0 and plan['End Possession'].iloc[-1] == 70
+    assert (plan['Start Possession'].iloc[1:].to_numpy() == plan['End Possession'].iloc[:-1].to_numpy()).all()
+    assert all(len(set(lineup)) == 5 for lineup in plan['Lineup'])
+
+
+def test_rotation_matchup_is_seeded_and_reuses_lineups(rosters):
+    cache = LineupMatrixCache()
+    results, segments = simulate_rotation_matchup('MAD', 'BAR', 0.8, 2000, 0, rosters, seed=4, cache=cache,
+                                                  home_court_diffs=NO_HOME_COURT)
+    misses = cache.misses
+    again, _ = simulate_rotation_matchup('MAD', 'BAR', 0.8, 2000, 0, rosters, seed=4, cache=cache,
+                                         home_court_diffs=NO_HOME_COURT)
+
+    pd.testing.assert_frame_equal(results, again)
+    assert cache.misses == misses and cache.hits >= 4 * len(segments)
+    assert 0 < metric(results, 'Win Percentage', 'MAD') < 1
+    assert np.isclose(metric(results, 'Win Percentage', 'MAD') + metric(results, 'Win Percentage', 'BAR'), 1)
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from season_simulation import fixture_key, rank_seasons, simulate_season
+
+NO_HOME_COURT = [0, 0, 0, 0]
+
+
+# a fixture distribution that always ends home_points to away_points
+def fixed_score(home_points, away_points):
+    return {'Home Points': np.array([home_points], dtype=float), 'Away Points': np.array([away_points], dtype=float),
+            'Cumulative': np.array([1.0]), 'Win Percentage': float(home_points > away_points)}
+
+
+def test_tiebreakers_in_order():
+    rng = np.random.default_rng(0)
+    wins = np.array([[10.0, 10.0, 9.0]])
+    point_difference = np.array([[50.0, 80.0, 100.0]])
+    points_scored = np.zeros((1, 3))
+
+    # level on wins, the head to head decides before the point difference
+    h2h_wins = np.array([[[0, 2, 0], [0, 0, 0], [0, 0, 0]]], dtype=float)
+    h2h_points = np.array([[[0, 5, 0], [-5, 0, 0], [0, 0, 0]]], dtype=float)
+    assert rank_seasons(wins, point_difference, points_scored, h2h_wins, h2h_points, rng).tolist() == [[1, 2, 3]]
+
+    # split head to head with the same points, then the overall point difference
+    h2h_wins = np.array([[[0, 1, 0], [1, 0, 0], [0, 0, 0]]], dtype=float)
+    assert rank_seasons(wins, point_difference, points_scored, h2h_wins, np.zeros((1, 3, 3)), rng).tolist() == [[2, 1, 3]]
+
+    # head to head games against a team with fewer wins do not count
+    h2h_wins = np.array([[[0, 1, 0], [1, 0, 3], [0, 0, 0]]], dtype=float)
+    assert rank_seasons(wins, point_difference, points_scored, h2h_wins, np.zeros((1, 3, 3)), rng).tolist() == [[2, 1, 3]]
+
+
+def test_season_from_cached_fixtures(rosters):
+    standings = pd.DataFrame({'Team': ['MAD', 'BAR', 'PAN', 'OLY'], 'Wins': [3, 3, 1, 0],
+                              'Points For': [300, 310, 280, 270], 'Points Against': [280, 290, 300, 290]})
+    remaining = pd.DataFrame({'Home_Code': ['MAD', 'PAN'], 'Away_Code': ['BAR', 'OLY']})
+
+    # MAD beat BAR in the last game, PAN and OLY a coin flip between two scores
+    fixture_cache = {fixture_key('MAD', 'BAR', 0.8, rosters, 0, 'exact', 20000, 1, NO_HOME_COURT): fixed_score(85, 80)}
+    coin_flip = {'Home Points': np.array([70.0, 75.0]), 'Away Points': np.array([75.0, 70.0]),
+                 'Cumulative': np.array([0.5, 1.0]), 'Win Percentage': 0.5}
+    fixture_cache[fixture_key('PAN', 'OLY', 0.8, rosters, 0, 'exact', 20000, 1, NO_HOME_COURT)] = coin_flip
+
+    season = simulate_season(standings, remaining, rosters, num_seasons=4000, seed=1, fixture_cache=fixture_cache,
+                             home_court_diffs=NO_HOME_COURT).set_index('Team')
+
+    assert len(fixture_cache) == 2
+    assert season.loc['MAD', 1] == 1 and season.loc['BAR', 2] == 1
+    assert season.loc['MAD', 'Expected Wins'] == 4 and season.loc['BAR', 'Expected Wins'] == 3
+    assert season.loc['PAN', 'Expected Wins'] == pytest.approx(1.5, abs=0.05)
+    # OLY only passes PAN by winning, then both have one win and OLY holds the head to head
+    assert season.loc['OLY', 3] == pytest.approx(0.5, abs=0.05)
+    assert (season[[1, 2, 3, 4]].sum(axis=1) == 1).all()
@@ -0,0 +1,29 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from conftest import metric
+from batch_simulation import run_multiple_games_batch, analyze_batch_results
+from simulation_accumulator import SimulationAccumulator
+
+
+def test_merged_accumulators_match_one_accumulator(matrices):
+    results, simmedpossessions = run_multiple_games_batch(*matrices, 9000, 70.4, rng=np.random.default_rng(7))
+    whole = SimulationAccumulator().add_batch(results)
+
+    # uneven chunks, merged in a tree like the parallel engine's workers
+    bounds = [0, 1, 2500, 2600, 6000, 9000]
+    parts = [SimulationAccumulator().add_batch(tuple({key: values[start:end] for key, values in team.items()} for team in results))
+             for start, end in zip(bounds[:-1], bounds[1:])]
+    merged = parts[0].merge(parts[1]).merge(parts[2].merge(parts[3]).merge(parts[4]))
+
+    pd.testing.assert_frame_equal(merged.results_df(simmedpossessions, 'A', 'B'), whole.results_df(simmedpossessions, 'A', 'B'))
+    pd.testing.assert_frame_equal(merged.standard_errors_df('A', 'B'), whole.standard_errors_df('A', 'B'))
+    assert merged.win_standard_error() == pytest.approx(whole.win_standard_error())
+    assert merged.score_histogram().equals(whole.score_histogram())
+
+    # and both match the moments of the decided games calculated directly
+    points = results[0]['Points'] - results[1]['Points']
+    decided = points[points != 0]
+    assert merged.supremacy_standard_error() == pytest.approx(decided.std(ddof=1) / np.sqrt(len(decided)))
+    assert metric(analyze_batch_results(results, simmedpossessions, 'A', 'B'), 'Supremacy', 'A') == pytest.approx(decided.mean())
@@ -0,0 +1,77 @@
+import pandas as pd
+
+from simulation_cache import SimulationCache
+from run_simulation import run_cached_simulation
+
+
+USAGE_FRAMES = [pd.DataFrame({'PlayerID': ['MAD00'], 'Possession': [1]})] * 4
+
+
+# stands in for run_full_simuluation, recording what it was called with
+class RecordingSimulation:
+
+    def __init__(self):
+        self.calls = []
+
+    def __call__(self, home_team, away_team, HFA, players_to_update, number_of_simulations, possession_adjust, teamsDF,
+                 *usage_frames, seed=None, home_court_diffs=None, **simulation_options):
+        self.calls.append({'teamsDF': teamsDF, 'seed': seed, 'home_court_diffs': home_court_diffs})
+        return (len(self.calls),)
+
+
+def run(cache, simulate, teamsDF, players_to_update=None, seed=2024, home_court_diffs=('O', 'D', 'O', 'D')):
+    return run_cached_simulation(cache, 'MAD', 'BAR', 0.8, players_to_update or [], 1000, 0, teamsDF, *USAGE_FRAMES, seed=seed,
+                                 home_court_diffs=list(home_court_diffs), simulate=simulate, engine='batch')
+
+
+def test_same_inputs_hit(tmp_path, rosters):
+    cache, simulate = SimulationCache(tmp_path), RecordingSimulation()
+    assert run(cache, simulate, rosters) == (1,)
+    assert run(cache, simulate, rosters.copy()) == (1,)
+    assert (cache.hits, cache.misses, len(simulate.calls)) == (1, 1, 1)
+    assert simulate.calls[0]['home_court_diffs'] == ['O', 'D', 'O', 'D']
+
+    # a new cache on the same directory reads the stored outputs back
+    assert run(SimulationCache(tmp_path), simulate, rosters) == (1,)
+
+
+def test_changed_roster_misses(tmp_path, rosters):
+    cache, simulate = SimulationCache(tmp_path), RecordingSimulation()
+    run(cache, simulate, rosters)
+
+    changed = rosters.copy()
+    changed.loc[changed['PlayerID'] == 'MAD03', 'three_made_O'] += 25
+    assert run(cache, simulate, changed) == (2,)
+
+    # another team's ratings do not change the matchup
+    other_team = rosters.copy()
+    other_team.loc[other_team['PlayerID'] == 'PAN03', 'three_made_O'] += 25
+    assert run(cache, simulate, other_team) == (1,)
+
+    # nor does a player who did not play the last game
+    inactive = rosters.copy()
+    inactive.loc[inactive['PlayerID'] == 'MAD05', 'PlayedInMostRecentGame'] = 0
+    assert run(cache, simulate, inactive) == (3,)
+    inactive.loc[inactive['PlayerID'] == 'MAD05', 'three_made_O'] += 25
+    assert run(cache, simulate, inactive) == (3,)
+
+
+def test_players_to_update_and_home_court_are_keyed(tmp_path, rosters):
+    cache, simulate = SimulationCache(tmp_path), RecordingSimulation()
+    signing = [{'Player': 'PAN PLAYER 1', 'Team': 'MAD', 'PossessionCount': 30}]
+    assert run(cache, simulate, rosters, signing) == (1,)
+    assert run(cache, simulate, rosters, signing) == (1,)
+
+    # the signed player's ratings come from their PAN row, which is now simulated for MAD
+    changed = rosters.copy()
+    changed.loc[changed['PlayerID'] == 'PAN01', 'two_made_D'] -= 25
+    assert run(cache, simulate, changed, signing) == (2,)
+
+    assert run(cache, simulate, rosters, signing, home_court_diffs=('O', 'D', 'O', 'X')) == (3,)
+
+
+def test_unseeded_calls_are_not_cached(tmp_path, rosters):
+    cache, simulate = SimulationCache(tmp_path), RecordingSimulation()
+    run(cache, simulate, rosters, seed=None)
+    run(cache, simulate, rosters, seed=None)
+    assert (cache.bypassed, len(simulate.calls)) == (2, 2)
@@ -0,0 +1,80 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from compiled_matrix import CompiledMatrix
+from simulation_checkpoint import SimulationCheckpoint, MatchupCheckpoint
+from simulation_functions import run_multiple_games_checkpointed, run_multiple_games_streaming
+from batch_simulation import run_multiple_games_batch_streaming
+
+
+NUM_GAMES = 1700
+CHUNK_SIZE = 500
+
+
+# stops the run with a KeyboardInterrupt after its second chunk is saved, like a Ctrl-C between chunks
+class InterruptedCheckpoint(MatchupCheckpoint):
+
+    def save(self, **state):
+        super().save(**state)
+        self.checkpoint.saves = getattr(self.checkpoint, 'saves', 0) + 1
+        if self.checkpoint.saves == 2:
+            raise KeyboardInterrupt
+
+
+def uninterrupted(matrices, engine):
+    team_a_matrix, team_b_matrix = [CompiledMatrix(matrix) for matrix in matrices]
+    if engine == 'batch':
+        accumulator, _ = run_multiple_games_batch_streaming(team_a_matrix, team_b_matrix, NUM_GAMES, 70.4,
+                                                            rng=np.random.default_rng(7), chunk_size=CHUNK_SIZE)
+    else:
+        np.random.seed(7)
+        accumulator, _ = run_multiple_games_streaming(team_a_matrix, team_b_matrix, NUM_GAMES, 70.4)
+    return accumulator
+
+
+def checkpointed(matrices, engine, checkpoint):
+    team_a_matrix, team_b_matrix = [CompiledMatrix(matrix) for matrix in matrices]
+    accumulator, _ = run_multiple_games_checkpointed(team_a_matrix, team_b_matrix, NUM_GAMES, 70.4, checkpoint, matrices,
+                                                     engine=engine, rng=np.random.default_rng(7))
+    return accumulator
+
+
+@pytest.mark.parametrize('engine', ['batch', 'reference'])
+def test_resumed_run_equals_uninterrupted_run(tmp_path, matrices, engine):
+    expected = uninterrupted(matrices, engine)
+
+    np.random.seed(7)
+    with pytest.raises(KeyboardInterrupt):
+        checkpointed(matrices, engine, InterruptedCheckpoint(SimulationCheckpoint(tmp_path, CHUNK_SIZE), 'matchup'))
+
+    # a new process: different global random state, the checkpoint read back from disk
+    np.random.seed(123)
+    resumed_checkpoint = SimulationCheckpoint(tmp_path, CHUNK_SIZE)
+    assert resumed_checkpoint.partial['state']['accumulator'].games == 2 * CHUNK_SIZE
+    resumed = checkpointed(matrices, engine, resumed_checkpoint.matchup('matchup'))
+
+    pd.testing.assert_frame_equal(resumed.results_df(70.4, 'A', 'B'), expected.results_df(70.4, 'A', 'B'))
+    pd.testing.assert_frame_equal(resumed.standard_errors_df('A', 'B'), expected.standard_errors_df('A', 'B'))
+    assert resumed.score_histogram().equals(expected.score_histogram())
+
+
+def test_other_matchup_starts_over(tmp_path, matrices):
+    checkpoint = SimulationCheckpoint(tmp_path, CHUNK_SIZE)
+    checkpoint.matchup('old roster').save(accumulator=None)
+    assert SimulationCheckpoint(tmp_path).matchup('new roster').load() is None
+
+
+def test_finished_matchups_are_kept_in_their_own_files(tmp_path):
+    checkpoint = SimulationCheckpoint(tmp_path)
+    checkpoint.matchup('first').save(accumulator=None)
+    checkpoint.complete('first', ('outputs', 1))
+    checkpoint.matchup('second').save(accumulator=None)
+
+    reopened = SimulationCheckpoint(tmp_path)
+    assert 'first' in reopened and 'second' not in reopened
+    assert reopened.outputs('first') == ('outputs', 1)
+    assert reopened.matchup('second').load() == {'accumulator': None}
+
+    reopened.clear()
+    assert 'first' not in SimulationCheckpoint(tmp_path)